@@ -2,7 +2,6 @@
 """Configure the package for distribution."""
 import distutils.cmd
 import os
-from importlib import import_module
 from pathlib import Path
 
 import jinja2
@@ -73,7 +72,8 @@ class TallyCommand(distutils.cmd.Command):
         loader = jinja2.FileSystemLoader(searchpath=this_dir / "docs" / "_templates/")
         env = jinja2.Environment(loader=loader)
 
-        scraper_list = warn.utils.get_all_scrapers()
+        registry = warn.registry.load()
+        scraper_list = list(registry)
         print(f"{len(scraper_list)} scrapers found")
 
         docs_dir = this_dir / "docs" / "scrapers"
@@ -87,10 +87,10 @@ class TallyCommand(distutils.cmd.Command):
             abbr = state["abbr"].lower()
             if abbr in scraper_list:
                 state["has_docs"] = abbr in has_docs
-                module = import_module(f"warn.scrapers.{abbr}")
-                state["authors"] = sorted(module.__authors__)
-                state["tags"] = sorted(module.__tags__)
-                state["source"] = module.__source__
+                info = registry[abbr]
+                state["authors"] = info.authors
+                state["tags"] = info.tags
+                state["source"] = info.source
                 haves.append(state)
             else:
                 state["has_docs"] = False
@@ -113,6 +113,27 @@ class TallyCommand(distutils.cmd.Command):
             fh.write(md)
 
 
+class RegistryCommand(distutils.cmd.Command):
+    """Refresh the scraper registry from the scraper modules."""
+
+    description = "Refresh the scraper registry from the scraper modules"
+    user_options: list = []
+
+    def initialize_options(self):
+        """Set default values for options."""
+        pass
+
+    def finalize_options(self):
+        """Finalize values."""
+        pass
+
+    def run(self):
+        """Run command."""
+        print("Building scraper registry")
+        registry = warn.registry.build()
+        print(f"{len(registry)} scrapers written to {warn.registry.REGISTRY_PATH}")
+
+
 setup(
     name="warn-scraper",
     description="Command-line interface for downloading WARN Act notices of qualified plant closings and mass layoffs from state government websites",
@@ -127,6 +148,7 @@ setup(
         warn-scraper=warn.cli:main
     """,
     install_requires=[
+        "aiohttp",
         "click",
         "beautifulsoup4",
         "html5lib",
@@ -134,14 +156,16 @@ setup(
         "requests",
         "openpyxl",
         "pyopenssl",
-        "retry",
         "selenium",
         "stealthenium",
-        "tenacity",
         "xlrd",
         "xvfbwrapper",
         "webdriver-manager",
     ],
+    extras_require={
+        "lxml": ["lxml"],
+        "zstd": ["zstandard"],
+    },
     license="Apache 2.0 license",
     zip_safe=False,
     classifiers=[
@@ -172,5 +196,6 @@ setup(
     },
     cmdclass={
         "tallysources": TallyCommand,
+        "registry": RegistryCommand,
     },
 )
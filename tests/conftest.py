@@ -1,4 +1,6 @@
 import shutil
+import threading
+from http.server import ThreadingHTTPServer
 from pathlib import Path
 
 import pytest
@@ -58,6 +60,27 @@ def set_etl_dir_env_var(warn_scraper_dir, monkeypatch):
     monkeypatch.setenv("WARN_ETL_DIR", warn_scraper_dir)
 
 
+@pytest.fixture
+def http_server():
+    """Get a function that runs a local web server for the rest of a test.
+
+    Call it with a request handler class to get the server's base URL.
+    """
+    servers = []
+
+    def start(handler) -> str:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
 def read_fixture(file_name):
     """Read in provided fixture."""
     path = str(Path(__file__).parent.joinpath("fixtures").joinpath(file_name))
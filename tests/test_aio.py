@@ -0,0 +1,101 @@
+import gzip
+import socket
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from warn import aio
+from warn.ratelimit import limiter
+from warn.retries import RetryPolicy
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """Serve a small, gzipped page that echoes its path."""
+
+    # Paths that have failed once, so /flaky works the second time
+    failed: set = set()
+
+    def do_GET(self):
+        """Respond to a GET request."""
+        if self.path == "/missing":
+            self.send_error(404)
+            return
+        if self.path == "/flaky" and self.path not in self.failed:
+            self.failed.add(self.path)
+            self.send_error(503)
+            return
+        if self.path.startswith("/latin-1"):
+            # A Latin-1 page that doesn't say what charset it's in
+            body = "<p>Société Générale, Québec</p>".encode("latin-1")
+            content_type = self.path.rsplit("/", 1)[-1].replace("-", "/", 1)
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        body = gzip.compress(f"<h1>{self.path}</h1>".encode())
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Keep the test output quiet."""
+        pass
+
+
+@pytest.fixture
+def server_url(http_server):
+    """Run a local web server for the duration of a test."""
+    PageHandler.failed = set()
+    limiter.configure("127.0.0.1", rate=None)
+    return http_server(PageHandler)
+
+
+def test_fetch_all(server_url):
+    """Test that many URLs come back decoded and in order."""
+    urls = [f"{server_url}/page/{i}" for i in range(20)] + [f"{server_url}/missing"]
+    responses = aio.fetch_all(urls, per_host=4)
+    assert [r.text for r in responses[:-1]] == [
+        f"<h1>/page/{i}</h1>" for i in range(20)
+    ]
+    assert all(r.ok for r in responses[:-1])
+    assert responses[-1].status_code == 404
+    assert not responses[-1].ok
+
+
+def test_fetch_all_empty():
+    """Test that an empty batch doesn't start an event loop."""
+    assert aio.fetch_all([]) == []
+
+
+def test_fetch_all_retries(server_url):
+    """Test that a request that fails for a moment is tried again."""
+    urls = [f"{server_url}/flaky", f"{server_url}/page/1"]
+    responses = aio.fetch_all(urls, retry_policy=RetryPolicy(base_delay=0))
+    assert [r.status_code for r in responses] == [200, 200]
+    assert responses[0].text == "<h1>/flaky</h1>"
+
+
+def test_fetch_all_errors(server_url):
+    """Test that a failed connection is raised only after the rest of the batch is done."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    down = f"http://127.0.0.1:{port}/down"
+    with pytest.raises(aio.FetchError) as error:
+        aio.fetch_all(
+            [down, f"{server_url}/page/1"],
+            retry_policy=RetryPolicy(attempts=2, base_delay=0),
+        )
+    assert list(error.value.errors) == [down]
+
+
+@pytest.mark.parametrize("content_type", ["text-html", "application-octet-stream"])
+def test_fetch_all_without_charset(server_url, content_type):
+    """Test that text without a charset is decoded the way requests would."""
+    (response,) = aio.fetch_all([f"{server_url}/latin-1/{content_type}"])
+    assert response.text == "<p>Société Générale, Québec</p>"
@@ -1,9 +1,20 @@
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
+from requests.exceptions import ChunkedEncodingError
 
-from warn.cache import Cache
+from warn import utils
+from warn.cache import Cache, IncompleteDownloadError
+from warn.cache_index import CacheEntry
+from warn.compression import SUFFIXES, CompressionPolicy
+from warn.freshness import TTL, Always, Forever, FreshnessPolicy, RecentYears, Rule
+from warn.locks import FileLock, LockTimeout
+from warn.manifest import sha256
 
 from .conftest import file_contents
 
@@ -49,7 +60,7 @@ def test_files(cache_dir):
     # Base cache dir only contains fl/ dir
     assert cache.files()[0].endswith("/fl")
     # HTML files are stored in fl/ directory
-    actual = [str(p) for p in Path(cache_dir, "fl").glob("*.html")]
+    actual = sorted(str(p) for p in Path(cache_dir, "fl").glob("*.html"))
     assert cache.files(subdir="fl/") == actual
 
 
@@ -70,3 +81,388 @@ def test_read(cache_dir):
     cache = Cache(path=cache_dir)
     html = cache.read("fl/2021_page_1.html").strip()
     assert html == "<html><h1>2021 page 1</h1></html>"
+
+
+class ExcelHandler(BaseHTTPRequestHandler):
+    """Serve a file that never changes, with an ETag."""
+
+    etag = '"v1"'
+    body = b"fake spreadsheet"
+    requests_seen: list = []
+
+    def do_GET(self):
+        """Respond to a GET request."""
+        self.requests_seen.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        """Keep the test output quiet."""
+        pass
+
+
+@pytest.fixture
+def excel_url(http_server):
+    """Run a local web server for the duration of a test."""
+    ExcelHandler.requests_seen = []
+    return http_server(ExcelHandler) + "/export.xlsx"
+
+
+def test_download_revalidates(tmpdir, excel_url):
+    """Test that a second download of an unchanged file gets a 304."""
+    cache = Cache(tmpdir)
+    path = cache.download("il/export.xlsx", excel_url)
+    assert path.read_bytes() == b"fake spreadsheet"
+    assert "il/export.xlsx" not in cache.not_modified
+    assert "If-None-Match" not in ExcelHandler.requests_seen[0]
+
+    path = cache.download("il/export.xlsx", excel_url)
+    assert path.read_bytes() == b"fake spreadsheet"
+    assert "il/export.xlsx" in cache.not_modified
+    assert ExcelHandler.requests_seen[1]["If-None-Match"] == '"v1"'
+
+    # Validators don't show up as cached files
+    assert cache.files("il") == [str(path)]
+
+    # They can be ignored on request
+    cache.download("il/export.xlsx", excel_url, conditional=False)
+    assert "If-None-Match" not in ExcelHandler.requests_seen[2]
+    assert "il/export.xlsx" not in cache.not_modified
+
+
+def test_write_deduplicates(tmpdir):
+    """Test that identical content is stored once and rewrites are free."""
+    cache = Cache(tmpdir)
+    first = Path(cache.write("ks/search_results/a.html", "<h1>same</h1>"))
+    second = Path(cache.write("ks/search_results/b.html", "<h1>same</h1>"))
+    assert first.stat().st_ino == second.stat().st_ino
+    assert len(list(cache.blobs.digests())) == 1
+
+    # Saving the same content again doesn't touch the disk
+    with patch("warn.blobs.open") as mock_open, patch("warn.blobs.os.link") as link:
+        cache.write("ks/search_results/a.html", "<h1>same</h1>")
+    mock_open.assert_not_called()
+    link.assert_not_called()
+
+    # Changing one name leaves the other alone
+    cache.write("ks/search_results/a.html", "<h1>new</h1>")
+    assert cache.read("ks/search_results/a.html") == "<h1>new</h1>"
+    assert cache.read("ks/search_results/b.html") == "<h1>same</h1>"
+    assert len(list(cache.blobs.digests())) == 2
+
+    # Blobs don't show up as cached files
+    assert cache.files() == [str(Path(tmpdir, "ks"))]
+
+
+def test_download_deduplicates(tmpdir, excel_url):
+    """Test that the same file downloaded under two names is stored once."""
+    cache = Cache(tmpdir)
+    first = cache.download("il/export.xlsx", excel_url)
+    second = cache.download("il/copy.xlsx", excel_url)
+    assert first.stat().st_ino == second.stat().st_ino
+    assert second.read_bytes() == b"fake spreadsheet"
+    assert len(list(cache.blobs.digests())) == 1
+    assert list(Path(cache.blobs.root, "tmp").iterdir()) == []
+
+
+def test_index(tmpdir):
+    """Test that the index tracks what's saved, read and removed."""
+    cache = Cache(tmpdir)
+    cache.write("ks/records/1.html", "<h1>1</h1>")
+    cache.write("ks/records/2.html", "<h1>2</h1>")
+    cache.write("ks/search_results/page1.html", "<h1>results</h1>")
+
+    entry = cache.entry("ks/records/1.html")
+    assert entry.size == Path(tmpdir, "ks", "records", "1.html").stat().st_size
+    assert entry.digest is not None
+    assert [e.key for e in cache.index.query(prefix="ks/records/")] == [
+        "ks/records/1.html",
+        "ks/records/2.html",
+    ]
+    later = datetime.now() + timedelta(days=1)
+    assert len(cache.index.query(prefix="ks/", fetched_before=later)) == 3
+    assert cache.index.query(prefix="ks/", fetched_after=later) == []
+    assert cache.files("ks") == [
+        str(Path(tmpdir, "ks", "records")),
+        str(Path(tmpdir, "ks", "search_results")),
+    ]
+
+    # Files saved some other way are picked up when we look for them
+    Path(tmpdir, "ks", "other.csv").write_text("a,b")
+    assert cache.exists("ks/other.csv")
+    assert cache.entry("ks/other.csv").size == 3
+
+    # Files that disappear are dropped from the index when read
+    Path(tmpdir, "ks", "records", "2.html").unlink()
+    with pytest.raises(FileNotFoundError):
+        cache.read("ks/records/2.html")
+    assert not cache.exists("ks/records/2.html")
+
+
+def test_exists_after_manual_delete(tmpdir):
+    """Test that a cached file deleted by hand isn't reported as existing."""
+    Cache(tmpdir).write("ne/2021.html", "<h1>Nebraska</h1>")
+    Path(tmpdir, "ne", "2021.html").unlink()
+    cache = Cache(tmpdir)
+    assert not cache.exists("ne/2021.html")
+    assert cache.index.get("ne/2021.html") is None
+    assert cache.get("ne/2021.html") is None
+
+
+def test_index_migrates_sidecars(tmpdir):
+    """Test that validators saved by older versions move into the index."""
+    Path(tmpdir, "il").mkdir()
+    Path(tmpdir, "il", "export.xlsx").write_bytes(b"old")
+    validators = {"url": "https://example.gov/x.xlsx", "etag": '"v0"'}
+    Path(tmpdir, "il", "export.xlsx.meta.json").write_text(json.dumps(validators))
+
+    cache = Cache(tmpdir)
+    entry = cache.entry("il/export.xlsx")
+    assert entry.url == "https://example.gov/x.xlsx"
+    assert entry.etag == '"v0"'
+    assert not Path(tmpdir, "il", "export.xlsx.meta.json").exists()
+    assert cache.files("il") == [str(Path(tmpdir, "il", "export.xlsx"))]
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd", None])
+def test_compression(tmpdir, codec):
+    """Test that compressed and plain entries read back the same."""
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+    policy = CompressionPolicy({".html": codec, ".csv": codec})
+    cache = Cache(tmpdir, compression=policy)
+    html = "<html>" + "<p>Layoffs</p>" * 500 + "</html>"
+    path = Path(cache.write("wi/2020.html", html))
+    assert cache.read("wi/2020.html") == html
+    assert cache.exists("wi/2020.html")
+    assert cache.files("wi") == [str(Path(tmpdir, "wi", "2020.html"))]
+    if codec:
+        # Compressed files keep their name, plus a suffix for the codec
+        assert path.name == "2020.html" + SUFFIXES[codec]
+        assert not Path(tmpdir, "wi", "2020.html").exists()
+        assert path.stat().st_size < len(html) / 5
+    else:
+        assert path.read_text() == html
+
+    # Saving it again under another policy leaves just the one copy
+    Cache(tmpdir, compression=CompressionPolicy({})).write("wi/2020.html", html)
+    assert [p.name for p in Path(tmpdir, "wi").iterdir()] == ["2020.html"]
+    assert cache.read("wi/2020.html") == html
+
+    cache.write("va/source.csv", 'a,b\r\n1,"two\r\nlines"\r\n')
+    assert cache.read_csv("va/source.csv") == [["a", "b"], ["1", "two\nlines"]]
+
+    # The same content under another policy gets its own blob
+    Cache(tmpdir, compression=CompressionPolicy({})).write("wi/copy.html", html)
+    assert cache.read("wi/copy.html") == html
+    assert Path(tmpdir, "wi", "copy.html").read_text() == html
+
+
+def test_freshness_rules():
+    """Test that each kind of rule judges cached files as expected."""
+    now = datetime(2024, 6, 1).timestamp()
+    policy = FreshnessPolicy(
+        [
+            ("sc/*.pdf", RecentYears(2)),
+            ("ia/*", Always()),
+            ("mo/*", TTL(timedelta(days=7))),
+        ]
+    )
+    assert policy.is_fresh(CacheEntry("sc/2022.pdf"), now)
+    assert not policy.is_fresh(CacheEntry("sc/2023.pdf"), now)
+    assert not policy.is_fresh(CacheEntry("sc/latest.pdf"), now)
+    assert not policy.is_fresh(CacheEntry("ia/2010.xlsx", fetched_at=now), now)
+    assert policy.is_fresh(CacheEntry("mo/2019.html", fetched_at=now - 3600), now)
+    assert not policy.is_fresh(CacheEntry("mo/2019.html", fetched_at=now - 8e5), now)
+    # Keys that match no rule are kept forever
+    assert policy.is_fresh(CacheEntry("tx/source.html"), now)
+
+    # A rule that can't judge anything is caught when it's made
+    class Unfinished(Rule):
+        pass
+
+    with pytest.raises(TypeError):
+        Unfinished()
+
+
+def test_get_or_fetch(tmpdir, excel_url):
+    """Test that only stale files are fetched again."""
+    policy = FreshnessPolicy([("il/2019.xlsx", Forever()), ("il/*", Always())])
+    cache = Cache(tmpdir, freshness=policy)
+    old = cache.get_or_fetch("il/2019.xlsx", excel_url)
+    assert old.read_bytes() == b"fake spreadsheet"
+    cache.get_or_fetch("il/2019.xlsx", excel_url)
+    assert len(ExcelHandler.requests_seen) == 1
+
+    # A stale copy is revalidated rather than downloaded again
+    cache.get_or_fetch("il/2024.xlsx", excel_url)
+    cache.get_or_fetch("il/2024.xlsx", excel_url)
+    assert len(ExcelHandler.requests_seen) == 3
+    assert "il/2024.xlsx" in cache.not_modified
+
+
+def test_rewrite_linked_name(tmpdir, excel_url):
+    """Test that saving over a name that shares a blob leaves the other names alone."""
+    cache = Cache(tmpdir)
+    cache.write("il/a.xlsx", b"original")
+    cache.write("il/b.xlsx", b"original")
+    (digest,) = cache.blobs.digests()
+    path = Path(tmpdir, "il", "a.xlsx")
+    assert path.stat().st_nlink > 1
+
+    assert utils.save_if_good_url(path, excel_url)[0]
+    assert path.read_bytes() == b"fake spreadsheet"
+    assert cache.blobs.path(digest).read_bytes() == b"original"
+    assert cache.read("il/b.xlsx") == "original"
+
+
+class TruncatedHandler(BaseHTTPRequestHandler):
+    """Serve a file that's cut off partway through."""
+
+    def do_GET(self):
+        """Promise more than is sent, then hang up."""
+        self.send_response(200)
+        self.send_header("Content-Length", "1000")
+        self.end_headers()
+        self.wfile.write(b"only part of it")
+        self.close_connection = True
+
+    def log_message(self, *args):
+        """Keep the test output quiet."""
+        pass
+
+
+def test_download_incomplete(tmpdir, excel_url, http_server):
+    """Test that a cut-off download never replaces the cached file."""
+    cache = Cache(tmpdir)
+    path = cache.download("il/export.xlsx", excel_url)
+
+    url = http_server(TruncatedHandler) + "/export.xlsx"
+    with pytest.raises((IncompleteDownloadError, ChunkedEncodingError)):
+        cache.download("il/export.xlsx", url, conditional=False)
+    assert path.read_bytes() == b"fake spreadsheet"
+    assert not list(cache.blobs.root.glob("tmp/*"))
+
+    # The path-based helpers don't save a cut-off file either
+    utils.fetch_if_not_cached(Path(tmpdir, "il", "helper.xlsx"), url)
+    assert not Path(tmpdir, "il", "helper.xlsx").exists()
+    assert not list(Path(tmpdir, "il").glob(".*.tmp"))
+
+    # A file that was cut short some other way is fetched again
+    path.unlink()
+    path.write_bytes(b"fake")
+    assert not cache.is_fresh("il/export.xlsx")
+    cache.get_or_fetch("il/export.xlsx", excel_url)
+    assert path.read_bytes() == b"fake spreadsheet"
+
+
+class LockCheckHandler(BaseHTTPRequestHandler):
+    """Serve a file, noting whether its cache lock was free while it was sent."""
+
+    lock_path: Path
+    lock_was_free: list = []
+
+    def do_GET(self):
+        """Try the lock from the server's thread, then respond."""
+        try:
+            with FileLock(self.lock_path, timeout=0.2):
+                self.lock_was_free.append(True)
+        except LockTimeout:
+            self.lock_was_free.append(False)
+        self.send_response(200)
+        self.send_header("Content-Length", "4")
+        self.end_headers()
+        self.wfile.write(b"data")
+
+    def log_message(self, *args):
+        """Keep the test output quiet."""
+        pass
+
+
+def test_download_lock(tmpdir, http_server):
+    """Test that a download only holds its lock after the transfer."""
+    cache = Cache(tmpdir, freshness=FreshnessPolicy([("il/*", Always())]))
+    LockCheckHandler.lock_path = cache.lock("il/export.xlsx").path
+    LockCheckHandler.lock_was_free = []
+    url = http_server(LockCheckHandler) + "/export.xlsx"
+    cache.download("il/export.xlsx", url)
+    cache.get_or_fetch("il/export.xlsx", url)
+    assert LockCheckHandler.lock_was_free == [True, True]
+    assert cache.read("il/export.xlsx") == "data"
+
+
+def test_concurrent_writes(tmpdir):
+    """Test that racing writers leave a file and index entry that agree."""
+    cache = Cache(tmpdir)
+    contents = [f"<p>version {i}</p>" * 100 for i in range(8)]
+    threads = [
+        threading.Thread(target=cache.write, args=("ca/page.html", c))
+        for c in contents * 4
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    html = cache.read("ca/page.html")
+    assert html in contents
+    assert cache.entry("ca/page.html").digest == sha256(html.encode())
+    assert cache.is_complete("ca/page.html")
+    assert not list(Path(tmpdir, "ca").glob(".*"))
+
+
+def test_lock(tmpdir):
+    """Test that a lock keeps out other threads but lets its holder back in."""
+    lock_path = Path(tmpdir, "a.lock")
+    held = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with FileLock(lock_path):
+            with FileLock(lock_path):
+                held.set()
+                release.wait(5)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    held.wait(5)
+    with pytest.raises(LockTimeout):
+        with FileLock(lock_path, timeout=0.2):
+            pass
+    release.set()
+    thread.join()
+    with FileLock(lock_path, timeout=1):
+        pass
+
+
+def test_memory_tier(tmpdir):
+    """Test that recently used files are served from memory, within its size limit."""
+    policy = FreshnessPolicy([("ia/*", Always())])
+    cache = Cache(tmpdir, freshness=policy, memory_limit=250)
+    for name in ["a", "b", "c"]:
+        cache.write(f"ks/{name}.html", name * 100)
+    assert "ks/a.html" not in cache.memory
+    assert cache.memory.size == 200
+
+    # Held files don't need the disk
+    Path(tmpdir, "ks", "c.html").unlink()
+    assert cache.get("ks/c.html") == "c" * 100
+    assert cache.memory.hits == 1
+
+    # Files read from disk are held too, pushing out the least recently used
+    assert cache.get("ks/a.html") == "a" * 100
+    assert cache.read("ks/a.html") == "a" * 100
+    assert "ks/b.html" not in cache.memory
+    assert cache.memory.hits == 2
+
+    # Missing and stale files aren't served
+    assert cache.get("ks/missing.html") is None
+    cache.write("ia/page.html", "<p>Stale</p>")
+    assert cache.get("ia/page.html") is None
+    assert cache.get("ia/page.html", fresh=False) == "<p>Stale</p>"
@@ -0,0 +1,115 @@
+import io
+import zipfile
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from warn import cache_archive
+from warn.cache import Cache
+from warn.cli import main
+
+
+@pytest.fixture
+def packed(tmp_path):
+    """Pack a cache with a nested site cache into an archive."""
+    source = tmp_path / "source"
+    cache = Cache(str(source))
+    cache.write("ia/2021.html", "<h1>Iowa</h1>")
+    cache.write("ia/copy.html", "<h1>Iowa</h1>")
+    cache.write("ia/2021.pdf", b"%PDF-1.4 Iowa")
+    site = Cache(str(source / "ks"))
+    site.write("records/1.html", "<p>Kansas</p>")
+    cache.index.close()
+    site.index.close()
+    archive_path = tmp_path / "warn-cache.zip"
+    assert cache_archive.export(source, archive_path) == 4
+    return archive_path
+
+
+@pytest.fixture(autouse=True)
+def detached():
+    """Make sure no test leaves an archive attached."""
+    yield
+    cache_archive.detach()
+
+
+def test_export_and_unpack(tmp_path, packed):
+    """Test that an archive stores each payload once and unpacks into the right caches."""
+    with zipfile.ZipFile(packed) as zf:
+        blobs = [n for n in zf.namelist() if n.startswith(cache_archive.BLOB_PREFIX)]
+    assert len(blobs) == 3
+
+    archive = cache_archive.CacheArchive(packed)
+    assert archive.keys("ia/") == ["ia/2021.html", "ia/2021.pdf", "ia/copy.html"]
+    assert archive.caches == ["ks/"]
+    archive.close()
+
+    target = tmp_path / "target"
+    assert cache_archive.unpack(packed, target) == 4
+    cache = Cache(str(target))
+    assert cache.read("ia/copy.html") == "<h1>Iowa</h1>"
+    assert Path(target, "ia", "2021.pdf").read_bytes() == b"%PDF-1.4 Iowa"
+    assert (
+        cache.entry("ia/2021.html").digest
+        == Cache(str(tmp_path / "source")).entry("ia/2021.html").digest
+    )
+    assert Cache(str(target / "ks")).read("records/1.html") == "<p>Kansas</p>"
+
+    # Files the cache already has are left alone unless asked
+    assert cache_archive.unpack(packed, target) == 0
+    assert cache_archive.unpack(packed, target, overwrite=True) == 4
+
+
+def test_read_in_place(tmp_path, packed):
+    """Test that a cache reads what it's missing straight out of an attached archive."""
+    target = tmp_path / "target"
+    cache_archive.attach(packed, target)
+    cache = Cache(str(target))
+    assert cache.is_fresh("ia/2021.pdf")
+    assert cache.get("ia/2021.html") == "<h1>Iowa</h1>"
+    assert cache.files("ia") == [
+        str(target / "ia" / "2021.html"),
+        str(target / "ia" / "2021.pdf"),
+        str(target / "ia" / "copy.html"),
+    ]
+    assert Cache(str(target / "ks")).read("records/1.html") == "<p>Kansas</p>"
+    # Text reads don't touch the disk
+    assert not (target / "ia").exists()
+
+    # Reading by path copies out just the one file
+    path = cache.get_or_fetch("ia/2021.pdf", "https://example.com/2021.pdf")
+    assert path.read_bytes() == b"%PDF-1.4 Iowa"
+    assert Cache(str(target)).index.keys() == ["ia/2021.pdf"]
+    assert cache.exists("ia/2021.html")
+    assert (target / "ia" / "2021.html").is_file()
+
+    cache_archive.detach()
+    assert not Cache(str(target)).exists("ia/copy.html")
+
+    # Archives can't be changed
+    with pytest.raises(io.UnsupportedOperation):
+        cache_archive.CacheArchive(packed).remove("ia/2021.pdf")
+
+
+def test_cache_commands(tmp_path, packed):
+    """Test the cache export and import subcommands."""
+    runner = CliRunner()
+    target = tmp_path / "target"
+    result = runner.invoke(
+        main, ["cache", "import", str(packed), "--cache-dir", str(target)]
+    )
+    assert result.exit_code == 0, result.output
+    assert Cache(str(target)).read("ia/2021.html") == "<h1>Iowa</h1>"
+
+    repacked = tmp_path / "repacked.zip"
+    result = runner.invoke(
+        main, ["cache", "export", str(repacked), "--cache-dir", str(target)]
+    )
+    assert result.exit_code == 0, result.output
+    assert cache_archive.CacheArchive(repacked).keys() == [
+        "ia/2021.html",
+        "ia/2021.pdf",
+        "ia/copy.html",
+        "ks/records/1.html",
+    ]
@@ -0,0 +1,118 @@
+import os
+import sqlite3
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from warn.cache import Cache
+from warn.cache_gc import collect, parse_size
+from warn.cli import main
+from warn.compression import CompressionPolicy
+
+NOW = 1_700_000_000.0
+DAY = 24 * 60 * 60
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Fill a cache with files last used one to four days ago."""
+    cache = Cache(tmp_path, compression=CompressionPolicy({}))
+    cache.write("ia/2019.pdf", "a" * 1000)
+    cache.write("ia/old.html", "b" * 1000)
+    cache.write("ia/older.html", "c" * 1000)
+    cache.write("ia/copy.html", "c" * 1000)
+    cache.write("ia/new.html", "d" * 1000)
+    cache.index.close()
+    last_used = {
+        "ia/2019.pdf": 4,
+        "ia/older.html": 3,
+        "ia/copy.html": 3,
+        "ia/old.html": 2,
+        "ia/new.html": 1,
+    }
+    with sqlite3.connect(str(tmp_path / ".index.sqlite3")) as conn:
+        for key, days in last_used.items():
+            conn.execute(
+                "UPDATE entries SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+                (NOW - days * DAY, NOW - days * DAY, key),
+            )
+    for digest in cache.blobs.digests():
+        os.utime(cache.blobs.path(digest), (NOW - 5 * DAY, NOW - 5 * DAY))
+    return cache
+
+
+def test_collect_by_size(cache):
+    """Test that the least recently used files go first, pins stay and blobs are freed."""
+    result = collect(Path(cache.path), max_size=3000, now=NOW)
+    # The two copies share a blob, so both go before any space is freed
+    assert result.evicted == ["ia/copy.html", "ia/older.html"]
+    assert result.size_before == 4000
+    assert result.size_after == 3000
+    assert result.blobs_removed == 1
+    assert not Path(cache.path, "ia", "older.html").exists()
+    assert Path(cache.path, "ia", "2019.pdf").exists()
+    assert not Cache(cache.path).exists("ia/copy.html")
+    assert len(list(cache.blobs.digests())) == 3
+
+    # The pin holds even when the cache can't otherwise get under the limit
+    result = collect(Path(cache.path), max_size=0, now=NOW)
+    assert result.evicted == ["ia/old.html", "ia/new.html"]
+    assert Path(cache.path, "ia", "2019.pdf").exists()
+
+
+def test_collect_by_age(cache):
+    """Test that files unused for too long are evicted, unless it's a dry run."""
+    result = collect(Path(cache.path), max_age=2.5 * DAY, dry_run=True, now=NOW)
+    assert result.evicted == ["ia/copy.html", "ia/older.html"]
+    assert result.freed == 1000
+    assert Path(cache.path, "ia", "older.html").exists()
+
+    result = collect(Path(cache.path), max_age=1.5 * DAY, pins=[], now=NOW)
+    assert result.evicted == [
+        "ia/2019.pdf",
+        "ia/copy.html",
+        "ia/older.html",
+        "ia/old.html",
+    ]
+    assert Cache(cache.path).files("ia") == [str(Path(cache.path, "ia", "new.html"))]
+
+
+def test_collect_spares_new_blobs(cache):
+    """Test that a blob saved moments ago survives, since a writer may be about to link it."""
+    new_blob = cache.blobs.put(b"e" * 1000, "e" * 64)
+    old_blob = cache.blobs.put(b"f" * 1000, "f" * 64)
+    os.utime(cache.blobs.path(old_blob), (NOW - DAY, NOW - DAY))
+    os.utime(cache.blobs.path(new_blob), (NOW - 60, NOW - 60))
+    result = collect(Path(cache.path), now=NOW)
+    assert result.blobs_removed == 1
+    assert result.freed == 1000
+    assert cache.blobs.has(new_blob)
+    assert not cache.blobs.has(old_blob)
+
+
+def test_gc_command(cache):
+    """Test the cache gc subcommand, and that scraping is still the default command."""
+    runner = CliRunner()
+    result = runner.invoke(
+        main, ["cache", "gc", "--cache-dir", cache.path, "--max-size", "2KB"]
+    )
+    assert result.exit_code == 0, result.output
+    assert Cache(cache.path).files("ia") == [
+        str(Path(cache.path, "ia", "2019.pdf")),
+        str(Path(cache.path, "ia", "new.html")),
+    ]
+
+    result = runner.invoke(main, ["--help"])
+    assert "scrape" in result.output and "cache" in result.output
+    result = runner.invoke(main, ["ia", "--help"])
+    assert "SCRAPERS" in result.output
+
+
+def test_parse_size():
+    """Test reading human-friendly sizes."""
+    assert parse_size("500") == 500
+    assert parse_size("2KB") == 2048
+    assert parse_size("1.5 g") == int(1.5 * 1024**3)
+    with pytest.raises(ValueError):
+        parse_size("lots")
@@ -0,0 +1,86 @@
+import json
+
+from click.testing import CliRunner
+
+from warn import cache_stats, report
+from warn.cache import Cache
+from warn.cli import main
+from warn.freshness import Always, FreshnessPolicy
+from warn.platforms.job_center.cache import Cache as JobCenterCache
+from warn.report import RunReport
+
+
+def test_cache_counts(tmp_path):
+    """Test that hits, misses, refreshes and bytes are counted for each namespace."""
+    cache = Cache(
+        str(tmp_path), freshness=FreshnessPolicy([("ia/latest.html", Always())])
+    )
+    site = JobCenterCache(str(tmp_path / "ks"))
+    run = RunReport("zz")
+    with report.track(run):
+        # Nothing's cached, so it's fetched and saved
+        assert cache.get("ia/2019.html") is None
+        cache.write("ia/2019.html", "<h1>Iowa</h1>")
+        # Now it's a hit
+        assert cache.get("ia/2019.html") == "<h1>Iowa</h1>"
+        assert cache.is_fresh("ia/2019.html")
+        # A copy that's always stale is fetched again
+        cache.write("ia/latest.html", "<h1>Old</h1>")
+        assert not cache.is_fresh("ia/latest.html")
+        cache.write("ia/latest.html", "<h1>New</h1>")
+        # Job Center pages count toward the site's folder
+        site.write("records/1.html", "<p>Kansas</p>")
+        assert site.get("records/1.html") == "<p>Kansas</p>"
+
+    data = run.to_dict()
+    assert data["cache"]["ia"] == {
+        "hits": 2,
+        "misses": 2,
+        "refreshes": 1,
+        "bytes_read": 13,
+        "bytes_written": 37,
+        "io_time": data["cache"]["ia"]["io_time"],
+    }
+    assert data["cache"]["ia"]["io_time"] > 0
+    assert data["cache"]["ks"]["hits"] == 1
+    assert data["cache"]["ks"]["misses"] == 1
+    assert data["cache_hits"] == 3
+
+
+def test_stats_command(tmp_path):
+    """Test that cache stats adds up the run reports and the cache's contents."""
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    runs = [
+        {"state": "ia", "cache": {"ia": {"hits": 3, "misses": 1, "bytes_read": 100}}},
+        {"state": "ks", "cache": {"ks": {"hits": 1, "refreshes": 1, "io_time": 0.5}}},
+    ]
+    for run in runs:
+        (log_dir / f"{run['state']}.json").write_text(json.dumps(run))
+    with open(log_dir / "runs.jsonl", "w") as fh:
+        for run in runs + runs:
+            fh.write(json.dumps(run) + "\n")
+
+    cache_dir = tmp_path / "cache"
+    Cache(str(cache_dir)).write("ia/2019.html", "<h1>Iowa</h1>")
+    JobCenterCache(str(cache_dir / "ks")).write("records/1.html", "<p>Kansas</p>")
+
+    counts = cache_stats.from_log_dir(log_dir)
+    assert counts["ia"].hit_rate == 0.75
+    assert counts["ks"].refreshes == 1
+    assert cache_stats.from_log_dir(log_dir, all_runs=True)["ia"].hits == 6
+    assert list(cache_stats.from_log_dir(log_dir, states=["KS"])) == ["ks"]
+    assert [n for n, (files, _) in cache_stats.disk_usage(cache_dir).items()] == [
+        "ia",
+        "ks",
+    ]
+
+    result = CliRunner().invoke(
+        main,
+        ["cache", "stats", "--log-dir", str(log_dir), "--cache-dir", str(cache_dir)],
+    )
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    assert lines[0].split()[:4] == ["namespace", "hits", "misses", "refreshes"]
+    assert lines[1].split()[:5] == ["ia", "3", "1", "0", "75%"]
+    assert lines[-1].split()[:5] == ["total", "4", "1", "1", "67%"]
@@ -0,0 +1,228 @@
+import hashlib
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+import pytest
+
+from warn import cache_storage
+from warn.cache import Cache
+from warn.cache_index import CacheEntry
+from warn.cache_storage import FileStorage, S3Storage, SQLiteStorage, Storage
+from warn.platforms.job_center.cache import Cache as JobCenterCache
+
+
+class S3Handler(BaseHTTPRequestHandler):
+    """Stand in for an S3 bucket, checking that requests are signed."""
+
+    objects: dict = {}
+    page_size = 2
+
+    def do_PUT(self):
+        """Save an object and its metadata."""
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if not self._signed(body):
+            return
+        meta = self.headers.get(cache_storage.S3_ENTRY_HEADER)
+        self.objects[self._key()] = (body, meta)
+        self._send(200)
+
+    def do_HEAD(self):
+        """Describe an object."""
+        if self._signed() and not self._missing():
+            body, meta = self.objects[self._key()]
+            self._send(200, length=len(body), meta=meta)
+
+    def do_GET(self):
+        """Send an object, or list the bucket."""
+        if not self._signed():
+            return
+        parts = urlsplit(self.path)
+        if parts.path.count("/") == 1:
+            return self._list(parse_qs(parts.query))
+        if not self._missing():
+            body, meta = self.objects[self._key()]
+            self._send(200, body, meta=meta)
+
+    def do_DELETE(self):
+        """Drop an object."""
+        if self._signed():
+            self.objects.pop(self._key(), None)
+            self._send(204)
+
+    def _list(self, query):
+        """List keys a page at a time."""
+        prefix = query.get("prefix", [""])[0]
+        after = query.get("continuation-token", [""])[0]
+        keys = sorted(k for k in self.objects if k.startswith(prefix) and k > after)
+        page = keys[: self.page_size]
+        xml = "".join(f"<Contents><Key>{escape(k)}</Key></Contents>" for k in page)
+        if len(keys) > len(page):
+            xml += "<IsTruncated>true</IsTruncated>"
+            xml += f"<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>"
+        body = (
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            f"{xml}</ListBucketResult>"
+        ).encode("utf-8")
+        self._send(200, body)
+
+    def _key(self):
+        """Get the requested object's key, without the bucket."""
+        return unquote(urlsplit(self.path).path).split("/", 2)[2]
+
+    def _missing(self):
+        """Send a 404 if the requested object doesn't exist."""
+        if self._key() in self.objects:
+            return False
+        self._send(404)
+        return True
+
+    def _signed(self, body=b""):
+        """Turn away requests that aren't signed, or whose body doesn't match its hash."""
+        auth = self.headers.get("Authorization", "")
+        sha = self.headers.get("x-amz-content-sha256")
+        if not auth.startswith("AWS4-HMAC-SHA256 Credential=test/"):
+            self._send(403)
+            return False
+        if sha != hashlib.sha256(body).hexdigest():
+            self._send(400)
+            return False
+        return True
+
+    def _send(self, status, body=b"", length=None, meta=None):
+        """Send a response."""
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body) if length is None else length))
+        if meta:
+            self.send_header(cache_storage.S3_ENTRY_HEADER, meta)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Keep the test output quiet."""
+        pass
+
+
+@pytest.fixture
+def s3_endpoint(http_server):
+    """Start a local stand-in for an S3 server."""
+    S3Handler.objects = {}
+    return http_server(S3Handler)
+
+
+@pytest.fixture(params=["file", "sqlite", "s3"])
+def storage(request, tmp_path):
+    """Get each kind of store."""
+    if request.param == "file":
+        store = FileStorage(tmp_path / "shared")
+    elif request.param == "sqlite":
+        store = SQLiteStorage(tmp_path / "shared.sqlite3")
+    else:
+        endpoint = request.getfixturevalue("s3_endpoint")
+        store = S3Storage(
+            "warn", "cache", endpoint=endpoint, access_key="test", secret_key="x"
+        )
+    yield store
+    store.close()
+    cache_storage.detach()
+
+
+def test_storage(tmp_path, storage):
+    """Test that every store saves, lists, reads and drops files the same way."""
+    path = tmp_path / "2021.pdf"
+    path.write_bytes(b"%PDF-1.4 Iowa")
+    entry = CacheEntry(
+        "ia/2021.pdf", url="https://example.com/2021.pdf", fetched_at=1.0, etag='"1"'
+    )
+    assert storage.entry("ia/2021.pdf") is None
+    storage.save("ia/2021.pdf", path, entry)
+    storage.save("ia/new page.html", path, CacheEntry("ia/new page.html"))
+    storage.save("ia/z/2022.pdf", path, CacheEntry("ia/z/2022.pdf"))
+    storage.save("ks/1.html", path, CacheEntry("ks/1.html"))
+
+    found = storage.entry("ia/2021.pdf")
+    assert (found.url, found.fetched_at, found.etag, found.size) == (
+        entry.url,
+        1.0,
+        '"1"',
+        13,
+    )
+    assert storage.contains("ia/new page.html")
+    assert storage.keys("ia/") == ["ia/2021.pdf", "ia/new page.html", "ia/z/2022.pdf"]
+    assert storage.read("ia/2021.pdf") == b"%PDF-1.4 Iowa"
+    with storage.open("ks/1.html") as fh:
+        assert fh.read() == b"%PDF-1.4 Iowa"
+    with pytest.raises(KeyError):
+        storage.read("ia/missing.pdf")
+
+    storage.remove("ia/2021.pdf")
+    assert not storage.contains("ia/2021.pdf")
+    assert storage.keys("ia/") == ["ia/new page.html", "ia/z/2022.pdf"]
+
+
+def test_shared_cache(tmp_path, storage):
+    """Test that caches in separate folders share what they save through a store."""
+    first = tmp_path / "first"
+    cache_storage.attach(storage, first)
+    cache = Cache(str(first))
+    cache.write("ia/2021.html", "<h1>Iowa</h1>")
+    JobCenterCache(str(first / "ks")).write("records/1.html", "<p>Kansas</p>")
+    fetched_at = cache.entry("ia/2021.html").fetched_at
+
+    # A runner with an empty folder reads from the store, without copying text files in
+    second = tmp_path / "second"
+    cache_storage.attach(storage, second)
+    cache = Cache(str(second))
+    assert cache.get("ia/2021.html") == "<h1>Iowa</h1>"
+    assert cache.entry("ia/2021.html").fetched_at == fetched_at
+    assert cache.files("ia") == [str(second / "ia" / "2021.html")]
+    assert (
+        JobCenterCache(str(second / "ks")).fetch(
+            "https://example.com/warn_lookups/1", None
+        )
+        == "<p>Kansas</p>"
+    )
+    assert not (second / "ia").exists()
+
+    # Callers that open files by path get a local copy
+    path = cache.get_or_fetch("ia/2021.html", "https://example.com/2021.html")
+    assert path.is_file()
+    assert cache.read("ia/2021.html") == "<h1>Iowa</h1>"
+
+
+def test_from_url(tmp_path):
+    """Test opening stores from URLs."""
+    assert isinstance(cache_storage.from_url(str(tmp_path)), FileStorage)
+    assert cache_storage.from_url(f"file://{tmp_path}").root == tmp_path
+    store = cache_storage.from_url(f"sqlite://{tmp_path}/cache.sqlite3")
+    assert store.path == Path(tmp_path, "cache.sqlite3")
+    store = cache_storage.from_url(
+        "s3://warn/shared/cache?endpoint=http://localhost:9000&region=us-west-2"
+    )
+    assert (store.bucket, store.prefix, store.endpoint, store.region) == (
+        "warn",
+        "shared/cache/",
+        "http://localhost:9000",
+        "us-west-2",
+    )
+    with pytest.raises(ValueError):
+        cache_storage.from_url("ftp://example.com/cache")
+
+
+def test_incomplete_storage():
+    """Test that a store missing part of the interface fails when it's made."""
+
+    class ReadOnly(Storage):
+        def entry(self, key):
+            return None
+
+        def keys(self, prefix=""):
+            return []
+
+        def read(self, key):
+            raise KeyError(key)
+
+    with pytest.raises(TypeError):
+        ReadOnly()
@@ -1,9 +1,16 @@
+import gzip
 import re
+import urllib.parse
 from pathlib import Path
 
 import pytest
+import yaml
+from bs4 import BeautifulSoup
 
+from warn import aio
 from warn.platforms import JobCenterSite
+from warn.platforms.job_center import site as site_module
+from warn.platforms.job_center import utils as job_center_utils
 
 
 @pytest.fixture
@@ -140,3 +147,203 @@ def test_cached_detail_pages(tmp_path):
     assert len(record_files) == 2
     assert Path(cache_dir, "records").exists()
     assert Path(cache_dir, "search_results").exists()
+
+
+@pytest.fixture
+def cached_site(tmp_path, monkeypatch):
+    """Create an Oklahoma site with two pages of search results cached for 2020.
+
+    Detail pages are served by a stand-in for aio.fetch_all, which logs each batch
+    and answers with the status in site.statuses, 200 by default.
+    """
+    url = "https://okjobmatch.com/search/warn_lookups"
+    site = JobCenterSite("OK", url, cache_dir=str(tmp_path / "ok"), per_host=3)
+    params = site._search_kwargs("2020-01-01", "2020-12-31")
+    rows = "".join(
+        f'<tr><td><a href="/search/warn_lookups/{n}">Employer {n}</a></td>'
+        "<td>Tulsa</td><td>74014</td><td>12</td><td>Jan 1, 2020</td><td>WARN</td></tr>"
+        for n in range(1, 7)
+    )
+    header = "<tr><th>Employer</th></tr>"
+    query = urllib.parse.urlencode(params) + "&page=2"
+    page_two = f"{url}?{query}"
+    site.cache.write(
+        site.cache.key_from_url(url, params),
+        f"<table>{header}{rows[: len(rows) // 2]}</table>"
+        + f'<a class="next_page" href="/search/warn_lookups?{query}">Next</a>',
+    )
+    site.cache.write(
+        site.cache.key_from_url(page_two),
+        f"<table>{header}{rows[len(rows) // 2 :]}</table>",
+    )
+    # One record is already cached
+    site.cache.save(f"{url}/2", None, "<dd>cached</dd>")
+
+    site.calls = []
+    site.statuses = {}
+
+    def fetch_all(urls, **kwargs):
+        site.calls.append((list(urls), kwargs))
+        return [
+            aio.AsyncResponse(
+                u,
+                site.statuses.get(u, 200),
+                {},
+                f"<p>{u.rsplit('/', 1)[-1]}</p>".encode(),
+            )
+            for u in urls
+        ]
+
+    monkeypatch.setattr(aio, "fetch_all", fetch_all)
+    return site
+
+
+def test_detail_pages_fetched_together(cached_site):
+    """Test that the detail pages of every search results page go out in one bounded batch."""
+    _, data = cached_site.scrape(start_date="2020-01-01", end_date="2020-12-31")
+
+    assert len(cached_site.calls) == 1
+    fetched, kwargs = cached_site.calls[0]
+    url = cached_site.url
+    assert fetched == [f"{url}/{n}" for n in (1, 3, 4, 5, 6)]
+    assert kwargs["per_host"] == 3
+    assert [row["detail"]["record_number"] for row in data] == list("123456")
+    assert data[1]["detail"]["html"] == "<dd>cached</dd>"
+    assert data[4]["detail"]["html"] == "<p>5</p>"
+
+
+def test_detail_page_errors(cached_site, monkeypatch):
+    """Test that a detail page the site failed to send isn't cached, and the scrape goes on."""
+    failing = f"{cached_site.url}/3"
+    cached_site.statuses[failing] = 404
+    _, data = cached_site.scrape(start_date="2020-01-01", end_date="2020-12-31")
+    assert len(data) == 6
+    assert data[2]["detail"]["company_name"] == ""
+    assert data[2]["detail"]["record_number"] == "3"
+    assert data[3]["detail"]["html"] == "<p>4</p>"
+    assert cached_site.cache.get("records/1.html") == "<p>1</p>"
+    assert cached_site.cache.get("records/3.html") is None
+
+    # The next scrape asks for it again
+    cached_site.statuses.clear()
+    _, data = cached_site.scrape(start_date="2020-01-01", end_date="2020-12-31")
+    assert cached_site.calls[-1][0] == [failing]
+    assert data[2]["detail"]["html"] == "<p>3</p>"
+
+    # The scrape gives up once most of the pages fail
+    for n in range(1, 5):
+        cached_site.statuses[f"{cached_site.url}/{n}"] = 503
+    get_page = cached_site._get_page
+    monkeypatch.setattr(
+        cached_site, "_get_page", lambda *args, **kw: (get_page(*args, **kw)[0], False)
+    )
+    with pytest.raises(site_module.DetailPageError):
+        cached_site.scrape(start_date="2020-01-01", end_date="2020-12-31")
+
+
+def test_iter_rows(cached_site, monkeypatch, tmp_path):
+    """Test that rows stream out a batch at a time and are written as they come."""
+    monkeypatch.setattr(site_module, "DETAIL_BATCH_SIZE", 3)
+    rows = cached_site.iter_rows(start_date="2020-01-01", end_date="2020-12-31")
+    assert next(rows)["employer"] == "Employer 1"
+    # Only the first page's detail pages have been requested so far
+    assert len(cached_site.calls) == 1
+    assert [row["employer"] for row in rows] == [f"Employer {n}" for n in range(2, 7)]
+    assert len(cached_site.calls) == 2
+
+    output_csv = tmp_path / "ok_raw.csv"
+    headers = ["employer", "record_number", "number_of_employees_affected", "address"]
+    headers += ["notice_date", "warn_type", "city", "zip", "lwib_area"]
+    headers += ["detail_page_url"]
+    job_center_utils._scrape_years(
+        cached_site, output_csv, headers, [("2020-01-01", "2020-12-31")]
+    )
+    lines = output_csv.read_text().splitlines()
+    assert lines[0].startswith('Employer 1,1,,,"Jan 1, 2020",WARN,Tulsa,')
+    assert len(lines) == 6
+
+
+def test_lean_scrape(cached_site):
+    """Test that a lean scrape returns slotted records and keeps no HTML."""
+    html_store, data = cached_site.scrape(
+        start_date="2020-01-01", end_date="2020-12-31", lean=True
+    )
+    assert html_store == {}
+    assert [record.record_number for record in data] == list("123456")
+    first = data[0]
+    assert isinstance(first, site_module.Record)
+    assert (first.employer, first.city, first.address) == ("Employer 1", "Tulsa", "")
+    assert not hasattr(first, "__dict__")
+
+
+def test_incremental_sync(cached_site, monkeypatch):
+    """Test that incremental scrapes only refetch detail pages of new, changed or old records."""
+    cached_site.incremental = True
+    # Treat the search results as though they were just fetched
+    get_page = cached_site._get_page
+    monkeypatch.setattr(
+        cached_site, "_get_page", lambda *args, **kw: (get_page(*args, **kw)[0], False)
+    )
+    dates = {"start_date": "2020-01-01", "end_date": "2020-12-31"}
+
+    # Every record is new the first time, and one whose page fails isn't indexed
+    cached_site.statuses[f"{cached_site.url}/4"] = 503
+    cached_site.scrape(**dates)
+    assert len(cached_site.calls[-1][0]) == 6
+    assert sorted(cached_site.records.get_many(list("123456"))) == list("12356")
+    cached_site.statuses.clear()
+    cached_site.scrape(**dates)
+    assert cached_site.calls[-1][0] == [f"{cached_site.url}/4"]
+    known = cached_site.records.get_many(list("123456"))
+    assert sorted(known) == list("123456")
+
+    # Nothing has changed the next time
+    _, data = cached_site.scrape(**dates)
+    assert len(cached_site.calls) == 2
+    assert data[4]["detail"]["html"] == "<p>5</p>"
+
+    # A row whose fields changed is refetched
+    key = cached_site.cache.key_from_url(
+        cached_site.url, cached_site._search_kwargs(**dates)
+    )
+    html = cached_site.cache.read(key)
+    cached_site.cache.write(key, html.replace("Employer 2", "Employer Two"))
+    _, data = cached_site.scrape(**dates)
+    assert cached_site.calls[-1][0] == [f"{cached_site.url}/2"]
+    assert data[1]["employer"] == "Employer Two"
+
+    # And every record is refetched once its detail page is old enough
+    cached_site.refresh_after = 0
+    cached_site.scrape(**dates)
+    assert len(cached_site.calls[-1][0]) == 6
+
+
+def _recorded_search_results():
+    """Get every search results page recorded in the cassettes."""
+    pages = []
+    for path in sorted(Path(__file__).parent.joinpath("cassettes").glob("*.yaml")):
+        for interaction in yaml.safe_load(path.read_text())["interactions"]:
+            if "?" in interaction["request"]["uri"]:
+                body = interaction["response"]["body"]["string"]
+                pages.append(gzip.decompress(body).decode("utf-8"))
+    return pages
+
+
+@pytest.mark.parametrize("parser", ["html.parser", "lxml"])
+def test_parse_search_results(ks_site, monkeypatch, parser):
+    """Test that the single-pass parser matches a full parse of the recorded pages."""
+    if parser == "lxml":
+        pytest.importorskip("lxml")
+    monkeypatch.setattr(site_module, "SEARCH_RESULTS_PARSER", parser)
+    pages = _recorded_search_results()
+    assert len(pages) == 8
+    for html in pages:
+        soup = BeautifulSoup(html, "html.parser")
+        rows = [ks_site._extract_search_results_row(r) for r in soup.find_all("tr")[1:]]
+        next_page = soup.find("a", class_="next_page")
+        expected = ks_site._build_page_url(next_page["href"]) if next_page else None
+        if not rows and "no matches for your search results" in soup.text:
+            with pytest.raises(site_module.NoSearchResultsError):
+                ks_site._parse_search_results(html)
+        else:
+            assert ks_site._parse_search_results(html) == (rows, expected)
@@ -0,0 +1,60 @@
+from warn import manifest
+from warn.cache import Cache
+from warn.manifest import Manifest
+
+
+def _run(cache_dir, output_path, content, code="v1"):
+    """Simulate a scrape that fetches one page and checks the manifest."""
+    tracker = Manifest(cache_dir)
+    with tracker.track("xx", code=code) as inputs:
+        Cache(cache_dir).write("xx/source.html", "<h1>index</h1>")
+        Cache(cache_dir).write("xx/data.html", content)
+        unchanged = manifest.inputs_unchanged(output_path, ignore=["xx/source.html"])
+        if not unchanged:
+            output_path.write_text(content)
+    tracker.save("xx", inputs, output_path)
+    return unchanged
+
+
+def test_unchanged_inputs_skip_the_rewrite(tmp_path):
+    """Test that only a rerun with identical inputs and code is skipped."""
+    output_path = tmp_path / "xx.csv"
+    assert not _run(tmp_path, output_path, "<h1>one</h1>")
+    assert _run(tmp_path, output_path, "<h1>one</h1>")
+    assert not _run(tmp_path, output_path, "<h1>two</h1>")
+    assert not _run(tmp_path, output_path, "<h1>two</h1>", code="v2")
+
+    # A missing output file is always regenerated
+    output_path.unlink()
+    assert not _run(tmp_path, output_path, "<h1>two</h1>", code="v2")
+
+
+def test_untracked_runs_never_skip(tmp_path):
+    """Test that scrapers run outside the Runner always do the full job."""
+    output_path = tmp_path / "xx.csv"
+    output_path.write_text("")
+    Cache(tmp_path).write("xx/data.html", "<h1>one</h1>")
+    assert not manifest.inputs_unchanged(output_path)
+
+
+def test_shared_code_changes_the_code_hash(tmp_path):
+    """Test that editing a shared helper, but not another scraper, changes a scraper's code hash."""
+    package_dir = tmp_path / "warn"
+    (package_dir / "scrapers").mkdir(parents=True)
+    (package_dir / "platforms").mkdir()
+    scraper = package_dir / "scrapers" / "xx.py"
+    scraper.write_text("def scrape(): pass\n")
+    (package_dir / "scrapers" / "yy.py").write_text("def scrape(): pass\n")
+    (package_dir / "utils.py").write_text("def parse(): pass\n")
+    (package_dir / "platforms" / "site.py").write_text("class Site: pass\n")
+    code = manifest.code_sha256(scraper, package_dir)
+
+    (package_dir / "scrapers" / "yy.py").write_text("def scrape(): return 1\n")
+    assert manifest.code_sha256(scraper, package_dir) == code
+
+    (package_dir / "utils.py").write_text("def parse(): return 1\n")
+    changed = manifest.code_sha256(scraper, package_dir)
+    assert changed != code
+
+    (package_dir / "platforms" / "site.py").write_text("class Site: x = 1\n")
+    assert manifest.code_sha256(scraper, package_dir) != changed
@@ -0,0 +1,30 @@
+from unittest.mock import patch
+
+from warn.ratelimit import RateLimiter, TokenBucket
+
+
+def test_token_bucket():
+    """Test that a bucket allows its burst and then paces requests."""
+    with patch("warn.ratelimit.time.monotonic", return_value=100.0):
+        bucket = TokenBucket(rate=0.5, burst=2)
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 2.0
+        assert bucket.reserve() == 4.0
+
+
+def test_unlimited_bucket():
+    """Test that a bucket without a rate never waits."""
+    bucket = TokenBucket(rate=None)
+    assert all(bucket.reserve() == 0 for _ in range(10))
+
+
+def test_hosts_are_independent():
+    """Test that each host gets its own bucket and settings."""
+    with patch("warn.ratelimit.time.monotonic", return_value=100.0):
+        limiter = RateLimiter(rate=1, burst=1)
+        limiter.configure("slow.example.gov", rate=0.25)
+        assert limiter.reserve("https://slow.example.gov/a.html") == 0
+        assert limiter.reserve("https://slow.example.gov/b.html") == 4.0
+        assert limiter.reserve("https://fast.example.gov/a.html") == 0
+        assert limiter.reserve("https://FAST.example.gov:443/b.html") == 1.0
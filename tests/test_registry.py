@@ -0,0 +1,43 @@
+import subprocess
+import sys
+
+from warn import registry, utils
+
+
+def test_registry_matches_scrapers():
+    """Test that every scraper module is registered with its current metadata."""
+    modules = sorted(
+        p.stem for p in registry.SCRAPERS_DIR.glob("*.py") if p.stem != "__init__"
+    )
+    assert utils.get_all_scrapers() == modules
+    for state in modules:
+        info = registry.get(state)
+        metadata = registry.read_metadata(registry.SCRAPERS_DIR / f"{state}.py")
+        assert info.authors == sorted(metadata["__authors__"]), state
+        assert info.tags == sorted(metadata["__tags__"]), state
+        # DC's URL changes every year, so only its name is compared
+        assert info.source["name"] == metadata["__source__"]["name"], state
+
+
+def test_build_keeps_fetch_characteristics(tmp_path):
+    """Test that rebuilding the registry doesn't drop the hand-kept settings."""
+    path = tmp_path / "registry.json"
+    path.write_text('{"va": {"browser": true, "timeout": 600}}')
+    built = registry.build(path)
+    assert built["va"].browser
+    assert built["va"].timeout == 600
+    assert built["va"].source["name"] == "Virginia Employment Commission"
+    assert registry.load(path)["ak"].timeout is None
+
+
+def test_cli_imports_no_scrapers():
+    """Test that starting the CLI and listing scrapers doesn't import them, or requests."""
+    code = (
+        "import sys, warn.cli, warn.utils; warn.utils.get_all_scrapers(); "
+        "print(','.join(m for m in sys.modules "
+        "if m.startswith('warn.scrapers.') or m == 'requests'))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == ""
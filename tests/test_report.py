@@ -0,0 +1,56 @@
+import json
+import sys
+import types
+
+from warn import report, utils
+from warn.report import RunReport
+from warn.runner import Runner
+
+
+def test_phases_do_not_nest():
+    """Test that a fetch inside another fetch is only timed once."""
+    run = RunReport("zz")
+    with report.track(run):
+        with report.phase("fetch"):
+            with report.phase("fetch"):
+                report.add_request(100)
+        report.add_cache_hit()
+    run.finish("ok")
+    data = run.to_dict()
+    assert run.fetch_time <= run.elapsed
+    assert data["requests"] == 1
+    assert data["bytes_downloaded"] == 100
+    assert data["cache_hits"] == 1
+    assert set(data["phases"]) == {"fetch", "parse", "write"}
+
+
+def test_untracked_calls_are_ignored():
+    """Test that helpers used outside the Runner don't need a report."""
+    with report.phase("write"):
+        report.add_rows(10)
+    report.add_request(10)
+
+
+def test_runner_saves_report(tmp_path, monkeypatch):
+    """Test that the Runner writes a report for each scrape."""
+
+    def scrape(data_dir, cache_dir):
+        path = data_dir / "zz.csv"
+        utils.write_rows_to_csv(path, [["a", "b"], [1, 2], [3, 4]])
+        return path
+
+    module = types.ModuleType("warn.scrapers.zz")
+    module.__file__ = __file__
+    module.scrape = scrape  # type: ignore
+    monkeypatch.setitem(sys.modules, "warn.scrapers.zz", module)
+
+    runner = Runner(tmp_path / "exports", tmp_path / "cache", log_dir=tmp_path / "logs")
+    runner.scrape("zz")
+
+    with open(tmp_path / "logs" / "zz.json") as fh:
+        data = json.load(fh)
+    assert data["status"] == "ok"
+    assert data["rows_written"] == 2
+    assert data["output"] == str(tmp_path / "exports" / "zz.csv")
+    assert runner.last_report == data
+    assert len((tmp_path / "logs" / "runs.jsonl").read_text().splitlines()) == 1
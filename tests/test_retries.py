@@ -0,0 +1,79 @@
+import io
+from unittest.mock import patch
+
+import requests
+
+from warn.retries import RetryPolicy, parse_retry_after
+
+
+def _response(status_code, headers=None):
+    """Make a bare response with the provided status."""
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response.raw = io.BytesIO(b"")
+    return response
+
+
+def _sender(*responses):
+    """Make a send function that returns the provided responses in turn."""
+    calls = []
+
+    def send():
+        calls.append(1)
+        return responses[len(calls) - 1]
+
+    return send, calls
+
+
+def test_client_errors_fail_fast():
+    """Test that a 404 is returned without a retry."""
+    send, calls = _sender(_response(404), _response(200))
+    with patch("warn.retries.time.sleep") as sleep:
+        response = RetryPolicy().request(send, "https://example.gov/a")
+    assert response.status_code == 404
+    assert len(calls) == 1
+    sleep.assert_not_called()
+
+
+def test_retry_after_is_honored():
+    """Test that a 429 waits as long as the server asks."""
+    send, calls = _sender(_response(429, {"Retry-After": "7"}), _response(200))
+    with patch("warn.retries.time.sleep") as sleep:
+        response = RetryPolicy().request(send, "https://example.gov/a")
+    assert response.status_code == 200
+    assert len(calls) == 2
+    sleep.assert_called_once_with(7.0)
+
+
+def test_server_errors_back_off_until_attempts_run_out():
+    """Test that a 503 is retried with jittered waits, then handed back."""
+    send, calls = _sender(_response(503), _response(503), _response(503))
+    policy = RetryPolicy(attempts=3, base_delay=2, max_delay=3)
+    with patch("warn.retries.time.sleep") as sleep:
+        response = policy.request(send, "https://example.gov/a")
+    assert response.status_code == 503
+    assert len(calls) == 3
+    waits = [c.args[0] for c in sleep.call_args_list]
+    assert len(waits) == 2
+    assert 0 <= waits[0] <= 2 and 0 <= waits[1] <= 3
+
+
+def test_host_budget():
+    """Test that a host stops being retried once its budget is spent."""
+    policy = RetryPolicy(host_budget=10)
+    with patch("warn.retries.time.sleep"):
+        send, calls = _sender(_response(503, {"Retry-After": "8"}), _response(200))
+        assert policy.request(send, "https://slow.example.gov/a").status_code == 200
+        send, calls = _sender(_response(503, {"Retry-After": "8"}), _response(200))
+        assert policy.request(send, "https://slow.example.gov/b").status_code == 503
+        send, calls = _sender(_response(503, {"Retry-After": "8"}), _response(200))
+        assert policy.request(send, "https://fast.example.gov/a").status_code == 200
+
+
+def test_parse_retry_after():
+    """Test that both forms of the header are understood."""
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
@@ -0,0 +1,40 @@
+import os
+import time
+from pathlib import Path
+
+from warn.runner import Runner
+
+
+class FakeRunner(Runner):
+    """A runner whose scrapers succeed, fail or crash depending on their name."""
+
+    def scrape(self, state):
+        """Pretend to scrape the provided state."""
+        if state == "boom":
+            raise ValueError("Scraper blew up")
+        if state == "die":
+            os._exit(3)
+        if state == "hang":
+            time.sleep(60)
+        return Path(self.data_dir, f"{state}.csv")
+
+
+def test_scrape_parallel(tmp_path):
+    """Test that failures are reported per state without stopping the others."""
+    runner = FakeRunner(tmp_path / "exports", tmp_path / "cache")
+    results = runner.scrape_parallel(["AK", "boom", "die", "ct"], jobs=2)
+    assert [r.state for r in results] == ["ak", "boom", "die", "ct"]
+    assert [r.status for r in results] == ["ok", "failed", "failed", "ok"]
+    assert results[0].path == tmp_path / "exports" / "ak.csv"
+    assert "Scraper blew up" in results[1].error
+    assert "exited with code 3" in results[2].error
+
+
+def test_scrape_parallel_timeout(tmp_path):
+    """Test that a scraper running past its deadline is killed."""
+    runner = FakeRunner(tmp_path / "exports", tmp_path / "cache", timeout=1)
+    started = time.monotonic()
+    results = runner.scrape_parallel(["hang", "ak"], jobs=2)
+    assert time.monotonic() - started < 30
+    assert [r.status for r in results] == ["timeout", "ok"]
+    assert "Timed out" in results[0].error
@@ -0,0 +1,33 @@
+from warn.sessions import SessionPool, TimeoutHTTPAdapter
+
+
+def test_sessions_are_shared_per_host():
+    """Test that URLs on the same host reuse one session."""
+    pool = SessionPool(pool_size=4, headers={"User-Agent": "test"})
+    first = pool.get("https://www.example.gov/warn/1")
+    assert pool.get("https://WWW.EXAMPLE.GOV/warn/2") is first
+    assert pool.get("https://other.example.gov/warn/1") is not first
+    assert pool.get("http://www.example.gov/warn/1") is not first
+    assert first.headers["User-Agent"] == "test"
+    adapter = first.get_adapter("https://www.example.gov/")
+    assert adapter._pool_maxsize == 4
+
+
+def test_configure_replaces_sessions():
+    """Test that new settings apply to sessions opened afterward."""
+    pool = SessionPool(pool_size=4)
+    first = pool.get("https://www.example.gov/")
+    pool.configure(pool_size=20)
+    second = pool.get("https://www.example.gov/")
+    assert second is not first
+    assert second.get_adapter("https://www.example.gov/")._pool_maxsize == 20
+
+
+def test_new_session_times_out():
+    """Test that a session outside the pool still gets the default timeout."""
+    pool = SessionPool(timeout=(1, 2))
+    session = pool.new_session()
+    assert session is not pool.new_session()
+    adapter = session.get_adapter("https://fortress.wa.gov/")
+    assert isinstance(adapter, TimeoutHTTPAdapter)
+    assert adapter.timeout == (1, 2)
@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import typing
+import zlib
+
+import aiohttp
+from requests.utils import get_encoding_from_headers
+
+try:
+    import charset_normalizer
+except ImportError:
+    charset_normalizer = None  # type: ignore
+
+from . import report
+from .ratelimit import limiter
+from .retries import RetryPolicy, policy
+
+logger = logging.getLogger(__name__)
+
+
+# How many requests may be in flight at once, overall and for any one host
+DEFAULT_CONCURRENCY = 100
+DEFAULT_PER_HOST = 8
+
+DEFAULT_USER_AGENT = "Big Local News (biglocalnews.org)"
+
+# The errors that mean a request never got an answer, and may be retried
+CONNECTION_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+
+class FetchError(Exception):
+    """Thrown when some requests in a batch failed even after retries.
+
+    Args:
+        errors (dict): The exception each failed URL raised, keyed by URL
+    """
+
+    def __init__(self, errors: typing.Dict[str, BaseException]):
+        """Initialize a new instance."""
+        self.errors = errors
+        first_url, first_error = next(iter(errors.items()))
+        super().__init__(
+            f"{len(errors)} requests failed, starting with {first_url}: {first_error!r}"
+        )
+
+
+class AsyncResponse:
+    """The parts of an HTTP response our scrapers use, read fully into memory.
+
+    Mirrors the matching attributes of a requests.Response.
+
+    Args:
+        url (str): The URL that was requested
+        status_code (int): The HTTP status code
+        headers (dict): The response headers
+        content (bytes): The decoded response body
+        encoding (str): The character set to decode the body with, if the headers name one.
+            Found the same way requests does, with ISO-8859-1 for text without a charset.
+    """
+
+    def __init__(self, url, status_code, headers, content, encoding=None):
+        """Initialize a new instance."""
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+
+    @property
+    def ok(self) -> bool:
+        """Whether the status code is below 400."""
+        return self.status_code < 400
+
+    @property
+    def apparent_encoding(self) -> typing.Optional[str]:
+        """The character set the body appears to be in, guessed the same way requests does."""
+        if charset_normalizer is None:
+            return None
+        match = charset_normalizer.from_bytes(self.content).best()
+        return match.encoding if match is not None else None
+
+    @property
+    def text(self) -> str:
+        """The body as a string, in the apparent encoding if the headers don't name one."""
+        encoding = self.encoding or self.apparent_encoding or "utf-8"
+        return self.content.decode(encoding, errors="replace")
+
+
+class AsyncFetcher:
+    """Fetch many URLs at once from a single event loop and HTTP client.
+
+    All requests share one connection pool, which caps how many are in
+    flight overall and per host. Each request also waits its turn with
+    the shared rate limiter in warn.ratelimit, and failed requests are
+    tried again under the shared retry policy in warn.retries.
+
+    Example:
+        Download a batch of pages::
+
+            async with AsyncFetcher(per_host=4) as fetcher:
+                responses = await fetcher.get_many(urls)
+
+    Args:
+        concurrency (int): The most requests in flight at once (default 100)
+        per_host (int): The most requests in flight to a single host (default 8)
+        user_agent (str): The user-agent header passed with each request
+        headers (dict): Other headers to pass with each request. Optional.
+        verify (bool): Whether to verify SSL certificates (default True)
+        timeout (float): Seconds to wait for a single request (default 60)
+        retry_policy (RetryPolicy): Decides which failures to try again. Defaults to the shared policy.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        per_host: int = DEFAULT_PER_HOST,
+        user_agent: str = DEFAULT_USER_AGENT,
+        headers: typing.Optional[typing.Dict] = None,
+        verify: bool = True,
+        timeout: float = 60,
+        retry_policy: typing.Optional[RetryPolicy] = None,
+    ):
+        """Initialize a new instance."""
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.headers = {"User-Agent": user_agent, "Accept-Encoding": "gzip, deflate"}
+        self.headers.update(headers or {})
+        self.verify = verify
+        self.timeout = timeout
+        self.retry_policy = retry_policy or policy
+        self.session: typing.Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        """Open the shared client."""
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.per_host,
+            ssl=None if self.verify else False,
+        )
+        # We decode bodies ourselves so that live and recorded responses match
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            auto_decompress=False,
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        """Close the shared client."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def get(self, url: str, **kwargs) -> AsyncResponse:
+        """Request the provided URL, retrying it under the retry policy.
+
+        Args:
+            url (str): the url to be requested
+            **kwargs: Additional arguments to pass to aiohttp's get()
+
+        Returns: an AsyncResponse
+        """
+        if self.session is None:
+            raise RuntimeError("AsyncFetcher must be used as an async context manager")
+        session = self.session
+        return await self.retry_policy.request_async(
+            lambda: self._get_once(session, url, **kwargs),
+            url,
+            errors=CONNECTION_ERRORS,
+        )
+
+    async def _get_once(
+        self, session: aiohttp.ClientSession, url: str, **kwargs
+    ) -> AsyncResponse:
+        """Make a single try at the provided URL."""
+        delay = limiter.reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        logger.debug(f"Requesting {url}")
+        async with session.get(url, **kwargs) as response:
+            body = await response.read()
+            logger.debug(f"Response code: {response.status} for {url}")
+            report.add_request(len(body))
+            return AsyncResponse(
+                url=str(response.url),
+                status_code=response.status,
+                headers=dict(response.headers),
+                content=_decode_body(body, response.headers.get("Content-Encoding")),
+                encoding=get_encoding_from_headers(response.headers),
+            )
+
+    async def get_many(
+        self, urls: typing.Iterable[str], **kwargs
+    ) -> typing.List[AsyncResponse]:
+        """Request all of the provided URLs at once.
+
+        A request that fails doesn't stop the others. Once they've all finished,
+        any failures are raised together.
+
+        Args:
+            urls (list): the urls to be requested
+            **kwargs: Additional arguments to pass to aiohttp's get()
+
+        Returns: a list of AsyncResponse objects in the same order as the URLs
+
+        Raises: FetchError if any request failed even after retries
+        """
+        urls = list(urls)
+        tasks = [self.get(url, **kwargs) for url in urls]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        errors = {
+            url: result
+            for url, result in zip(urls, results)
+            if isinstance(result, BaseException)
+        }
+        if errors:
+            raise FetchError(errors)
+        return typing.cast(typing.List[AsyncResponse], results)
+
+
+def fetch_all(urls: typing.Iterable[str], **kwargs) -> typing.List[AsyncResponse]:
+    """Request many URLs concurrently from synchronous code.
+
+    Args:
+        urls (list): the urls to be requested
+        **kwargs: Settings for the AsyncFetcher, like per_host or verify
+
+    Returns: a list of AsyncResponse objects in the same order as the URLs
+    """
+    urls = list(urls)
+    if not urls:
+        return []
+
+    async def _run():
+        async with AsyncFetcher(**kwargs) as fetcher:
+            return await fetcher.get_many(urls)
+
+    logger.debug(f"Requesting {len(urls)} URLs concurrently")
+    with report.phase("fetch"):
+        return asyncio.run(_run())
+
+
+def _decode_body(body: bytes, content_encoding: typing.Optional[str]) -> bytes:
+    """Undo gzip or deflate compression on a response body."""
+    encoding = (content_encoding or "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
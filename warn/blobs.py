@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import typing
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class BlobStore:
+    """Files named by the SHA-256 hash of their content.
+
+    Each distinct payload is stored once, however many names it's saved
+    under. Names are hardlinks to their blob, so anything that reads a
+    file by its path keeps working. Where the filesystem can't hardlink,
+    the blob is copied to the name instead.
+
+    Because a name and its blob share the same bytes on disk, a named file
+    must be replaced with ``link``, never edited in place.
+
+    Example:
+        Save some bytes under a name::
+
+            store = BlobStore(Path("~/.warn-scraper/cache/.blobs"))
+            digest = store.put(b"<h1>Hello</h1>")
+            store.link(digest, Path("~/.warn-scraper/cache/xx/hello.html"))
+
+    Args:
+        root (Path): The directory that holds the blobs.
+    """
+
+    def __init__(self, root: Path):
+        """Initialize a new instance."""
+        self.root = Path(root)
+
+    def path(self, digest: str) -> Path:
+        """Get the location of the blob with the provided hash."""
+        return self.root / digest[:2] / digest
+
+    def has(self, digest: str) -> bool:
+        """Whether the blob with the provided hash is stored."""
+        return self.path(digest).exists()
+
+    def put(self, data: bytes, digest: str) -> str:
+        """Store some bytes, unless a blob with the same hash already exists.
+
+        Args:
+            data (bytes): The content to store.
+            digest (str): The SHA-256 hex digest of the content.
+
+        Returns: the digest
+        """
+        if self.has(digest):
+            return digest
+        tmp_path = self.temp_path()
+        try:
+            with open(tmp_path, "wb") as fh:
+                fh.write(data)
+        except BaseException:
+            tmp_path.unlink()
+            raise
+        return self.put_file(tmp_path, digest)
+
+    def put_file(self, tmp_path: Path, digest: str) -> str:
+        """Move a finished temp file into the store, or drop it if it's a duplicate.
+
+        A stored blob that has come up short is replaced.
+
+        Args:
+            tmp_path (Path): A file from ``temp_path`` holding the complete content.
+            digest (str): The SHA-256 hex digest of the content.
+
+        Returns: the digest
+        """
+        blob_path = self.path(digest)
+        if _same_size(blob_path, tmp_path):
+            logger.debug(f"Blob {digest} is already stored")
+            tmp_path.unlink()
+            return digest
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, blob_path)
+        return digest
+
+    def put_stream(self, source: typing.BinaryIO) -> typing.Tuple[str, int]:
+        """Store the content of a stream, hashing it as it's read.
+
+        Args:
+            source (file): A binary stream of the content.
+
+        Returns: the content's SHA-256 hex digest and its size in bytes
+        """
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = self.temp_path()
+        try:
+            with open(tmp_path, "wb") as fh:
+                for chunk in iter(lambda: source.read(64 * 1024), b""):
+                    fh.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+        except BaseException:
+            tmp_path.unlink()
+            raise
+        return self.put_file(tmp_path, digest.hexdigest()), size
+
+    def temp_path(self) -> Path:
+        """Get a new, empty file in the store to write content into before it's hashed."""
+        tmp_dir = self.root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(dir=tmp_dir)
+        os.close(fd)
+        return Path(name)
+
+    def link(self, digest: str, dest: Path) -> bool:
+        """Point a name at a blob.
+
+        Args:
+            digest (str): The SHA-256 hex digest of a stored blob.
+            dest (Path): The name to save it under.
+
+        Returns: False if the name already pointed to the blob, otherwise True
+        """
+        blob_path = self.path(digest)
+        dest = Path(dest)
+        if _same_file(blob_path, dest):
+            return False
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        # Link, or copy, next to the destination and then swap it in,
+        # so the old file's content, which may be another name's blob, is never touched,
+        # and other processes see either the old file or the new one
+        tmp_dest = dest.with_name(
+            f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        if tmp_dest.exists():
+            tmp_dest.unlink()
+        try:
+            os.link(blob_path, tmp_dest)
+        except OSError:
+            shutil.copyfile(blob_path, tmp_dest)
+        os.replace(tmp_dest, dest)
+        return True
+
+    def digests(self) -> typing.Iterator[str]:
+        """Iterate over the hashes of every stored blob."""
+        for path in self.root.glob("??/*"):
+            yield path.name
+
+
+def _same_size(blob_path: Path, tmp_path: Path) -> bool:
+    """Whether a blob is stored and intact, going by the size of a fresh copy."""
+    try:
+        return blob_path.stat().st_size == tmp_path.stat().st_size
+    except FileNotFoundError:
+        return False
+
+
+def _same_file(a: Path, b: Path) -> bool:
+    """Whether two paths lead to the same file on disk."""
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
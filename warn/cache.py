@@ -1,15 +1,36 @@
 import csv
+import hashlib
+import io
+import locale
 import logging
 import os
+import sqlite3
+import time
 import typing
+from contextlib import contextmanager
+from fnmatch import fnmatchcase
 from os.path import expanduser, join
 from pathlib import Path
 
+from . import cache_archive, cache_storage, compression, manifest, report
+from .blobs import BlobStore
+from .cache_index import CacheEntry, CacheIndex
+from .cache_storage import Storage
+from .compression import CompressionPolicy
+from .freshness import FreshnessPolicy
+from .locks import FileLock
+from .memory import MemoryTier
 from .utils import get_url
 
 logger = logging.getLogger(__name__)
 
 
+class IncompleteDownloadError(IOError):
+    """Thrown when a download ends before the whole file has arrived."""
+
+    pass
+
+
 class Cache:
     """Basic interface to save files to and fetch from cache.
 
@@ -30,33 +51,214 @@ class Cache:
 
             cache.files('fl')
 
+    Downloads are revalidated with the server on later runs. When the server
+    says a file hasn't changed, its name is added to the ``not_modified`` set
+    so callers can skip parsing it again.
+
+    Content is stored once, in a blob named by its SHA-256 hash, no matter how
+    many names it's saved under or how many times it's saved. Each name is a
+    hardlink to its blob, so reading files by path works as it always has.
+    Files in the cache should be replaced with ``write`` or ``download``
+    rather than edited in place. Both put the new content together in a
+    temp file and swap it in with a rename, under an advisory lock, so any
+    number of processes can share a cache folder and readers never see a
+    partial file.
+
+    Every file is listed in an SQLite index along with its source URL, size,
+    hash, fetch time and HTTP validators. ``exists`` and ``files`` answer from
+    the index instead of the disk. Files saved to the cache folder by other
+    means are picked up when ``exists`` first looks for them, or by ``reindex``.
+
+    A cache can be given a compression policy, so that text saved with
+    ``write`` is compressed according to its file extension, with Zstandard
+    if it's installed and gzip if not. A compressed file is saved under its
+    name plus a ".zst" or ".gz" suffix, so nothing that opens the folder's
+    files by path mistakes it for plain text. ``exists``, ``read``, ``get``
+    and ``files`` take the name it was written under and find it either way.
+    Files saved with ``download`` are kept as is, since they're often opened
+    by path.
+
+    How long a cached file can be used before it's fetched again is set by a
+    freshness policy that matches rules to cache keys. ``get_or_fetch`` and
+    ``is_fresh`` apply it, so scrapers don't each need their own rules.
+
+    Scrapers that read the same pages again and again can keep recently read
+    and written files in memory by setting ``memory_limit``. ``get`` checks
+    for a usable copy and reads it in a single call.
+
+    The folder can be backed by a storage backend, like a shared folder, an
+    SQLite file or an S3 bucket, so runners without a cache of their own can
+    share one. Everything saved to the folder is copied to the store, and
+    files missing from the folder are looked for there. Cache archives
+    attached with ``cache_archive.attach`` are read the same way. Text is
+    read straight out of the store or archive, while anything that needs
+    a file by its path, like ``exists`` or ``get_or_fetch``, copies just
+    that file into the folder first.
+
+    While a scrape is tracked by the Runner, the cache counts its hits,
+    misses and stale refreshes, the bytes it reads and writes and the time
+    it spends doing so. The counts are kept for each namespace, which is the
+    first folder of a file's name, like "ia", and saved with the run report.
+
     Args:
         path (str): Full path to cache directory. Defaults to WARN_ETL_DIR
             or, if env var not specified, $HOME/.warn-scraper/cache
+        compression (CompressionPolicy): Which files ``write`` compresses.
+            Defaults to none.
+        freshness (FreshnessPolicy): When cached files must be fetched again.
+            Defaults to the rules in freshness.DEFAULT_RULES.
+        memory_limit (int): Bytes of recently used files to keep in memory. Default 0, for none.
+        storage (Storage): Where to share cached files. Defaults to the store attached
+            with ``cache_storage.attach``, if any.
     """
 
-    def __init__(self, path=None):
+    # The folder, inside the cache, that holds the content-addressed blobs
+    BLOB_DIR = ".blobs"
+
+    # The folder, inside the cache, that holds the lock files
+    LOCK_DIR = ".locks"
+
+    # The namespace every file's counts go toward, if not the first folder of its name
+    namespace: typing.Optional[str] = None
+
+    def __init__(
+        self,
+        path=None,
+        compression=None,
+        freshness=None,
+        memory_limit=0,
+        storage: typing.Optional[Storage] = None,
+    ):
         """Initialize a new instance."""
         self.root_dir = self._path_from_env or self._path_default
         self.path = path or str(Path(self.root_dir, "cache"))
+        self.not_modified: typing.Set[str] = set()
+        self.blobs = BlobStore(Path(self.path, self.BLOB_DIR))
+        self.index = CacheIndex(Path(self.path))
+        self.compression = compression or CompressionPolicy({})
+        self.freshness = freshness or FreshnessPolicy()
+        self.memory = MemoryTier(memory_limit) if memory_limit else None
+        self.storage = storage or cache_storage.view_for(Path(self.path))
+        self.archive = cache_archive.view_for(Path(self.path))
 
     def exists(self, name):
-        """Test whether the provided file path exists."""
-        return Path(self.path, name).exists()
+        """Test whether the provided file path exists.
+
+        A file that's only in the store or archive is copied into the folder,
+        since callers often go on to open it by path.
+        """
+        with self._io(name):
+            key = self._stored_key(name)
+            if self._is_local(key):
+                self._count(name, "hit")
+                return True
+            if self._remote(key) is not None:
+                self._fault_in(key)
+                self._count(name, "hit")
+                return True
+            return Path(self.path, key).exists()
+
+    def entry(self, name) -> typing.Optional[CacheEntry]:
+        """Get what the index knows about the provided file, if it's been cached."""
+        key = self._stored_key(name)
+        entry = self.index.get(key)
+        if entry is None:
+            remote = self._remote(key)
+            if remote is not None:
+                entry = remote.entry(key)
+        return entry
+
+    def is_fresh(self, name) -> bool:
+        """Test whether the provided file is cached in full and its freshness rule says it can be used.
+
+        A fresh file counts as a cache hit. A stale or missing one isn't counted
+        until it's fetched and saved.
+        """
+        with self._io(name):
+            fresh = self._usable_entry(name, fresh=True) is not None
+        if fresh:
+            self._count(name, "hit")
+        return fresh
+
+    def is_complete(self, name, entry: typing.Optional[CacheEntry] = None) -> bool:
+        """Test whether the provided file on disk is the size the index says it should be.
+
+        A file that's come up short, like one cut off by an interrupted download in an
+        older version of this library, is reported and treated as missing.
+        """
+        entry = entry or self.entry(name)
+        if entry is None:
+            return False
+        try:
+            size = Path(self.path, entry.key).stat().st_size
+        except FileNotFoundError:
+            # Files in a store or archive were checked when they were saved there
+            return self._remote(entry.key) is not None
+        if entry.size is not None and size != entry.size:
+            logger.warning(
+                f"{name} is {size} bytes but was saved as {entry.size}. It will be fetched again."
+            )
+            return False
+        return True
+
+    def lock(self, name) -> FileLock:
+        """Get the advisory lock that guards changes to the provided file.
+
+        Downloads and writes take it while they swap a file in and index it,
+        so processes sharing the cache folder never leave the two out of step.
+        Names are spread across a fixed set of lock files.
+        """
+        return key_lock(Path(self.path), self._key(name))
+
+    def reindex(self) -> int:
+        """Rebuild the index from the files on disk.
+
+        Returns: the number of files indexed
+        """
+        return self.index.reindex()
+
+    def get(
+        self, name, encoding: typing.Optional[str] = None, fresh: bool = True
+    ) -> typing.Optional[str]:
+        """Read a text file from the cache, if there's a usable copy.
+
+        This does the work of ``is_fresh`` and ``read`` in one lookup, and a
+        file held in memory is served without touching the disk.
+
+        Example: ::
 
-    def read(self, name):
+            html = cache.get("ks/search_results/2019-01-01_2019-12-31_page1.html")
+            if html is None:
+                html = ...  # Go get it
+
+        Args:
+            name (str): Partial name, relative to cache dir (eg. 'fl/2021_page_1.html')
+            encoding (str): The file's encoding. Defaults to the system's, like open().
+            fresh (bool): Whether the file's freshness rule must allow it. Default True.
+
+        Returns: The file's content, or None if it's missing, incomplete or stale
+        """
+        with self._io(name):
+            data = self._get_bytes(name, fresh)
+        if data is None:
+            return None
+        self._count(name, "hit", read=len(data))
+        return data.decode(encoding or locale.getpreferredencoding(False))
+
+    def read(self, name, encoding: typing.Optional[str] = None):
         """Read text file from cache.
 
         Args:
             name (str): Partial name, relative to cache dir (eg. 'fl/2021_page_1.html')
+            encoding (str): The file's encoding. Defaults to the system's, like open().
 
         Returns:
             File content as string or error if file doesn't
         """
-        path = Path(self.path, name)
-        logger.debug(f"Reading from cache {path}")
-        with open(path, newline="") as infile:
-            return infile.read()
+        with self._io(name):
+            data = self._read_bytes(name)
+        self._count(name, read=len(data))
+        return data.decode(encoding or locale.getpreferredencoding(False))
 
     def read_csv(self, name):
         """Read csv file from cache.
@@ -67,46 +269,78 @@ class Cache:
         Returns:
             list of rows
         """
-        path = Path(self.path, name)
-        logger.debug(f"Reading CSV from cache {path}")
-        with open(path, encoding="utf-8") as fh:
-            return list(csv.reader(fh))
+        with self._io(name):
+            data = self._read_bytes(name)
+        self._count(name, read=len(data))
+        text = io.StringIO(data.decode("utf-8"), newline=None)
+        return list(csv.reader(text))
 
     def download(
-        self, name: str, url: str, encoding: typing.Optional[str] = None, **kwargs
+        self,
+        name: str,
+        url: str,
+        encoding: typing.Optional[str] = None,
+        conditional: bool = True,
+        **kwargs,
     ) -> Path:
         """
         Download the provided URL and save it in the cache.
 
+        If the file was downloaded before and the server sent an ETag or Last-Modified
+        header with it, the request asks the server to skip the body if nothing has changed.
+        When the server answers 304 Not Modified, the cached file is kept and the name is
+        added to the ``not_modified`` set.
+
+        The file is only swapped in once it has downloaded in full. If the connection drops,
+        or fewer bytes arrive than the server promised, an IncompleteDownloadError is raised
+        and whatever was cached before is left in place.
+
         Args:
             name (str): The path where the file will be saved. Can be a simple string like "ia/data.xlsx"
             url (str): The URL to download
             encoding (str): The encoding of the response. Optional.
+            conditional (bool): Whether to revalidate a cached copy rather than download it again. Default True.
             **kwargs: Additional arguments to pass to requests.get()
 
         Returns: The Path where the file was saved
         """
-        # Request the URL
-        logger.debug(f"Downloading {url}")
-        with get_url(url, stream=True, **kwargs) as r:
-            # If there's no encoding, set it
-            if encoding:
-                r.encoding = encoding
-            elif r.encoding is None:
-                r.encoding = "utf-8"
+        return self._download(name, url, encoding, conditional, **kwargs)
 
-            # Open the local Path
-            out_path = Path(self.path, name)
-            out_path.parent.mkdir(parents=True, exist_ok=True)
-            logger.debug(f"Writing to {out_path}")
+    def get_or_fetch(self, name: str, url: str, **kwargs) -> Path:
+        """
+        Get a file from the cache, downloading it if there's no fresh copy.
 
-            # Write out the file in little chunks
-            with open(out_path, "wb") as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
+        A stale copy is revalidated with the server, so a file that hasn't
+        changed isn't downloaded again.
 
-        # Return the path
-        return out_path
+        Example: ::
+
+            pdf_path = cache.get_or_fetch("sc/2021.pdf", url, verify=False)
+
+        Args:
+            name (str): The path where the file is cached, like "sc/2021.pdf"
+            url (str): The URL to download it from
+            **kwargs: Additional arguments to pass to ``download``
+
+        Returns: The Path where the file is saved
+        """
+        with self.lock(name):
+            with self._io(name):
+                entry = self._usable_entry(name, fresh=True)
+            if entry is not None:
+                logger.debug(f"Using the cached copy of {url} at {name}")
+                path = Path(self.path, entry.key)
+                with self._io(name):
+                    if not path.exists():
+                        self._fault_in(entry.key)
+                self._count(name, "hit", read=entry.size or 0)
+                if entry.digest:
+                    manifest.record(name, entry.digest)
+                else:
+                    manifest.record_file(name, path)
+                return path
+        # The lock is let go first, so other names on its stripe aren't held up by the transfer
+        return self.download(name, url, **kwargs)
 
     def write(self, name, content):
         """Save file contents to cache.
@@ -127,17 +361,66 @@ class Cache:
 
             cache.write("fl/page.html", html)
 
+        If the name already holds the same content, nothing is written.
+        Names that match the compression policy are stored compressed,
+        under the name plus the codec's suffix.
+
         Args:
             name (str): Partial name, relative to cache dir, where content should be saved.
-            content (str): Any string content to save to file.
+            content (str): Any string content to save to file. Bytes are saved as is.
+
+        Returns: the path the file was saved at
         """
-        out = Path(self.path, name)
-        out.parent.mkdir(parents=True, exist_ok=True)
-        logger.debug(f"Writing to cache {out}")
-        with open(out, "w", newline="") as fh:
-            fh.write(content)
+        codec = self.compression.codec_for(name)
+        out = Path(self.path, compression.stored_name(self._key(name), codec))
+        if isinstance(content, bytes):
+            data = content
+        else:
+            # Encode the way a file opened in text mode would
+            data = content.encode(locale.getpreferredencoding(False))
+        digest = manifest.sha256(data)
+
+        with self._io(name):
+            entry = self._write(name, data, digest)
+        if entry is not None:
+            self._share(name, entry)
+        manifest.record(name, digest)
         return str(out)
 
+    def _write(self, name, data: bytes, digest: str) -> typing.Optional[CacheEntry]:
+        """Save content under a name, and get its new index entry if anything changed."""
+        codec = self.compression.codec_for(name)
+        key = compression.stored_name(self._key(name), codec)
+        out = Path(self.path, key)
+
+        # Compress it only if we don't already have it
+        blob_id = digest + compression.SUFFIXES[codec]
+        if not self.blobs.has(blob_id):
+            self.blobs.put(compression.compress(data, codec), blob_id)
+
+        # Swap it in and index it together, so the two never disagree
+        with self.lock(name):
+            entry = None
+            # Content that's saved again must have been fetched again
+            saved = Path(self.path, self._stored_key(name)).exists()
+            self._count(name, "refresh" if saved else "miss")
+            self._drop_other_copies(name, key)
+            if self.blobs.link(blob_id, out) or not self.index.contains(key):
+                logger.debug(f"Writing to cache {out}")
+                size = self.blobs.path(blob_id).stat().st_size
+                entry = CacheEntry(
+                    key, size=size, digest=digest, fetched_at=time.time()
+                )
+                self.index.put(
+                    key, size=size, digest=digest, fetched_at=entry.fetched_at
+                )
+                self._count(name, written=len(data))
+            else:
+                logger.debug(f"{out} is unchanged")
+            if self.memory is not None:
+                self.memory.put(self._memory_key(name), data, entry)
+        return entry
+
     def files(self, subdir=".", glob_pattern="*"):
         """
         Retrieve all files and folders in a subdir relative to cache dir.
@@ -158,9 +441,368 @@ class Cache:
         Args:
             subdir (str): Subdir inside cache to glob
             glob_pattern (str): Glob pattern. Defaults to all files in specified subdir ('*')
+
+        Compressed files are listed under the names they were written as,
+        without their codec's suffix.
+
+        Returns: a list of paths, in the order of the index
         """
+        # Patterns that reach into subfolders are left to the filesystem
+        if "/" in glob_pattern or "**" in glob_pattern:
+            _dir = Path(self.path).joinpath(subdir)
+            return [str(p) for p in _dir.glob(glob_pattern)]
+
+        # Otherwise list the files, and folders, directly inside the subdir
+        prefix = self._key(subdir)
+        prefix = "" if prefix == "." else prefix + "/"
+        keys = self.index.keys(prefix)
+        for remote in self._remotes():
+            keys = sorted(set(keys).union(remote.keys(prefix)))
+        names: typing.List[str] = []
+        seen: typing.Set[str] = set()
+        for key in keys:
+            child, *rest = key[len(prefix) :].split("/", 1)
+            if not rest:
+                child = compression.plain_name(child)
+            if child not in seen and fnmatchcase(child, glob_pattern):
+                seen.add(child)
+                names.append(child)
         _dir = Path(self.path).joinpath(subdir)
-        return [str(p) for p in _dir.glob(glob_pattern)]
+        return [str(_dir / child) for child in names]
+
+    def _download(
+        self,
+        name: str,
+        url: str,
+        encoding: typing.Optional[str],
+        conditional: bool,
+        **kwargs,
+    ) -> Path:
+        """Download a file, taking its lock only to swap it in and index it."""
+        out_path = Path(self.path, name)
+        key = self._key(name)
+        self.not_modified.discard(name)
+        # Downloads are read by path, so they aren't held in memory
+        if self.memory is not None:
+            self.memory.discard(self._memory_key(name))
+
+        # Ask the server to skip the body if our copy is current
+        kwargs["headers"] = dict(kwargs.get("headers") or {})
+        entry = self.entry(name) if conditional else None
+        if entry is not None and self.is_complete(name, entry):
+            kwargs["headers"].update(_conditional_headers(entry, url))
+        outcome = "refresh" if entry is not None or out_path.exists() else "miss"
+
+        # Request the URL
+        logger.debug(f"Downloading {url}")
+        with report.phase("fetch"), get_url(url, stream=True, **kwargs) as r:
+            # If the server says nothing changed, keep what we have
+            if r.status_code == 304:
+                logger.debug(f"{url} has not changed since it was cached at {out_path}")
+                self.not_modified.add(name)
+                self._count(name, "refresh")
+                # Validators are only sent for a cached copy, so there's an entry
+                assert entry is not None
+                saved_path = Path(self.path, entry.key)
+                with self.lock(name), self._io(name):
+                    if not saved_path.exists():
+                        self._fault_in(entry.key)
+                    self.index.touch(entry.key)
+                if entry.digest:
+                    manifest.record(name, entry.digest)
+                else:
+                    manifest.record_file(name, saved_path)
+                return saved_path
+            # If there's no encoding, set it
+            if encoding:
+                r.encoding = encoding
+            elif r.encoding is None:
+                r.encoding = "utf-8"
+
+            # Write out the file in little chunks, fingerprinting as we go
+            digest = hashlib.sha256()
+            size = 0
+            tmp_path = self.blobs.temp_path()
+            try:
+                with open(tmp_path, "wb") as f:
+                    for chunk in r.iter_content(chunk_size=8192):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+                        report.add_bytes(len(chunk))
+            except BaseException:
+                tmp_path.unlink()
+                raise
+
+            # Make sure we got everything the server said it was sending
+            expected = r.headers.get("Content-Length")
+            if (
+                expected
+                and not r.headers.get("Content-Encoding")
+                and size != int(expected)
+            ):
+                tmp_path.unlink()
+                raise IncompleteDownloadError(
+                    f"Got {size} of {expected} bytes from {url}"
+                )
+
+            # File it under its hash and link the name to it
+            logger.debug(f"Writing to {out_path}")
+            self._count(name, outcome, written=size)
+            with self.lock(name), self._io(name):
+                self._drop_other_copies(name, key)
+                self.blobs.put_file(tmp_path, digest.hexdigest())
+                self.blobs.link(digest.hexdigest(), out_path)
+                manifest.record(name, digest.hexdigest())
+
+                # Index it, along with what we'll need to revalidate it next time
+                entry = CacheEntry(
+                    key,
+                    url=url,
+                    fetched_at=time.time(),
+                    size=size,
+                    digest=digest.hexdigest(),
+                    etag=r.headers.get("ETag"),
+                    last_modified=r.headers.get("Last-Modified"),
+                )
+                self.index.put(
+                    key,
+                    size=size,
+                    digest=entry.digest,
+                    url=url,
+                    etag=entry.etag,
+                    last_modified=entry.last_modified,
+                    fetched_at=entry.fetched_at,
+                )
+            self._share(name, entry)
+
+        # Return the path
+        return out_path
+
+    def restore(self, name, source: typing.BinaryIO, entry: CacheEntry):
+        """Save a file's stored content back into the cache, along with what was known about it.
+
+        This is how files come out of a store or archive. The content is kept
+        exactly as it was stored, compressed or not, and the entry's URL,
+        fetch time and HTTP validators carry over, so freshness rules and
+        revalidation work as if the file had never left.
+
+        Args:
+            name (str): Partial name, relative to cache dir, where the file goes.
+            source (file): A binary stream of the content, as it was stored.
+            entry (CacheEntry): The file's entry from the cache it came from.
+        """
+        out_path = Path(self.path, name)
+        key = self._key(name)
+        with self.lock(name):
+            logger.debug(f"Restoring {out_path}")
+            blob_id, size = self.blobs.put_stream(source)
+            self.blobs.link(blob_id, out_path)
+            self.index.put(
+                key,
+                size=size,
+                digest=entry.digest,
+                url=entry.url,
+                etag=entry.etag,
+                last_modified=entry.last_modified,
+                fetched_at=entry.fetched_at,
+            )
+            if self.memory is not None:
+                self.memory.discard(self._memory_key(name))
+
+    def _namespace(self, name) -> str:
+        """Get the namespace a file's counts go toward."""
+        if self.namespace is not None:
+            return self.namespace
+        parts = self._key(name).split("/", 1)
+        return parts[0] if len(parts) > 1 else "."
+
+    def _count(self, name, outcome: typing.Optional[str] = None, read=0, written=0):
+        """Count a lookup, and bytes read or written, toward the file's namespace."""
+        namespace = self._namespace(name)
+        if outcome is not None:
+            report.add_cache_lookup(namespace, outcome)
+        if read or written:
+            report.add_cache_bytes(namespace, read=read, written=written)
+
+    def _io(self, name):
+        """Count the time spent in the block as cache I/O in the file's namespace."""
+        return report.cache_io(self._namespace(name))
+
+    def _share(self, name, entry: CacheEntry):
+        """Copy a freshly saved file to the store, if there is one.
+
+        The store is a convenience, so failing to reach it is logged rather than raised.
+        """
+        if self.storage is None:
+            return
+        try:
+            self.storage.save(entry.key, Path(self.path, entry.key), entry)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Couldn't save {name} to {self.storage!r}: {e}")
+
+    def _fault_in(self, name):
+        """Copy a file out of the store or archive, so it can be read by path."""
+        key = self._stored_key(name)
+        remote = self._remote(key)
+        entry = remote.entry(key) if remote is not None else None
+        if remote is None or entry is None:
+            raise FileNotFoundError(Path(self.path, name))
+        logger.debug(f"Copying {key} out of {remote!r}")
+        with remote.open(key) as source:
+            self.restore(key, source, entry)
+
+    def _remotes(self) -> typing.List[Storage]:
+        """Get the store and archive behind the folder, in the order they're searched."""
+        return [r for r in (self.storage, self.archive) if r is not None]
+
+    def _remote(self, key) -> typing.Optional[Storage]:
+        """Get the store or archive that holds a file, if either does."""
+        for remote in self._remotes():
+            if remote.contains(key):
+                return remote
+        return None
+
+    def _is_local(self, name) -> bool:
+        """Test whether the folder has the provided file, indexing it if it was saved by other means.
+
+        Files that were deleted from the folder by hand are dropped from the index.
+        """
+        key = self._key(name)
+        path = Path(self.path, name)
+        if self.index.contains(key):
+            if path.is_file():
+                return True
+            logger.debug(f"Dropping {name} from the index, since its file is gone")
+            self.index.remove(key)
+            if self.memory is not None:
+                self.memory.discard(self._memory_key(name))
+            return False
+        if path.is_file():
+            stat = path.stat()
+            self.index.put(key, size=stat.st_size, fetched_at=stat.st_mtime)
+            return True
+        return False
+
+    def _usable_entry(self, name, fresh: bool) -> typing.Optional[CacheEntry]:
+        """Get the index entry for a file that's cached in full and, if asked, fresh."""
+        # Files in a store or archive are read from there, rather than copied into the folder
+        key = self._stored_key(name)
+        if not self._is_local(key) and self._remote(key) is None:
+            return None
+        entry = self.entry(key)
+        if entry is None or not self.is_complete(name, entry):
+            return None
+        if fresh and not self.freshness.is_fresh(entry):
+            return None
+        return entry
+
+    def _get_bytes(self, name, fresh: bool) -> typing.Optional[bytes]:
+        """Get a file's decompressed content if there's a usable copy, checking memory first."""
+        key = self._memory_key(name)
+        held = self.memory.get(key) if self.memory is not None else None
+        entry: typing.Optional[CacheEntry]
+        if held is not None and held[1] is not None:
+            entry = held[1]
+            if fresh and not self.freshness.is_fresh(entry):
+                return None
+        else:
+            entry = self._usable_entry(name, fresh)
+            if entry is None:
+                return None
+        if held is not None:
+            self.index.touch(entry.key)
+            if held[1] is None and self.memory is not None:
+                self.memory.put(key, held[0], entry)
+            return held[0]
+        try:
+            return self._load(entry.key, entry)
+        except FileNotFoundError:
+            return None
+
+    def _read_bytes(self, name) -> bytes:
+        """Get a file's decompressed content, from memory if it's held there."""
+        if self.memory is not None:
+            held = self.memory.get(self._memory_key(name))
+            if held is not None:
+                entry = held[1]
+                self.index.touch(entry.key if entry else self._stored_key(name))
+                return held[0]
+        return self._load(self._stored_key(name))
+
+    def _load(self, name, entry: typing.Optional[CacheEntry] = None) -> bytes:
+        """Read a file's decompressed content from disk, and hold it in memory if there's room.
+
+        The name must be the one the file is saved under, with any compression suffix.
+        """
+        key = self._key(name)
+        path = Path(self.path, name)
+        logger.debug(f"Reading from cache {path}")
+        try:
+            with self._opening(name):
+                with open(path, "rb") as fh:
+                    stored = fh.read()
+        except FileNotFoundError:
+            remote = self._remote(key)
+            if remote is None:
+                raise
+            logger.debug(f"Reading {name} from {remote!r}")
+            stored = remote.read(key)
+        data = compression.decompress(stored)
+        if self.memory is not None:
+            self.memory.put(self._memory_key(name), data, entry)
+        return data
+
+    def _key(self, name) -> str:
+        """Get the index key for a name in the cache."""
+        return Path(name).as_posix()
+
+    def _stored_key(self, name) -> str:
+        """Get the key a file is saved under, which ends in a codec's suffix if it's compressed.
+
+        The folder is checked before the store and archive. A file that isn't
+        saved anywhere gets the name's own key.
+        """
+        key = self._key(name)
+        candidates = [key] + [key + s for s in compression.COMPRESSED_SUFFIXES]
+        for candidate in candidates:
+            if self.index.contains(candidate) or Path(self.path, candidate).is_file():
+                return candidate
+        for candidate in candidates:
+            if self._remote(candidate) is not None:
+                return candidate
+        return key
+
+    def _memory_key(self, name) -> str:
+        """Get the key a file's content is held in memory under, which is the same compressed or not."""
+        return compression.plain_name(self._key(name))
+
+    def _drop_other_copies(self, name, key: str):
+        """Remove the copies of a file saved under a key other than the provided one, while holding its lock.
+
+        A file that's saved compressed after being saved plain, or the other way
+        around, would otherwise be left with two copies that disagree.
+        """
+        plain = compression.plain_name(self._key(name))
+        for other in [plain] + [plain + s for s in compression.COMPRESSED_SUFFIXES]:
+            if other == key:
+                continue
+            try:
+                Path(self.path, other).unlink()
+            except FileNotFoundError:
+                pass
+            self.index.remove(other)
+
+    @contextmanager
+    def _opening(self, name):
+        """Note a read in the index, or drop the entry if the file is gone."""
+        key = self._key(name)
+        try:
+            yield
+        except FileNotFoundError:
+            self.index.remove(key)
+            raise
+        self.index.touch(key)
 
     @property
     def _path_from_env(self):
@@ -171,3 +813,25 @@ class Cache:
     def _path_default(self):
         """Get the default filesystem location of the cache."""
         return join(expanduser("~"), ".warn-scraper")
+
+
+def key_lock(cache_dir: Path, key: str) -> FileLock:
+    """Get the advisory lock that guards a key in the provided cache folder.
+
+    A file's compressed and plain keys share a lock.
+    """
+    stripe = hashlib.sha1(compression.plain_name(key).encode("utf-8")).hexdigest()[:2]
+    return FileLock(Path(cache_dir, Cache.LOCK_DIR, f"{stripe}.lock"))
+
+
+def _conditional_headers(entry: CacheEntry, url: str) -> typing.Dict[str, str]:
+    """Get the headers that revalidate a cached download, if we have validators for it."""
+    # Validators only apply to the URL they came from
+    if entry.url != url:
+        return {}
+    headers = {}
+    if entry.etag:
+        headers["If-None-Match"] = entry.etag
+    if entry.last_modified:
+        headers["If-Modified-Since"] = entry.last_modified
+    return headers
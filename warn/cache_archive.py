@@ -0,0 +1,272 @@
+import io
+import json
+import logging
+import os
+import threading
+import typing
+import zipfile
+from bisect import bisect_left
+from dataclasses import asdict
+from pathlib import Path
+
+from .cache_index import CacheEntry, CacheIndex, nested_indexes
+from .cache_storage import Scoped, Storage, scope
+from .manifest import file_sha256
+
+logger = logging.getLogger(__name__)
+
+
+# Bump this when the layout of archives changes
+ARCHIVE_VERSION = 1
+
+# The archive member that lists every file and where its content is kept
+INDEX_MEMBER = "index.json"
+
+# The archive folder holding each distinct payload, named by its SHA-256 hash
+BLOB_PREFIX = "blobs/"
+
+# The archive attached to scrapes run in this process, and the cache folder it stands behind
+_attached: typing.Optional[typing.Tuple["CacheArchive", Path]] = None
+
+
+class CacheArchive(Storage):
+    """A whole cache packed into a single file that can be read without unpacking it.
+
+    The archive is a zip file. Each distinct payload is stored once, as
+    it was on disk, and an index lists every cached file along with its
+    source URL, fetch time and HTTP validators. Any one file can be read
+    straight out of the archive, so a cache can be shipped to a fresh
+    machine in one piece and used from there.
+
+    Example:
+        Read a Kansas detail page from an archive::
+
+            archive = CacheArchive(Path("warn-cache.zip"))
+            archive.read("ks/records/123.html")
+
+    Archives are read-only stores, so they can stand behind a cache the
+    same way as a shared folder or bucket.
+
+    Args:
+        path (Path): The archive file.
+    """
+
+    def __init__(self, path: Path):
+        """Initialize a new instance."""
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._zip: typing.Optional[zipfile.ZipFile] = None
+        self._entries: typing.Optional[typing.Dict[str, typing.Dict]] = None
+        self._keys: typing.List[str] = []
+        self.caches: typing.List[str] = []
+
+    def entry(self, key: str) -> typing.Optional[CacheEntry]:
+        """Get what the archive knows about the provided file, if it holds it."""
+        record = self._index().get(key)
+        if record is None:
+            return None
+        fields = {k: v for k, v in record.items() if k != "blob"}
+        return CacheEntry(key=key, **fields)
+
+    def contains(self, key: str) -> bool:
+        """Whether the archive holds the provided file."""
+        return key in self._index()
+
+    def keys(self, prefix: str = "") -> typing.List[str]:
+        """Get every key that starts with the provided prefix, in order."""
+        self._index()
+        start = bisect_left(self._keys, prefix)
+        end = bisect_left(self._keys, prefix + "\U0010ffff")
+        return self._keys[start:end]
+
+    def read(self, key: str) -> bytes:
+        """Get the provided file's content, as it was stored in the cache.
+
+        Raises: KeyError if the archive doesn't hold the file
+        """
+        member = BLOB_PREFIX + self._index()[key]["blob"]
+        with self._lock:
+            return self._open().read(member)
+
+    def open(self, key: str) -> typing.BinaryIO:
+        """Open the provided file's content for streaming, as it was stored in the cache.
+
+        Raises: KeyError if the archive doesn't hold the file
+        """
+        member = BLOB_PREFIX + self._index()[key]["blob"]
+        with self._lock:
+            return typing.cast(typing.BinaryIO, self._open().open(member))
+
+    def save(self, key: str, path: Path, entry: CacheEntry):
+        """Refuse to change the archive, since it's read-only."""
+        raise io.UnsupportedOperation(f"{self!r} is read-only")
+
+    def remove(self, key: str):
+        """Refuse to change the archive, since it's read-only."""
+        raise io.UnsupportedOperation(f"{self!r} is read-only")
+
+    def close(self):
+        """Close the archive file."""
+        with self._lock:
+            if self._zip is not None:
+                self._zip.close()
+                self._zip = None
+
+    def __repr__(self):
+        """Describe the archive."""
+        return f"CacheArchive({str(self.path)!r})"
+
+    def _open(self) -> zipfile.ZipFile:
+        """Open the archive file, if it isn't already."""
+        if self._zip is None:
+            self._zip = zipfile.ZipFile(self.path)
+        return self._zip
+
+    def _index(self) -> typing.Dict[str, typing.Dict]:
+        """Read the archive's index, if it hasn't been read already."""
+        if self._entries is None:
+            with self._lock:
+                data = json.loads(self._open().read(INDEX_MEMBER))
+            if data.get("version") != ARCHIVE_VERSION:
+                raise ValueError(
+                    f"{self.path} is a version {data.get('version')} cache archive, "
+                    f"but only version {ARCHIVE_VERSION} can be read"
+                )
+            self.caches = data["caches"]
+            self._keys = sorted(data["entries"])
+            self._entries = data["entries"]
+        return self._entries
+
+
+def export(cache_dir: Path, archive_path: Path) -> int:
+    """Pack a cache folder, and any caches nested inside it, into an archive.
+
+    Args:
+        cache_dir (Path): The root of the cache.
+        archive_path (Path): Where to save the archive.
+
+    Returns: the number of files packed
+    """
+    cache_dir = Path(cache_dir)
+    archive_path = Path(archive_path)
+
+    # Gather everything the indexes know, preferring what nested caches recorded themselves
+    index = CacheIndex(cache_dir)
+    index.flush()
+    index.reindex()
+    entries = {e.key: e for e in index.query()}
+    nested = nested_indexes(cache_dir)
+    for prefix, nested_index in nested.items():
+        for entry in nested_index.query():
+            key = prefix + entry.key
+            if key in entries:
+                entry.key = key
+                entries[key] = entry
+        nested_index.close()
+    index.close()
+
+    # Write the archive next to where it's going, and swap it in when it's done
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = archive_path.with_name(f".{archive_path.name}.{os.getpid()}.tmp")
+    records = {}
+    blobs: typing.Dict[typing.Tuple[int, int], str] = {}
+    written: typing.Set[str] = set()
+    try:
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for key, entry in sorted(entries.items()):
+                path = cache_dir / key
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                # Names that share a blob on disk share one in the archive, too
+                inode = (stat.st_dev, stat.st_ino)
+                if inode not in blobs:
+                    blob = file_sha256(path)
+                    if blob not in written:
+                        zf.write(path, BLOB_PREFIX + blob)
+                        written.add(blob)
+                    blobs[inode] = blob
+                record = asdict(entry)
+                record.pop("key")
+                record["size"] = stat.st_size
+                record["blob"] = blobs[inode]
+                records[key] = record
+            data = {
+                "version": ARCHIVE_VERSION,
+                "caches": sorted(nested),
+                "entries": records,
+            }
+            zf.writestr(INDEX_MEMBER, json.dumps(data, sort_keys=True))
+        os.replace(tmp_path, archive_path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+    logger.debug(f"Packed {len(records)} files from {cache_dir} into {archive_path}")
+    return len(records)
+
+
+def unpack(archive_path: Path, cache_dir: Path, overwrite: bool = False) -> int:
+    """Copy every file in an archive into a cache folder.
+
+    Files land in the same cache they were packed from, so nested caches
+    get their own blobs and index entries back.
+
+    Args:
+        archive_path (Path): The archive to read.
+        cache_dir (Path): The root of the cache to fill.
+        overwrite (bool): Whether to replace files the cache already has. Default False.
+
+    Returns: the number of files copied
+    """
+    from .cache import Cache
+
+    cache_dir = Path(cache_dir)
+    archive = CacheArchive(archive_path)
+    keys = archive.keys()
+    # Longest prefixes first, so each file goes to the innermost cache that holds it
+    prefixes = sorted(archive.caches, key=len, reverse=True) + [""]
+    caches = {prefix: Cache(str(cache_dir / prefix)) for prefix in prefixes}
+    count = 0
+    for key in keys:
+        prefix = next(p for p in prefixes if key.startswith(p))
+        cache = caches[prefix]
+        name = key[len(prefix) :]
+        if not overwrite and cache.exists(name):
+            continue
+        with archive.open(key) as source:
+            cache.restore(name, source, typing.cast(CacheEntry, archive.entry(key)))
+        count += 1
+    for cache in caches.values():
+        cache.index.close()
+    archive.close()
+    logger.debug(f"Unpacked {count} files from {archive_path} into {cache_dir}")
+    return count
+
+
+def attach(archive_path: Path, cache_dir: Path):
+    """Let caches in the provided folder read files they're missing from an archive.
+
+    Args:
+        archive_path (Path): The archive to read from.
+        cache_dir (Path): The root of the cache the archive was packed from.
+    """
+    global _attached
+    logger.debug(f"Reading missing cache files from {archive_path}")
+    _attached = (CacheArchive(Path(archive_path)), Path(cache_dir))
+
+
+def detach():
+    """Stop reading from the attached archive."""
+    global _attached
+    if _attached is not None:
+        _attached[0].close()
+    _attached = None
+
+
+def view_for(cache_path: Path) -> typing.Optional[Scoped]:
+    """Get the attached archive's files for the provided cache folder, if one's attached and covers it."""
+    if _attached is None:
+        return None
+    return scope(_attached[0], _attached[1], cache_path)
@@ -0,0 +1,286 @@
+import itertools
+import logging
+import os
+import re
+import time
+import typing
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from pathlib import Path
+
+from .blobs import BlobStore
+from .cache import key_lock
+from .cache_index import CacheIndex, nested_indexes
+from .compression import plain_name
+
+logger = logging.getLogger(__name__)
+
+
+# Files that are never evicted, because they can't be fetched again or are costly to.
+# Old PDFs and spreadsheets are often taken down once a new year's file goes up.
+DEFAULT_PINS = ("*.pdf", "*.xls", "*.xlsx", "manifests/*")
+
+# How old a temp file must be before it's assumed to be left over from a crash
+STALE_TEMP_AGE = 24 * 60 * 60
+
+# How recently a blob must have been saved to be spared,
+# because a writer may not have linked a name to it yet
+BLOB_GRACE_AGE = 60 * 60
+
+# The multipliers behind the units a size limit can be written in
+SIZE_UNITS = {
+    "": 1,
+    "B": 1,
+    "K": 1024,
+    "KB": 1024,
+    "M": 1024**2,
+    "MB": 1024**2,
+    "G": 1024**3,
+    "GB": 1024**3,
+    "T": 1024**4,
+    "TB": 1024**4,
+}
+
+
+@dataclass
+class GCResult:
+    """What a garbage collection did, or would do on a dry run.
+
+    Args:
+        evicted (list): The keys of the files removed from the cache.
+        blobs_removed (int): How many blobs no file pointed to anymore.
+        size_before (int): Bytes the cache's files took up beforehand.
+        size_after (int): Bytes the cache's files take up afterward.
+        freed (int): Bytes released, counting unreferenced blobs.
+        temp_removed (int): How many temp files left by interrupted saves were deleted.
+    """
+
+    evicted: typing.List[str] = field(default_factory=list)
+    blobs_removed: int = 0
+    size_before: int = 0
+    size_after: int = 0
+    freed: int = 0
+    temp_removed: int = 0
+
+
+@dataclass
+class _Candidate:
+    """A cached file that could be evicted."""
+
+    key: str
+    path: Path
+    inode: typing.Tuple[int, int]
+    size: int
+    last_used: float
+    pinned: bool
+
+
+def collect(
+    cache_dir: Path,
+    max_size: typing.Optional[int] = None,
+    max_age: typing.Optional[float] = None,
+    pins: typing.Iterable[str] = DEFAULT_PINS,
+    dry_run: bool = False,
+    now: typing.Optional[float] = None,
+) -> GCResult:
+    """Shrink the cache by evicting the files that were used least recently.
+
+    Files not read or fetched within ``max_age`` seconds are evicted first.
+    Then, while the cache is bigger than ``max_size`` bytes, the least recently
+    used file is evicted, and so on. Files that match a pin are always kept.
+    Finally, blobs that no file points to anymore are deleted, along with
+    day-old temp files left behind by saves that were interrupted.
+
+    Caches nested inside the cache folder, like the Job Center sites', are
+    collected along with it, using the access times their own indexes keep.
+
+    Args:
+        cache_dir (Path): The root of the cache.
+        max_size (int): The most bytes the cache's files may take up. Optional.
+        max_age (float): Seconds since a file was last used after which it's evicted. Optional.
+        pins (list): Glob patterns for cache keys that are never evicted. Defaults to DEFAULT_PINS.
+        dry_run (bool): Report what would be removed without removing anything. Default False.
+        now (float): The current time, as a Unix timestamp. Defaults to now.
+
+    Returns: a GCResult
+    """
+    cache_dir = Path(cache_dir)
+    now = time.time() if now is None else now
+    pins = tuple(pins)
+    result = GCResult()
+
+    # Bring the root index up to date with the disk, and find the nested caches
+    index = CacheIndex(cache_dir)
+    index.flush()
+    index.reindex()
+    nested = nested_indexes(cache_dir)
+    nested_access = {}
+    for prefix, nested_index in nested.items():
+        for entry in nested_index.query():
+            if entry.accessed_at is not None:
+                nested_access[prefix + entry.key] = entry.accessed_at
+
+    # Size up every file, counting hardlinks to the same blob once
+    candidates = []
+    names_per_inode: typing.Dict[typing.Tuple[int, int], int] = {}
+    size_per_inode: typing.Dict[typing.Tuple[int, int], int] = {}
+    for entry in index.query():
+        path = cache_dir / entry.key
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        inode = (stat.st_dev, stat.st_ino)
+        names_per_inode[inode] = names_per_inode.get(inode, 0) + 1
+        size_per_inode[inode] = stat.st_size
+        times = [entry.accessed_at, entry.fetched_at, nested_access.get(entry.key)]
+        candidates.append(
+            _Candidate(
+                key=entry.key,
+                path=path,
+                inode=inode,
+                size=stat.st_size,
+                last_used=max(
+                    (t for t in times if t is not None), default=stat.st_mtime
+                ),
+                pinned=any(fnmatchcase(plain_name(entry.key), p) for p in pins),
+            )
+        )
+    usage = sum(size_per_inode.values())
+    result.size_before = usage
+
+    # Choose what goes, oldest first
+    candidates.sort(key=lambda c: (c.last_used, c.key))
+    evicted = []
+    for candidate in candidates:
+        if candidate.pinned:
+            continue
+        too_old = max_age is not None and candidate.last_used < now - max_age
+        too_big = max_size is not None and usage > max_size
+        if not too_old and not too_big:
+            # Everything after this was used more recently, so it all stays
+            break
+        evicted.append(candidate)
+        names_per_inode[candidate.inode] -= 1
+        if names_per_inode[candidate.inode] == 0:
+            usage -= candidate.size
+    result.size_after = usage
+    result.freed = result.size_before - usage
+    result.evicted = [c.key for c in evicted]
+    if max_size is not None and usage > max_size:
+        logger.warning(
+            f"The cache is still {usage} bytes, over its {max_size} byte limit, "
+            "because the rest of its files are pinned"
+        )
+
+    # Remove the files, and the blobs nothing points to anymore
+    if not dry_run:
+        evicted = [c for c in evicted if _evict(cache_dir, index, nested, c)]
+        result.evicted = [c.key for c in evicted]
+    stores = [BlobStore(cache_dir / ".blobs")]
+    stores += [BlobStore(cache_dir / prefix / ".blobs") for prefix in nested]
+    for store in stores:
+        for digest in list(store.digests()):
+            path = store.path(digest)
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if stat.st_nlink > 1:
+                continue
+            inode = (stat.st_dev, stat.st_ino)
+            if stat.st_mtime > now - BLOB_GRACE_AGE:
+                # Leave it for the next run, and don't count it as freed
+                if inode in size_per_inode:
+                    result.freed -= stat.st_size
+                    result.size_after += stat.st_size
+                continue
+            if not dry_run:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    continue
+            result.blobs_removed += 1
+            # Blobs of evicted files were already counted
+            if inode not in size_per_inode:
+                result.freed += stat.st_size
+
+    # Clear out the remains of interrupted saves
+    for path in _stale_temp_files(cache_dir, now):
+        result.temp_removed += 1
+        if not dry_run:
+            path.unlink()
+
+    index.close()
+    for nested_index in nested.values():
+        nested_index.close()
+    logger.debug(
+        f"Evicted {len(result.evicted)} files and {result.blobs_removed} blobs "
+        f"from {cache_dir}, freeing {result.freed} bytes"
+    )
+    return result
+
+
+def parse_size(text: str) -> int:
+    """Read a size like "500MB" or "2G" as a number of bytes."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([A-Za-z]*)\s*", text)
+    if match is None or match.group(2).upper() not in SIZE_UNITS:
+        raise ValueError(f"{text!r} is not a size, like 500MB or 2GB")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+
+def _evict(
+    cache_dir: Path,
+    index: CacheIndex,
+    nested: typing.Dict[str, CacheIndex],
+    candidate: _Candidate,
+):
+    """Delete a file from the cache and drop it from every index that lists it.
+
+    Returns: False if the file was replaced since it was sized up, and so was kept
+    """
+    with ExitStack() as stack:
+        # Keep out anyone saving the file while we remove it
+        stack.enter_context(key_lock(cache_dir, candidate.key))
+        owners = [(p, i) for p, i in nested.items() if candidate.key.startswith(p)]
+        for prefix, _ in owners:
+            stack.enter_context(
+                key_lock(cache_dir / prefix, candidate.key[len(prefix) :])
+            )
+        try:
+            stat = candidate.path.stat()
+        except FileNotFoundError:
+            stat = None
+        if stat is not None and (stat.st_dev, stat.st_ino) != candidate.inode:
+            logger.debug(f"{candidate.key} was just saved again, so it's kept")
+            return False
+        logger.debug(f"Evicting {candidate.key}")
+        if stat is not None:
+            candidate.path.unlink()
+        index.remove(candidate.key)
+        for prefix, nested_index in owners:
+            nested_index.remove(candidate.key[len(prefix) :])
+
+    # Tidy up folders the eviction left empty
+    parent = candidate.path.parent
+    while parent != cache_dir:
+        try:
+            os.rmdir(parent)
+        except OSError:
+            break
+        parent = parent.parent
+    return True
+
+
+def _stale_temp_files(cache_dir: Path, now: float) -> typing.Iterator[Path]:
+    """Find temp files left behind by processes that died partway through saving."""
+    paths = itertools.chain(
+        cache_dir.glob("**/.blobs/tmp/*"), cache_dir.glob("**/.*.tmp")
+    )
+    for path in paths:
+        try:
+            if path.is_file() and path.stat().st_mtime < now - STALE_TEMP_AGE:
+                yield path
+        except FileNotFoundError:
+            continue
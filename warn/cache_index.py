@@ -0,0 +1,337 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import typing
+import weakref
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+# Bump this when the table changes, so old indexes are rebuilt from disk
+SCHEMA_VERSION = "1"
+
+# The suffix of the sidecar files older caches used to store HTTP validators
+LEGACY_VALIDATOR_SUFFIX = ".meta.json"
+
+# How many access times to hold in memory before writing them out
+TOUCH_BATCH = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    url TEXT,
+    fetched_at REAL,
+    size INTEGER,
+    digest TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    accessed_at REAL
+);
+CREATE INDEX IF NOT EXISTS entries_fetched_at ON entries (fetched_at);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+@dataclass
+class CacheEntry:
+    """A row in the cache index.
+
+    Args:
+        key (str): The file's name, relative to the cache directory.
+        url (str): Where the file was downloaded from, if it was downloaded.
+        fetched_at (float): When the content was saved, as a Unix timestamp.
+        size (int): The file's size in bytes.
+        digest (str): The SHA-256 hash of the content, if known.
+        etag (str): The ETag the server sent with the download, if any.
+        last_modified (str): The Last-Modified header the server sent, if any.
+        accessed_at (float): When the file was last read, as a Unix timestamp.
+    """
+
+    key: str
+    url: typing.Optional[str] = None
+    fetched_at: typing.Optional[float] = None
+    size: typing.Optional[int] = None
+    digest: typing.Optional[str] = None
+    etag: typing.Optional[str] = None
+    last_modified: typing.Optional[str] = None
+    accessed_at: typing.Optional[float] = None
+
+
+class CacheIndex:
+    """An SQLite table of everything saved in a cache directory.
+
+    The Cache asks the index whether files exist and what a folder holds,
+    rather than stat-ing and globbing the disk. The first time an index is
+    opened, it's filled in by walking the directory, which also moves the
+    HTTP validators from older caches' sidecar files into the table.
+
+    Access times are batched in memory and written out every so often,
+    so reads from the cache don't each cost a database write.
+
+    Example:
+        Find Kansas detail pages fetched before 2024::
+
+            index = CacheIndex(Path("~/.warn-scraper/cache/ks"))
+            index.query(prefix="records/", fetched_before=datetime(2024, 1, 1))
+
+    Args:
+        root (Path): The cache directory being indexed.
+    """
+
+    # The database's file name, inside the cache directory
+    FILENAME = ".index.sqlite3"
+
+    def __init__(self, root: Path):
+        """Initialize a new instance."""
+        self.root = Path(root)
+        self.path = self.root / self.FILENAME
+        self._lock = threading.RLock()
+        self._state: typing.Dict[str, typing.Any] = {"conn": None, "touched": {}}
+        weakref.finalize(self, _close, self._state)
+
+    def get(self, key: str) -> typing.Optional[CacheEntry]:
+        """Get the entry for the provided key, if there is one."""
+        rows = self._execute("SELECT * FROM entries WHERE key = ?", (key,))
+        return CacheEntry(**dict(rows[0])) if rows else None
+
+    def contains(self, key: str) -> bool:
+        """Whether the provided key is in the index."""
+        return bool(self._execute("SELECT 1 FROM entries WHERE key = ?", (key,)))
+
+    def put(
+        self,
+        key: str,
+        size: int,
+        digest: typing.Optional[str] = None,
+        url: typing.Optional[str] = None,
+        etag: typing.Optional[str] = None,
+        last_modified: typing.Optional[str] = None,
+        fetched_at: typing.Optional[float] = None,
+    ):
+        """Add or replace the entry for a freshly saved file.
+
+        Args:
+            key (str): The file's name, relative to the cache directory.
+            size (int): The file's size in bytes.
+            digest (str): The SHA-256 hash of the content. Optional.
+            url (str): Where the file was downloaded from. Optional.
+            etag (str): The ETag the server sent with the download. Optional.
+            last_modified (str): The Last-Modified header the server sent. Optional.
+            fetched_at (float): When the content was saved. Defaults to now.
+        """
+        now = time.time()
+        self._execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                url,
+                now if fetched_at is None else fetched_at,
+                size,
+                digest,
+                etag,
+                last_modified,
+                now,
+            ),
+            commit=True,
+        )
+
+    def remove(self, key: str):
+        """Drop the entry for the provided key."""
+        self._execute("DELETE FROM entries WHERE key = ?", (key,), commit=True)
+
+    def touch(self, key: str):
+        """Note that a file was just read."""
+        touched = self._state["touched"]
+        touched[key] = time.time()
+        if len(touched) >= TOUCH_BATCH:
+            self.flush()
+
+    def flush(self):
+        """Write out any access times held in memory."""
+        with self._lock:
+            self._connect()
+            _flush(self._state)
+
+    def keys(self, prefix: str = "") -> typing.List[str]:
+        """Get every key that starts with the provided prefix, in order."""
+        rows = self._execute(
+            "SELECT key FROM entries WHERE key >= ? AND key < ? ORDER BY key",
+            _prefix_range(prefix),
+        )
+        return [row["key"] for row in rows]
+
+    def query(
+        self,
+        prefix: str = "",
+        fetched_before: typing.Optional[datetime] = None,
+        fetched_after: typing.Optional[datetime] = None,
+    ) -> typing.List[CacheEntry]:
+        """Find entries by key prefix and fetch time.
+
+        Args:
+            prefix (str): Only return keys that start with this, like "records/"
+            fetched_before (datetime): Only return files saved before this time
+            fetched_after (datetime): Only return files saved after this time
+
+        Returns: a list of CacheEntry objects ordered by key
+        """
+        sql = "SELECT * FROM entries WHERE key >= ? AND key < ?"
+        params: typing.List[typing.Any] = list(_prefix_range(prefix))
+        if fetched_before is not None:
+            sql += " AND fetched_at < ?"
+            params.append(fetched_before.timestamp())
+        if fetched_after is not None:
+            sql += " AND fetched_at > ?"
+            params.append(fetched_after.timestamp())
+        rows = self._execute(sql + " ORDER BY key", tuple(params))
+        return [CacheEntry(**dict(row)) for row in rows]
+
+    def reindex(self) -> int:
+        """Rebuild the index from the files on disk.
+
+        Entries for files that are gone are dropped, and new files are added.
+        What we already know about files that are still there, like their
+        source URL and hash, is kept. Validators in legacy sidecar files are
+        moved into the index and the sidecars are deleted.
+
+        Returns: the number of files indexed
+        """
+        with self._lock:
+            conn = self._connect()
+            found = {}
+            sidecars = []
+            for dirpath, dirnames, filenames in os.walk(self.root):
+                # Skip the blob store, the database and any temp files
+                dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+                for filename in filenames:
+                    if filename.startswith("."):
+                        continue
+                    path = Path(dirpath, filename)
+                    if filename.endswith(LEGACY_VALIDATOR_SUFFIX):
+                        sidecars.append(path)
+                        continue
+                    key = path.relative_to(self.root).as_posix()
+                    stat = path.stat()
+                    found[key] = (stat.st_size, stat.st_mtime)
+            with conn:
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (key TEXT)")
+                conn.execute("DELETE FROM seen")
+                conn.executemany(
+                    "INSERT INTO seen VALUES (?)", ((k,) for k in found.keys())
+                )
+                conn.execute(
+                    "DELETE FROM entries WHERE key NOT IN (SELECT key FROM seen)"
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO entries (key, fetched_at, size) VALUES (?, ?, ?)",
+                    ((k, mtime, size) for k, (size, mtime) in found.items()),
+                )
+                conn.executemany(
+                    "UPDATE entries SET size = ? WHERE key = ?",
+                    ((size, k) for k, (size, _) in found.items()),
+                )
+                for sidecar in sidecars:
+                    self._migrate_sidecar(conn, sidecar)
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('schema', ?)",
+                    (SCHEMA_VERSION,),
+                )
+            logger.debug(f"Indexed {len(found)} files in {self.root}")
+            return len(found)
+
+    def close(self):
+        """Write out pending access times and close the database."""
+        with self._lock:
+            _close(self._state)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database, creating and filling it in if it's new."""
+        conn = self._state["conn"]
+        if conn is not None:
+            return conn
+        self.root.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # Let parallel scrapers read while another one writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        self._state["conn"] = conn
+        row = conn.execute("SELECT value FROM meta WHERE name = 'schema'").fetchone()
+        if row is None or row["value"] != SCHEMA_VERSION:
+            logger.debug(f"Building the cache index for {self.root}")
+            self.reindex()
+        return conn
+
+    def _execute(
+        self, sql: str, params: tuple = (), commit: bool = False
+    ) -> typing.List[sqlite3.Row]:
+        """Run a statement, opening the database first if need be, and get its rows."""
+        with self._lock:
+            conn = self._connect()
+            if commit:
+                with conn:
+                    return conn.execute(sql, params).fetchall()
+            return conn.execute(sql, params).fetchall()
+
+    def _migrate_sidecar(self, conn: sqlite3.Connection, sidecar: Path):
+        """Move the validators in a legacy sidecar file into the index."""
+        key = sidecar.relative_to(self.root).as_posix()[: -len(LEGACY_VALIDATOR_SUFFIX)]
+        try:
+            with open(sidecar, encoding="utf-8") as fh:
+                validators = json.load(fh)
+        except (OSError, ValueError):
+            validators = {}
+        conn.execute(
+            "UPDATE entries SET url = ?, etag = ?, last_modified = ? WHERE key = ?",
+            (
+                validators.get("url"),
+                validators.get("etag"),
+                validators.get("last_modified"),
+                key,
+            ),
+        )
+        sidecar.unlink()
+
+
+def nested_indexes(cache_dir: Path) -> typing.Dict[str, CacheIndex]:
+    """Find the indexes of the caches kept inside a cache folder, keyed by prefix, like "ks/"."""
+    nested = {}
+    for path in sorted(cache_dir.glob(f"**/{CacheIndex.FILENAME}")):
+        if path.parent == cache_dir:
+            continue
+        prefix = path.parent.relative_to(cache_dir).as_posix() + "/"
+        nested[prefix] = CacheIndex(path.parent)
+    return nested
+
+
+def _prefix_range(prefix: str) -> typing.Tuple[str, str]:
+    """Get the bounds of the keys that start with a prefix, so the primary key can be searched."""
+    return prefix, prefix + "\U0010ffff"
+
+
+def _flush(state: typing.Dict):
+    """Write out the access times held in memory."""
+    conn, touched = state["conn"], state["touched"]
+    if conn is None or not touched:
+        return
+    items = [(accessed_at, key) for key, accessed_at in touched.items()]
+    touched.clear()
+    with conn:
+        conn.executemany("UPDATE entries SET accessed_at = ? WHERE key = ?", items)
+
+
+def _close(state: typing.Dict):
+    """Flush and close an index's database, if it's open."""
+    if state["conn"] is None:
+        return
+    try:
+        _flush(state)
+    finally:
+        state["conn"].close()
+        state["conn"] = None
@@ -0,0 +1,97 @@
+import json
+import logging
+import typing
+from pathlib import Path
+
+from .cache_index import CacheIndex, nested_indexes
+from .report import CacheStats
+
+logger = logging.getLogger(__name__)
+
+
+def from_report(data: typing.Dict) -> typing.Dict[str, CacheStats]:
+    """Get the cache counts out of a saved run report, keyed by namespace."""
+    return {
+        namespace: CacheStats(**counts)
+        for namespace, counts in (data.get("cache") or {}).items()
+    }
+
+
+def from_log_dir(
+    log_dir: Path,
+    all_runs: bool = False,
+    states: typing.Optional[typing.Iterable[str]] = None,
+) -> typing.Dict[str, CacheStats]:
+    """Add up the cache counts in the run reports saved to a log directory.
+
+    Args:
+        log_dir (Path): The directory where run reports are kept.
+        all_runs (bool): Count every run in runs.jsonl, rather than each state's latest. Default False.
+        states (list): Only count runs of these states. Optional.
+
+    Returns: a dict of CacheStats keyed by namespace, in order
+    """
+    log_dir = Path(log_dir)
+    wanted = {s.lower() for s in states} if states else None
+    totals: typing.Dict[str, CacheStats] = {}
+    for data in _reports(log_dir, all_runs):
+        if wanted is not None and data.get("state") not in wanted:
+            continue
+        for namespace, stats in from_report(data).items():
+            totals.setdefault(namespace, CacheStats()).add(stats)
+    return dict(sorted(totals.items()))
+
+
+def total(stats: typing.Iterable[CacheStats]) -> CacheStats:
+    """Add up the counts of many namespaces."""
+    result = CacheStats()
+    for s in stats:
+        result.add(s)
+    return result
+
+
+def disk_usage(cache_dir: Path) -> typing.Dict[str, typing.Tuple[int, int]]:
+    """Get the number of files, and bytes, each namespace of a cache folder holds.
+
+    This goes by the cache's indexes, including those of caches nested inside it.
+
+    Args:
+        cache_dir (Path): The root of the cache.
+
+    Returns: a dict of (files, bytes) keyed by namespace, in order
+    """
+    cache_dir = Path(cache_dir)
+    sizes = {}
+    index = CacheIndex(cache_dir)
+    for entry in index.query():
+        sizes[entry.key] = entry.size or 0
+    index.close()
+    for prefix, nested_index in nested_indexes(cache_dir).items():
+        for entry in nested_index.query():
+            sizes[prefix + entry.key] = entry.size or 0
+        nested_index.close()
+    usage: typing.Dict[str, typing.Tuple[int, int]] = {}
+    for key, size in sizes.items():
+        parts = key.split("/", 1)
+        namespace = parts[0] if len(parts) > 1 else "."
+        files, nbytes = usage.get(namespace, (0, 0))
+        usage[namespace] = (files + 1, nbytes + size)
+    return dict(sorted(usage.items()))
+
+
+def _reports(log_dir: Path, all_runs: bool) -> typing.Iterator[typing.Dict]:
+    """Read the run reports in a log directory."""
+    if all_runs:
+        path = log_dir / "runs.jsonl"
+        if not path.exists():
+            return
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+        return
+    for path in sorted(log_dir.glob("*.json")):
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+        if isinstance(data, dict) and "state" in data:
+            yield data
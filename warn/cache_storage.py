@@ -0,0 +1,594 @@
+import abc
+import hashlib
+import hmac
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import typing
+import xml.etree.ElementTree as ET
+from dataclasses import replace
+from pathlib import Path
+from urllib.parse import parse_qsl, quote, urlsplit
+
+from .blobs import BlobStore
+from .cache_index import CacheEntry, CacheIndex
+
+if typing.TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+
+# The object metadata header S3Storage keeps each file's index entry in
+S3_ENTRY_HEADER = "x-amz-meta-warn-entry"
+
+# The entry fields a store keeps alongside each file's content
+ENTRY_FIELDS = ("url", "fetched_at", "digest", "etag", "last_modified")
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    key TEXT PRIMARY KEY,
+    data BLOB,
+    size INTEGER,
+    url TEXT,
+    fetched_at REAL,
+    digest TEXT,
+    etag TEXT,
+    last_modified TEXT
+);
+"""
+
+# The store attached to scrapes run in this process, and the cache folder it stands behind
+_attached: typing.Optional[typing.Tuple["Storage", Path]] = None
+
+
+class Storage(abc.ABC):
+    """Somewhere outside the cache folder that cached files can be kept and shared.
+
+    A store holds each file's content exactly as the cache stored it,
+    compressed or not, along with the parts of its index entry that
+    freshness rules and revalidation need. Keys are relative to the root
+    of the cache, like "ks/records/123.html".
+    """
+
+    @abc.abstractmethod
+    def entry(self, key: str) -> typing.Optional[CacheEntry]:
+        """Get what the store knows about the provided file, if it holds it."""
+
+    def contains(self, key: str) -> bool:
+        """Whether the store holds the provided file."""
+        return self.entry(key) is not None
+
+    @abc.abstractmethod
+    def keys(self, prefix: str = "") -> typing.List[str]:
+        """Get every key that starts with the provided prefix, in order."""
+
+    @abc.abstractmethod
+    def read(self, key: str) -> bytes:
+        """Get the provided file's content, as it was stored in the cache.
+
+        Raises: KeyError if the store doesn't hold the file
+        """
+
+    def open(self, key: str) -> typing.BinaryIO:
+        """Open the provided file's content for streaming, as it was stored in the cache.
+
+        Raises: KeyError if the store doesn't hold the file
+        """
+        return io.BytesIO(self.read(key))
+
+    @abc.abstractmethod
+    def save(self, key: str, path: Path, entry: CacheEntry):
+        """Keep a copy of a cached file.
+
+        Args:
+            key (str): The file's key.
+            path (Path): The file in the cache folder, as it was stored.
+            entry (CacheEntry): The file's index entry.
+        """
+
+    @abc.abstractmethod
+    def remove(self, key: str):
+        """Drop the provided file, if the store holds it."""
+
+    def close(self):  # noqa: B027
+        """Let go of any open files or connections. Stores that hold none needn't define it."""
+        pass
+
+
+class Scoped(Storage):
+    """The part of a store that belongs to a cache folder nested inside the one it stands behind.
+
+    Args:
+        storage (Storage): The whole store.
+        prefix (str): Where the cache folder sits within the root one, like "ks/".
+    """
+
+    def __init__(self, storage: Storage, prefix: str):
+        """Initialize a new instance."""
+        self.storage = storage
+        self.prefix = prefix
+
+    def entry(self, key: str) -> typing.Optional[CacheEntry]:
+        """Get what the store knows about the provided file, keyed like the cache folder's index."""
+        entry = self.storage.entry(self.prefix + key)
+        if entry is not None:
+            entry.key = key
+        return entry
+
+    def contains(self, key: str) -> bool:
+        """Whether the store holds the provided file."""
+        return self.storage.contains(self.prefix + key)
+
+    def keys(self, prefix: str = "") -> typing.List[str]:
+        """Get every key in the cache folder that starts with the provided prefix, in order."""
+        start = len(self.prefix)
+        return [k[start:] for k in self.storage.keys(self.prefix + prefix)]
+
+    def read(self, key: str) -> bytes:
+        """Get the provided file's content, as it was stored in the cache."""
+        return self.storage.read(self.prefix + key)
+
+    def open(self, key: str) -> typing.BinaryIO:
+        """Open the provided file's content for streaming."""
+        return self.storage.open(self.prefix + key)
+
+    def save(self, key: str, path: Path, entry: CacheEntry):
+        """Keep a copy of a cached file."""
+        self.storage.save(self.prefix + key, path, entry)
+
+    def remove(self, key: str):
+        """Drop the provided file, if the store holds it."""
+        self.storage.remove(self.prefix + key)
+
+    def __repr__(self):
+        """Describe the store."""
+        return f"{self.storage!r}/{self.prefix}"
+
+
+class FileStorage(Storage):
+    """A folder laid out like a cache, such as one on a shared network drive.
+
+    Files are saved in blobs and indexed just as the Cache does it, so the
+    folder can also be used as a cache in its own right.
+
+    Args:
+        root (Path): The folder.
+    """
+
+    def __init__(self, root: Path):
+        """Initialize a new instance."""
+        self.root = Path(root)
+        self.index = CacheIndex(self.root)
+        self.blobs = BlobStore(self.root / ".blobs")
+
+    def entry(self, key: str) -> typing.Optional[CacheEntry]:
+        """Get what the store knows about the provided file, if it holds it."""
+        entry = self.index.get(key)
+        if entry is None or not (self.root / key).is_file():
+            return None
+        return entry
+
+    def keys(self, prefix: str = "") -> typing.List[str]:
+        """Get every key that starts with the provided prefix, in order."""
+        return self.index.keys(prefix)
+
+    def read(self, key: str) -> bytes:
+        """Get the provided file's content, as it was stored in the cache."""
+        try:
+            return (self.root / key).read_bytes()
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def open(self, key: str) -> typing.BinaryIO:
+        """Open the provided file's content for streaming."""
+        try:
+            return open(self.root / key, "rb")
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def save(self, key: str, path: Path, entry: CacheEntry):
+        """Keep a copy of a cached file."""
+        from .cache import key_lock
+
+        with key_lock(self.root, key), open(path, "rb") as source:
+            digest, size = self.blobs.put_stream(source)
+            self.blobs.link(digest, self.root / key)
+            self.index.put(key, size=size, **_entry_fields(entry))
+
+    def remove(self, key: str):
+        """Drop the provided file, if the store holds it."""
+        from .cache import key_lock
+
+        with key_lock(self.root, key):
+            try:
+                (self.root / key).unlink()
+            except FileNotFoundError:
+                pass
+            self.index.remove(key)
+
+    def close(self):
+        """Close the folder's index."""
+        self.index.close()
+
+    def __repr__(self):
+        """Describe the store."""
+        return f"FileStorage({str(self.root)!r})"
+
+
+class SQLiteStorage(Storage):
+    """A single SQLite database file holding every cached file and its entry.
+
+    One file is easy to copy around, and SQLite lets several processes on
+    the same machine read and write it at once.
+
+    Args:
+        path (Path): The database file. It's created if it doesn't exist.
+    """
+
+    def __init__(self, path: Path):
+        """Initialize a new instance."""
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._conn: typing.Optional[sqlite3.Connection] = None
+
+    def entry(self, key: str) -> typing.Optional[CacheEntry]:
+        """Get what the store knows about the provided file, if it holds it."""
+        rows = self._execute(
+            "SELECT key, size, url, fetched_at, digest, etag, last_modified "
+            "FROM objects WHERE key = ?",
+            (key,),
+        )
+        return CacheEntry(**dict(rows[0])) if rows else None
+
+    def keys(self, prefix: str = "") -> typing.List[str]:
+        """Get every key that starts with the provided prefix, in order."""
+        rows = self._execute(
+            "SELECT key FROM objects WHERE key >= ? AND key < ? ORDER BY key",
+            (prefix, prefix + "\U0010ffff"),
+        )
+        return [row["key"] for row in rows]
+
+    def read(self, key: str) -> bytes:
+        """Get the provided file's content, as it was stored in the cache."""
+        rows = self._execute("SELECT data FROM objects WHERE key = ?", (key,))
+        if not rows:
+            raise KeyError(key)
+        return bytes(rows[0]["data"])
+
+    def save(self, key: str, path: Path, entry: CacheEntry):
+        """Keep a copy of a cached file."""
+        data = Path(path).read_bytes()
+        fields = _entry_fields(entry)
+        self._execute(
+            "INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, data, len(data)) + tuple(fields[f] for f in ENTRY_FIELDS),
+            commit=True,
+        )
+
+    def remove(self, key: str):
+        """Drop the provided file, if the store holds it."""
+        self._execute("DELETE FROM objects WHERE key = ?", (key,), commit=True)
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _execute(
+        self, sql: str, params: tuple = (), commit: bool = False
+    ) -> typing.List[sqlite3.Row]:
+        """Run a statement, opening the database first if need be, and get its rows."""
+        with self._lock:
+            if self._conn is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._conn = sqlite3.connect(
+                    str(self.path), timeout=30, check_same_thread=False
+                )
+                self._conn.row_factory = sqlite3.Row
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.executescript(SQLITE_SCHEMA)
+            if commit:
+                with self._conn:
+                    return self._conn.execute(sql, params).fetchall()
+            return self._conn.execute(sql, params).fetchall()
+
+    def __repr__(self):
+        """Describe the store."""
+        return f"SQLiteStorage({str(self.path)!r})"
+
+
+class S3Storage(Storage):
+    """A bucket in Amazon S3, or any object store that speaks its API, like MinIO.
+
+    Each file is an object under the prefix, with its index entry kept in
+    the object's metadata. Requests are signed with AWS Signature Version 4
+    and sent over the shared connection pool, with the shared retry policy.
+
+    Credentials and the region are read from the standard AWS environment
+    variables unless they're provided. So is the endpoint, from ``AWS_ENDPOINT_URL``,
+    which lets the store point at a local or self-hosted server.
+
+    Example:
+        Share a cache through a MinIO server::
+
+            storage = S3Storage("warn-cache", endpoint="http://localhost:9000")
+
+    Args:
+        bucket (str): The bucket's name.
+        prefix (str): A folder in the bucket to keep the files under. Optional.
+        endpoint (str): The server's base URL. Defaults to AWS's for the region.
+        region (str): The bucket's region. Default us-east-1.
+        access_key (str): The access key ID.
+        secret_key (str): The secret access key.
+        session_token (str): A temporary session token, if the credentials need one.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint: typing.Optional[str] = None,
+        region: typing.Optional[str] = None,
+        access_key: typing.Optional[str] = None,
+        secret_key: typing.Optional[str] = None,
+        session_token: typing.Optional[str] = None,
+    ):
+        """Initialize a new instance."""
+        env = os.environ
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.region = (
+            region
+            or env.get("AWS_REGION")
+            or env.get("AWS_DEFAULT_REGION")
+            or "us-east-1"
+        )
+        self.endpoint = (
+            endpoint
+            or env.get("AWS_ENDPOINT_URL")
+            or f"https://s3.{self.region}.amazonaws.com"
+        ).rstrip("/")
+        self.access_key = access_key or env.get("AWS_ACCESS_KEY_ID") or ""
+        self.secret_key = secret_key or env.get("AWS_SECRET_ACCESS_KEY") or ""
+        self.session_token = session_token or env.get("AWS_SESSION_TOKEN")
+        # What HEAD requests found, so asking about a file over and over costs one round trip
+        self._entries: typing.Dict[str, typing.Optional[CacheEntry]] = {}
+        self._lock = threading.Lock()
+
+    def entry(self, key: str) -> typing.Optional[CacheEntry]:
+        """Get what the store knows about the provided file, if it holds it."""
+        with self._lock:
+            if key in self._entries:
+                return _copy_entry(self._entries[key])
+        r = self._request("HEAD", key)
+        if r.status_code == 404:
+            entry = None
+        else:
+            r.raise_for_status()
+            fields = json.loads(r.headers.get(S3_ENTRY_HEADER) or "{}")
+            entry = CacheEntry(
+                key=key,
+                size=int(r.headers.get("Content-Length", 0)),
+                **{f: fields.get(f) for f in ENTRY_FIELDS},
+            )
+        with self._lock:
+            self._entries[key] = entry
+        return _copy_entry(entry)
+
+    def keys(self, prefix: str = "") -> typing.List[str]:
+        """Get every key that starts with the provided prefix, in order."""
+        keys = []
+        params = {"list-type": "2", "prefix": self.prefix + prefix}
+        while True:
+            r = self._request("GET", params=params)
+            r.raise_for_status()
+            root = ET.fromstring(r.content)
+            for element in root:
+                if _tag(element) == "Contents":
+                    name = next(c.text or "" for c in element if _tag(c) == "Key")
+                    keys.append(name[len(self.prefix) :])
+            truncated = next((c.text for c in root if _tag(c) == "IsTruncated"), "")
+            token = next(
+                (c.text for c in root if _tag(c) == "NextContinuationToken"), None
+            )
+            if truncated != "true" or not token:
+                return sorted(keys)
+            params["continuation-token"] = token
+
+    def read(self, key: str) -> bytes:
+        """Get the provided file's content, as it was stored in the cache."""
+        r = self._request("GET", key)
+        if r.status_code == 404:
+            raise KeyError(key)
+        r.raise_for_status()
+        return r.content
+
+    def save(self, key: str, path: Path, entry: CacheEntry):
+        """Keep a copy of a cached file."""
+        data = Path(path).read_bytes()
+        fields = _entry_fields(entry)
+        headers = {S3_ENTRY_HEADER: json.dumps(fields, sort_keys=True)}
+        r = self._request("PUT", key, data=data, headers=headers)
+        r.raise_for_status()
+        stored = CacheEntry(key=key, size=len(data), **fields)
+        with self._lock:
+            self._entries[key] = stored
+
+    def remove(self, key: str):
+        """Drop the provided file, if the store holds it."""
+        r = self._request("DELETE", key)
+        if r.status_code != 404:
+            r.raise_for_status()
+        with self._lock:
+            self._entries[key] = None
+
+    def _request(
+        self,
+        method: str,
+        key: typing.Optional[str] = None,
+        params: typing.Optional[typing.Dict[str, str]] = None,
+        data: bytes = b"",
+        headers: typing.Optional[typing.Dict[str, str]] = None,
+    ) -> "requests.Response":
+        """Send a signed request for an object, or for the bucket if there's no key."""
+        from .retries import policy
+        from .sessions import get_session
+
+        path = f"/{self.bucket}"
+        if key is not None:
+            path += "/" + quote(self.prefix + key, safe="/-_.~")
+        query = "&".join(
+            f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}"
+            for k, v in sorted((params or {}).items())
+        )
+        url = self.endpoint + path + (f"?{query}" if query else "")
+        headers = dict(headers or {})
+        headers.update(self._sign(method, path, query, headers, data))
+        session = get_session(url)
+
+        def _send():
+            return session.request(method, url, data=data, headers=headers)
+
+        logger.debug(f"{method} {url}")
+        return policy.request(_send, url)
+
+    def _sign(
+        self,
+        method: str,
+        path: str,
+        query: str,
+        headers: typing.Dict[str, str],
+        data: bytes,
+        now: typing.Optional[float] = None,
+    ) -> typing.Dict[str, str]:
+        """Get the headers that sign a request with AWS Signature Version 4."""
+        stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(now))
+        day = stamp[:8]
+        signed = {k.lower(): v.strip() for k, v in headers.items()}
+        signed["host"] = urlsplit(self.endpoint).netloc
+        signed["x-amz-content-sha256"] = hashlib.sha256(data).hexdigest()
+        signed["x-amz-date"] = stamp
+        if self.session_token:
+            signed["x-amz-security-token"] = self.session_token
+        names = ";".join(sorted(signed))
+        canonical = "\n".join(
+            [
+                method,
+                path,
+                query,
+                "".join(f"{k}:{signed[k]}\n" for k in sorted(signed)),
+                names,
+                signed["x-amz-content-sha256"],
+            ]
+        )
+        scope = f"{day}/{self.region}/s3/aws4_request"
+        to_sign = "\n".join(
+            [
+                "AWS4-HMAC-SHA256",
+                stamp,
+                scope,
+                hashlib.sha256(canonical.encode("utf-8")).hexdigest(),
+            ]
+        )
+        key = ("AWS4" + self.secret_key).encode("utf-8")
+        for part in (day, self.region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode("utf-8"), hashlib.sha256).digest()
+        signature = hmac.new(key, to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+        signed["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={names}, Signature={signature}"
+        )
+        signed.pop("host")
+        return signed
+
+    def __repr__(self):
+        """Describe the store."""
+        return f"S3Storage('s3://{self.bucket}/{self.prefix}')"
+
+
+def from_url(url: str) -> Storage:
+    """Open the store described by a URL.
+
+    Examples: ::
+
+        from_url("/mnt/shared/warn-cache")  # A folder
+        from_url("sqlite:///tmp/warn-cache.sqlite3")  # A database file
+        from_url("s3://my-bucket/warn-cache?endpoint=http://localhost:9000")  # A bucket
+
+    Raises: ValueError if the URL's scheme isn't supported
+    """
+    if "://" not in url:
+        return FileStorage(Path(url))
+    scheme, rest = url.split("://", 1)
+    if scheme == "file":
+        return FileStorage(Path(rest))
+    if scheme == "sqlite":
+        return SQLiteStorage(Path(rest))
+    if scheme == "s3":
+        parts = urlsplit(url)
+        options = dict(parse_qsl(parts.query))
+        return S3Storage(
+            parts.netloc,
+            prefix=parts.path,
+            endpoint=options.get("endpoint"),
+            region=options.get("region"),
+        )
+    raise ValueError(f"{url} isn't a folder, sqlite:// file or s3:// bucket")
+
+
+def scope(storage: Storage, root: Path, cache_path: Path) -> typing.Optional[Scoped]:
+    """Get the part of a store that belongs to a cache folder, if the folder is inside its root."""
+    try:
+        relative = Path(cache_path).resolve().relative_to(root.resolve()).as_posix()
+    except ValueError:
+        return None
+    return Scoped(storage, "" if relative == "." else relative + "/")
+
+
+def attach(storage: Storage, cache_dir: Path):
+    """Share the files of caches in the provided folder through a store.
+
+    Args:
+        storage (Storage): The store.
+        cache_dir (Path): The root of the cache the store stands behind.
+    """
+    global _attached
+    logger.debug(f"Sharing cached files through {storage!r}")
+    _attached = (storage, Path(cache_dir))
+
+
+def detach():
+    """Stop sharing through the attached store."""
+    global _attached
+    if _attached is not None:
+        _attached[0].close()
+    _attached = None
+
+
+def view_for(cache_path: Path) -> typing.Optional[Scoped]:
+    """Get the attached store's files for the provided cache folder, if one's attached and covers it."""
+    if _attached is None:
+        return None
+    return scope(_attached[0], _attached[1], cache_path)
+
+
+def _entry_fields(entry: CacheEntry) -> typing.Dict[str, typing.Any]:
+    """Get the parts of an index entry that a store keeps."""
+    return {f: getattr(entry, f) for f in ENTRY_FIELDS}
+
+
+def _copy_entry(entry: typing.Optional[CacheEntry]) -> typing.Optional[CacheEntry]:
+    """Copy an entry, so callers can change it without touching what's remembered."""
+    return None if entry is None else replace(entry)
+
+
+def _tag(element: ET.Element) -> str:
+    """Get an XML element's tag without its namespace."""
+    return element.tag.rsplit("}", 1)[-1]
@@ -1,4 +1,6 @@
 import logging
+import sys
+import typing
 from pathlib import Path
 
 import click
@@ -6,7 +8,36 @@ import click
 from . import Runner, utils
 
 
-@click.command()
+class DefaultGroup(click.Group):
+    """A group of commands that runs ``scrape`` when no other command is named.
+
+    That keeps ``warn-scraper AK CT`` working alongside commands like ``warn-scraper cache gc``.
+    """
+
+    default_command = "scrape"
+
+    def parse_args(self, ctx, args):
+        """Put the default command in front of arguments that don't start with a command."""
+        if (
+            args
+            and args[0] not in self.commands
+            and args[0] not in ctx.help_option_names
+        ):
+            args.insert(0, self.default_command)
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=DefaultGroup)
+def main():
+    """
+    Command-line interface for downloading WARN Act notices.
+
+    Scrape states with `warn-scraper AK CT`, which is short for `warn-scraper scrape AK CT`.
+    """
+    pass
+
+
+@main.command()
 @click.argument("scrapers", nargs=-1)
 @click.option(
     "--data-dir",
@@ -20,11 +51,43 @@ from . import Runner, utils
     type=click.Path(),
     help="The Path where results can be cached",
 )
+@click.option(
+    "--log-dir",
+    default=utils.WARN_LOG_DIR,
+    type=click.Path(),
+    help="The Path where run reports will be saved",
+)
+@click.option(
+    "--cache-archive",
+    default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    envvar="WARN_CACHE_ARCHIVE",
+    help="A cache archive to read files missing from the cache out of",
+)
+@click.option(
+    "--cache-storage",
+    default=None,
+    envvar="WARN_CACHE_STORAGE",
+    help="A folder, sqlite:// file or s3:// bucket to share cached files through",
+)
 @click.option(
     "--delete/--no-delete",
     default=False,
     help="Delete generated files from the cache",
 )
+@click.option(
+    "--jobs",
+    "-j",
+    default=1,
+    type=click.IntRange(min=1),
+    help="The number of scrapers to run at the same time",
+)
+@click.option(
+    "--timeout",
+    default=None,
+    type=click.FloatRange(min=0, min_open=True),
+    help="Seconds any one scraper may run before it's killed. Defaults vary by scraper.",
+)
 @click.option(
     "--log-level",
     "-l",
@@ -34,31 +97,36 @@ from . import Runner, utils
     ),
     help="Set the logging level",
 )
-def main(
+def scrape(
     scrapers: list,
     data_dir: Path,
     cache_dir: Path,
+    log_dir: Path,
+    cache_archive: typing.Optional[str],
+    cache_storage: typing.Optional[str],
     delete: bool,
+    jobs: int,
+    timeout: float,
     log_level: str,
 ):
     """
-    Command-line interface for downloading WARN Act notices.
+    Download WARN Act notices.
 
     SCRAPERS -- a list of one or more postal codes to scrape. Pass `all` to scrape all supported states and territories.
     """
-    # Set higher log-level on third-party libs that use DEBUG logging,
-    # In order to limit debug logging to our library
-    logging.getLogger("urllib3").setLevel(logging.ERROR)
-    logging.getLogger("pdfminer").setLevel(logging.WARNING)
-
-    # Local logging config
-    logging.basicConfig(level=log_level, format="%(asctime)s - %(name)s - %(message)s")
-    logger = logging.getLogger(__name__)
+    logger = _configure_logging(log_level)
 
     # Runner config
     data_dir = Path(data_dir)
     cache_dir = Path(cache_dir)
-    runner = Runner(data_dir, cache_dir)
+    runner = Runner(
+        data_dir,
+        cache_dir,
+        timeout=timeout,
+        log_dir=Path(log_dir),
+        archive=None if cache_archive is None else Path(cache_archive),
+        storage=cache_storage,
+    )
 
     # Delete files, if asked
     if delete:
@@ -69,10 +137,294 @@ def main(
     if "all" in scrapers:
         scrapers = utils.get_all_scrapers()
 
-    # Loop through the states
-    for scrape in scrapers:
-        # Try running the scraper
-        runner.scrape(scrape)
+    # Run the states, each in its own process so a stuck one can be killed
+    results = runner.scrape_parallel(scrapers, jobs=jobs)
+
+    # Report how each state fared
+    logger.info("Run summary:")
+    for result in results:
+        logger.info(f"{result.state}: {result.status} ({result.elapsed:.1f}s)")
+        if result.report:
+            phases = result.report["phases"]
+            logger.info(
+                f"{result.state}: fetch {phases['fetch']:.1f}s, "
+                f"parse {phases['parse']:.1f}s, write {phases['write']:.1f}s, "
+                f"{result.report['requests']} requests, "
+                f"{result.report['rows_written']} rows"
+            )
+            _log_cache_stats(logger, result.state, result.report)
+        if not result.ok:
+            logger.error(f"{result.state} error:\n{result.error}")
+
+    # Exit with an error if anything broke
+    if not all(r.ok for r in results):
+        sys.exit(1)
+
+
+@main.group()
+def cache():
+    """Manage the cache of downloaded files."""
+    pass
+
+
+@cache.command()
+@click.option(
+    "--cache-dir",
+    default=utils.WARN_CACHE_DIR,
+    type=click.Path(),
+    help="The Path where results are cached",
+)
+@click.option(
+    "--max-size",
+    default=None,
+    help="The most the cache may hold, like 500MB or 2GB",
+)
+@click.option(
+    "--max-age",
+    default=None,
+    type=click.FloatRange(min=0),
+    help="Evict files that haven't been used in this many days",
+)
+@click.option(
+    "--pin",
+    multiple=True,
+    help="A glob pattern for cache keys that are never evicted, like 'ia/*'. Can be repeated.",
+)
+@click.option(
+    "--default-pins/--no-default-pins",
+    default=True,
+    help="Keep PDFs, spreadsheets and manifests, which may be gone from the source",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="List what would be evicted without removing anything",
+)
+@click.option(
+    "--log-level",
+    "-l",
+    default="INFO",
+    type=click.Choice(
+        ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"), case_sensitive=False
+    ),
+    help="Set the logging level",
+)
+def gc(
+    cache_dir: Path,
+    max_size: typing.Optional[str],
+    max_age: typing.Optional[float],
+    pin: typing.Tuple[str, ...],
+    default_pins: bool,
+    dry_run: bool,
+    log_level: str,
+):
+    """
+    Evict the least recently used files from the cache.
+
+    Files unused for longer than --max-age days are evicted, then the least
+    recently used files until the cache fits in --max-size. Pinned files are kept.
+    """
+    from . import cache_gc
+
+    logger = _configure_logging(log_level)
+    try:
+        size_limit = None if max_size is None else cache_gc.parse_size(max_size)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--max-size")
+    pins = pin + (cache_gc.DEFAULT_PINS if default_pins else ())
+    result = cache_gc.collect(
+        Path(cache_dir),
+        max_size=size_limit,
+        max_age=None if max_age is None else max_age * 24 * 60 * 60,
+        pins=pins,
+        dry_run=dry_run,
+    )
+    verb = "Would evict" if dry_run else "Evicted"
+    for key in result.evicted:
+        logger.debug(f"{verb} {key}")
+    logger.info(
+        f"{verb} {len(result.evicted)} files and {result.blobs_removed} unused blobs, "
+        f"freeing {result.freed / 1024**2:.1f} MB. "
+        f"The cache is now {result.size_after / 1024**2:.1f} MB."
+    )
+
+
+@cache.command("export")
+@click.argument("archive", type=click.Path(dir_okay=False))
+@click.option(
+    "--cache-dir",
+    default=utils.WARN_CACHE_DIR,
+    type=click.Path(exists=True, file_okay=False),
+    help="The Path where results are cached",
+)
+@click.option(
+    "--log-level",
+    "-l",
+    default="INFO",
+    type=click.Choice(
+        ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"), case_sensitive=False
+    ),
+    help="Set the logging level",
+)
+def export_(archive: str, cache_dir: Path, log_level: str):
+    """
+    Pack the cache into a single archive file.
+
+    ARCHIVE -- where to save the archive, like warn-cache.zip
+    """
+    from . import cache_archive
+
+    logger = _configure_logging(log_level)
+    count = cache_archive.export(Path(cache_dir), Path(archive))
+    logger.info(f"Packed {count} files into {archive}")
+
+
+@cache.command("import")
+@click.argument("archive", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--cache-dir",
+    default=utils.WARN_CACHE_DIR,
+    type=click.Path(),
+    help="The Path where results are cached",
+)
+@click.option(
+    "--overwrite/--no-overwrite",
+    default=False,
+    help="Replace files the cache already has with the archive's copies",
+)
+@click.option(
+    "--log-level",
+    "-l",
+    default="INFO",
+    type=click.Choice(
+        ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"), case_sensitive=False
+    ),
+    help="Set the logging level",
+)
+def import_(archive: str, cache_dir: Path, overwrite: bool, log_level: str):
+    """
+    Unpack a cache archive into the cache.
+
+    ARCHIVE -- an archive made by `warn-scraper cache export`
+    """
+    from . import cache_archive
+
+    logger = _configure_logging(log_level)
+    count = cache_archive.unpack(Path(archive), Path(cache_dir), overwrite=overwrite)
+    logger.info(f"Unpacked {count} files from {archive}")
+
+
+@cache.command()
+@click.option(
+    "--log-dir",
+    default=utils.WARN_LOG_DIR,
+    type=click.Path(),
+    help="The Path where run reports are saved",
+)
+@click.option(
+    "--cache-dir",
+    default=utils.WARN_CACHE_DIR,
+    type=click.Path(),
+    help="The Path where results are cached",
+)
+@click.option(
+    "--state",
+    "-s",
+    multiple=True,
+    help="Only count runs of this state. Can be repeated.",
+)
+@click.option(
+    "--all-runs",
+    is_flag=True,
+    default=False,
+    help="Add up every saved run, rather than each state's latest",
+)
+def stats(
+    log_dir: Path, cache_dir: Path, state: typing.Tuple[str, ...], all_runs: bool
+):
+    """
+    Show how well the cache is working.
+
+    Hits, misses and stale refreshes, bytes moved and time spent on cache
+    I/O are read from the run reports, and are shown for each namespace of
+    the cache alongside what it holds on disk.
+    """
+    from . import cache_stats
+
+    counts = cache_stats.from_log_dir(Path(log_dir), all_runs=all_runs, states=state)
+    usage = cache_stats.disk_usage(Path(cache_dir))
+    if state:
+        usage = {k: v for k, v in usage.items() if k in {s.lower() for s in state}}
+    rows = [
+        (
+            "namespace",
+            "hits",
+            "misses",
+            "refreshes",
+            "hit rate",
+            "read MB",
+            "written MB",
+            "I/O s",
+            "files",
+            "size MB",
+        )
+    ]
+    namespaces = sorted(set(counts) | set(usage))
+    for namespace in namespaces + ["total"]:
+        if namespace == "total":
+            s = cache_stats.total(counts.values())
+            files = sum(f for f, _ in usage.values())
+            size = sum(b for _, b in usage.values())
+        else:
+            s = counts.get(namespace) or cache_stats.CacheStats()
+            files, size = usage.get(namespace, (0, 0))
+        rows.append(
+            (
+                namespace,
+                str(s.hits),
+                str(s.misses),
+                str(s.refreshes),
+                "-" if s.hit_rate is None else f"{s.hit_rate:.0%}",
+                f"{s.bytes_read / 1024**2:.1f}",
+                f"{s.bytes_written / 1024**2:.1f}",
+                f"{s.io_time:.1f}",
+                str(files),
+                f"{size / 1024**2:.1f}",
+            )
+        )
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        cells = [row[0].ljust(widths[0])]
+        cells += [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+        click.echo("  ".join(cells))
+
+
+def _log_cache_stats(logger: logging.Logger, state: str, run_report: typing.Dict):
+    """Log how a scrape used the cache."""
+    from . import cache_stats
+
+    counts = cache_stats.from_report(run_report)
+    if not counts:
+        return
+    s = cache_stats.total(counts.values())
+    logger.info(
+        f"{state}: cache {s.hits} hits, {s.misses} misses, {s.refreshes} refreshes, "
+        f"{s.bytes_read / 1024**2:.1f} MB read, {s.bytes_written / 1024**2:.1f} MB written, "
+        f"{s.io_time:.1f}s I/O"
+    )
+
+
+def _configure_logging(log_level: str) -> logging.Logger:
+    """Set up logging for a command and get the CLI's logger."""
+    # Set higher log-level on third-party libs that use DEBUG logging,
+    # In order to limit debug logging to our library
+    logging.getLogger("urllib3").setLevel(logging.ERROR)
+    logging.getLogger("pdfminer").setLevel(logging.WARNING)
+
+    # Local logging config
+    logging.basicConfig(level=log_level, format="%(asctime)s - %(name)s - %(message)s")
+    return logging.getLogger(__name__)
 
 
 if __name__ == "__main__":
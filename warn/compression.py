@@ -0,0 +1,112 @@
+import logging
+import typing
+import zlib
+from pathlib import PurePosixPath
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+# The bytes each compressed format starts with
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# The suffix added to a compressed file's name, and its blob's, so it's never mistaken for plain text
+# and different encodings of the same content don't collide
+SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+# The suffixes that mark a file as compressed
+COMPRESSED_SUFFIXES = tuple(suffix for suffix in SUFFIXES.values() if suffix)
+
+# How hard to squeeze
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 9
+
+# Text formats that shrink well. Everything else is stored as is.
+DEFAULT_POLICY: typing.Dict[str, typing.Optional[str]] = {
+    ".html": "zstd",
+    ".htm": "zstd",
+    ".json": "zstd",
+    ".csv": "zstd",
+    # Georgia's detail pages are HTML with an odd extension
+    ".format3": "zstd",
+}
+
+
+class CompressionPolicy:
+    """Decide which cached files are compressed, and how.
+
+    Files are matched on their extension. Zstandard is used when the
+    optional zstandard package is installed, and gzip otherwise. A compressed
+    file is saved under its name plus the codec's suffix, like "page.html.zst".
+
+    Args:
+        codecs (dict): Maps file extensions, like ".html", to "zstd", "gzip" or None.
+            Defaults to DEFAULT_POLICY.
+    """
+
+    def __init__(
+        self, codecs: typing.Optional[typing.Dict[str, typing.Optional[str]]] = None
+    ):
+        """Initialize a new instance."""
+        self.codecs = dict(DEFAULT_POLICY if codecs is None else codecs)
+
+    def codec_for(self, name: str) -> typing.Optional[str]:
+        """Get the compression to use for the provided cache name, if any."""
+        codec = self.codecs.get(PurePosixPath(name).suffix.lower())
+        if codec == "zstd" and zstandard is None:
+            return "gzip"
+        return codec
+
+
+def compress(data: bytes, codec: typing.Optional[str]) -> bytes:
+    """Compress some bytes with the provided codec.
+
+    The output depends only on the input, so the same content always
+    compresses to the same blob.
+
+    Args:
+        data (bytes): The content to compress.
+        codec (str): "zstd", "gzip" or None to leave it as is.
+
+    Returns: the compressed bytes
+    """
+    if codec is None:
+        return data
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if codec == "gzip":
+        # Unlike gzip.compress on older Pythons, this writes no timestamp
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    raise ValueError(f"Unknown compression {codec}")
+
+
+def decompress(data: bytes) -> bytes:
+    """Undo whatever compression the provided bytes carry, if any."""
+    if data.startswith(GZIP_MAGIC):
+        return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+    if data.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError(
+                "This cached file is compressed with Zstandard. Install the zstandard package to read it."
+            )
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return data
+
+
+def stored_name(name: str, codec: typing.Optional[str]) -> str:
+    """Get the name a file is saved under once it's compressed with the provided codec."""
+    return name + SUFFIXES[codec]
+
+
+def plain_name(name: str) -> str:
+    """Get a saved file's name without the suffix its compression added, if any."""
+    for suffix in COMPRESSED_SUFFIXES:
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
@@ -0,0 +1,171 @@
+import abc
+import logging
+import re
+import time
+import typing
+from datetime import date, timedelta
+from fnmatch import fnmatchcase
+
+from . import compression
+from .cache_index import CacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+# A four-digit year standing on its own in a cache key, like "sc/2021.pdf" or "fl/2021_page_1.html"
+YEAR_PATTERN = re.compile(r"(?<!\d)(?:19|20)\d{2}(?!\d)")
+
+
+class Rule(abc.ABC):
+    """Decides whether a cached copy of a file is still good enough to use."""
+
+    @abc.abstractmethod
+    def is_fresh(self, entry: CacheEntry, now: float) -> bool:
+        """Whether the cached file described by the provided index entry can be used.
+
+        Args:
+            entry (CacheEntry): What the index knows about the cached file.
+            now (float): The current time, as a Unix timestamp.
+        """
+
+    def __repr__(self):
+        """Describe the rule."""
+        return f"{self.__class__.__name__}()"
+
+
+class Forever(Rule):
+    """Use the cached copy whenever there is one."""
+
+    def is_fresh(self, entry: CacheEntry, now: float) -> bool:
+        """Treat every cached copy as fresh."""
+        return True
+
+
+class Always(Rule):
+    """Never use the cached copy. Fetch the file every time."""
+
+    def is_fresh(self, entry: CacheEntry, now: float) -> bool:
+        """Treat every cached copy as stale."""
+        return False
+
+
+class TTL(Rule):
+    """Use the cached copy until it reaches a certain age.
+
+    Args:
+        max_age (timedelta): How long a cached copy stays fresh. Seconds may be passed as a number.
+    """
+
+    def __init__(self, max_age: typing.Union[timedelta, float]):
+        """Initialize a new instance."""
+        if isinstance(max_age, timedelta):
+            max_age = max_age.total_seconds()
+        self.max_age = float(max_age)
+
+    def is_fresh(self, entry: CacheEntry, now: float) -> bool:
+        """Whether the file was fetched less than ``max_age`` seconds ago."""
+        if entry.fetched_at is None:
+            return False
+        return now - entry.fetched_at < self.max_age
+
+    def __repr__(self):
+        """Describe the rule."""
+        return f"TTL({self.max_age:g})"
+
+
+class RecentYears(Rule):
+    """Refetch files that cover recent years, and keep older years forever.
+
+    The year is read from the cache key, like the 2021 in "sc/2021.pdf".
+    Files with no year in their key are always refetched.
+
+    Args:
+        years (int): How many years, counting the current one, to keep refetching.
+            The default of 2 refreshes the current and prior years.
+    """
+
+    def __init__(self, years: int = 2):
+        """Initialize a new instance."""
+        self.years = years
+
+    def is_fresh(self, entry: CacheEntry, now: float) -> bool:
+        """Whether the year in the entry's key is old enough to be settled."""
+        year = year_from_key(entry.key)
+        if year is None:
+            return False
+        return year <= date.fromtimestamp(now).year - self.years
+
+    def __repr__(self):
+        """Describe the rule."""
+        return f"RecentYears({self.years})"
+
+
+# How long each source's cached files stay fresh, matched against cache keys in order.
+# Keys that match nothing are cached forever.
+DEFAULT_RULES: typing.List[typing.Tuple[str, Rule]] = [
+    ("ct/*.html", RecentYears(1)),
+    ("fl/*.html", RecentYears(2)),
+    ("la/*.pdf", RecentYears(2)),
+    ("mo/*.html", RecentYears(2)),
+    ("nm/*.pdf", RecentYears(2)),
+    ("sc/*.pdf", RecentYears(2)),
+    ("wi/*.html", RecentYears(2)),
+    # Job Center caches are kept in each state's folder, so their keys have no state prefix
+    ("search_results/*", RecentYears(2)),
+]
+
+
+class FreshnessPolicy:
+    """The rules that decide when cached files must be fetched again.
+
+    Each rule is paired with a glob pattern that's matched against the
+    cache key, like "sc/*.pdf". The first pattern that matches decides.
+
+    Example:
+        Refetch Missouri's pages after a week, and Iowa's every run::
+
+            policy = FreshnessPolicy([
+                ("mo/*", TTL(timedelta(days=7))),
+                ("ia/*", Always()),
+            ])
+            cache = Cache(freshness=policy)
+
+    Args:
+        rules (list): Pairs of a glob pattern and a Rule. Defaults to DEFAULT_RULES.
+        default (Rule): The rule for keys that match no pattern. Defaults to Forever.
+    """
+
+    def __init__(
+        self,
+        rules: typing.Optional[typing.Sequence[typing.Tuple[str, Rule]]] = None,
+        default: typing.Optional[Rule] = None,
+    ):
+        """Initialize a new instance."""
+        self.rules = list(DEFAULT_RULES if rules is None else rules)
+        self.default = default or Forever()
+
+    def rule_for(self, key: str) -> Rule:
+        """Get the rule that applies to the provided cache key."""
+        for pattern, rule in self.rules:
+            if fnmatchcase(key, pattern):
+                return rule
+        return self.default
+
+    def is_fresh(self, entry: CacheEntry, now: typing.Optional[float] = None) -> bool:
+        """Whether the cached file described by the provided index entry can be used.
+
+        Args:
+            entry (CacheEntry): What the index knows about the cached file.
+            now (float): The current time, as a Unix timestamp. Defaults to now.
+        """
+        # Compressed files are matched by the name they were saved as
+        rule = self.rule_for(compression.plain_name(entry.key))
+        fresh = rule.is_fresh(entry, time.time() if now is None else now)
+        logger.debug(f"{entry.key} is {'fresh' if fresh else 'stale'} under {rule}")
+        return fresh
+
+
+def year_from_key(key: str) -> typing.Optional[int]:
+    """Get the first year mentioned in a cache key, if there is one."""
+    match = YEAR_PATTERN.search(key)
+    return int(match.group(0)) if match else None
@@ -0,0 +1,116 @@
+import logging
+import os
+import threading
+import time
+import typing
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # type: ignore
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+# How long to wait for another process to let go of a lock before giving up
+DEFAULT_TIMEOUT = 10 * 60
+
+# How often to try again while waiting
+POLL_INTERVAL = 0.05
+
+# The locks each thread holds, so the same thread can take one again without deadlocking
+_held = threading.local()
+
+
+class LockTimeout(TimeoutError):
+    """Thrown when a lock is held by someone else for too long."""
+
+    pass
+
+
+class FileLock:
+    """An advisory lock that processes and threads sharing a folder can coordinate with.
+
+    The lock is taken on a file, which is created if it doesn't exist. It
+    only keeps out others who ask for the same lock; it doesn't stop anyone
+    from reading or writing files. A thread that already holds the lock can
+    take it again, and it's released when the outermost hold ends.
+
+    Example:
+        Make sure only one process downloads a file at a time::
+
+            with FileLock(Path("~/.warn-scraper/cache/.locks/3f.lock")):
+                ...
+
+    Args:
+        path (Path): The lock file.
+        timeout (float): Seconds to wait for the lock before raising LockTimeout.
+    """
+
+    def __init__(self, path: Path, timeout: float = DEFAULT_TIMEOUT):
+        """Initialize a new instance."""
+        self.path = Path(path)
+        self.timeout = timeout
+
+    def __enter__(self):
+        """Take the lock, waiting if someone else has it."""
+        held = _holds()
+        key = str(self.path)
+        if key in held:
+            fd, count = held[key]
+            held[key] = (fd, count + 1)
+            return self
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(key, os.O_RDWR | os.O_CREAT, 0o666)
+        deadline = time.monotonic() + self.timeout
+        while not _try_lock(fd):
+            if time.monotonic() > deadline:
+                os.close(fd)
+                raise LockTimeout(f"Timed out waiting for {self.path}")
+            time.sleep(POLL_INTERVAL)
+        held[key] = (fd, 1)
+        return self
+
+    def __exit__(self, *exc):
+        """Release the lock, if this is the outermost hold."""
+        held = _holds()
+        key = str(self.path)
+        fd, count = held[key]
+        if count > 1:
+            held[key] = (fd, count - 1)
+            return
+        del held[key]
+        try:
+            _unlock(fd)
+        finally:
+            os.close(fd)
+
+
+def _holds() -> typing.Dict[str, typing.Tuple[int, int]]:
+    """Get the locks held by the current thread."""
+    if not hasattr(_held, "locks"):
+        _held.locks = {}
+    return _held.locks
+
+
+def _try_lock(fd: int) -> bool:
+    """Try to take the lock on an open file without waiting."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(fd: int):
+    """Release the lock on an open file."""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
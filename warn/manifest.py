@@ -0,0 +1,199 @@
+import hashlib
+import json
+import logging
+import os
+import typing
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+# The inputs of the scrape running in this process, if the Runner is tracking one
+_active: typing.Optional["InputLog"] = None
+
+
+class InputLog:
+    """The content hashes of everything a scraper has fetched during a run.
+
+    Args:
+        state (str): The two-letter postal code being scraped.
+        code (str): A hash of the scraper's source code.
+        previous (dict): The manifest entry saved by the last successful run, if any.
+    """
+
+    def __init__(
+        self,
+        state: str,
+        code: typing.Optional[str] = None,
+        previous: typing.Optional[typing.Dict] = None,
+    ):
+        """Initialize a new instance."""
+        self.state = state
+        self.code = code
+        self.previous = previous or {}
+        self.inputs: typing.Dict[str, str] = {}
+
+    def record(self, name: str, digest: str):
+        """Log the hash of an input."""
+        self.inputs[name] = digest
+
+    def unchanged(self, output_path: Path, ignore: typing.Iterable[str] = ()) -> bool:
+        """Whether this run's inputs match those behind the existing output file.
+
+        Args:
+            output_path (Path): The file the scraper is about to regenerate.
+            ignore (list): Input names that don't affect the output, like index pages.
+        """
+        if not self.previous or not Path(output_path).exists():
+            return False
+        if self.previous.get("output") != str(output_path):
+            return False
+        if self.previous.get("code") != self.code:
+            return False
+        ignore = set(ignore)
+        current = {k: v for k, v in self.inputs.items() if k not in ignore}
+        previous = {
+            k: v for k, v in self.previous.get("inputs", {}).items() if k not in ignore
+        }
+        return current == previous
+
+
+class Manifest:
+    """Fingerprints of the inputs behind each state's last successful scrape.
+
+    Each state gets its own JSON file in the cache directory's manifests folder,
+    so states running in parallel never write to the same file.
+
+    Args:
+        cache_dir (Path): The root of the cache.
+    """
+
+    def __init__(self, cache_dir: Path):
+        """Initialize a new instance."""
+        self.dir = Path(cache_dir, "manifests")
+
+    def load(self, state: str) -> typing.Dict:
+        """Get the manifest entry for a state, or an empty dict if there isn't one."""
+        try:
+            with open(self._path(state), encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, state: str, log: InputLog, output_path: Path):
+        """Record the inputs behind a successful scrape."""
+        entry = {
+            "state": state,
+            "output": str(output_path),
+            "code": log.code,
+            "inputs": log.inputs,
+            "completed_at": datetime.now().isoformat(),
+        }
+        self.dir.mkdir(parents=True, exist_ok=True)
+        logger.debug(f"Saving {len(log.inputs)} input fingerprints for {state}")
+        # Write it out in full before swapping it in, so a crash can't leave half a manifest
+        path = self._path(state)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(entry, fh, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def track(self, state: str, code: typing.Optional[str] = None):
+        """Log every input fetched by the cache while the block runs.
+
+        Args:
+            state (str): The two-letter postal code being scraped.
+            code (str): A hash of the scraper's source code, so code changes force a rerun.
+        """
+        global _active
+        log = InputLog(state, code=code, previous=self.load(state))
+        _active = log
+        try:
+            yield log
+        finally:
+            _active = None
+
+    def _path(self, state: str) -> Path:
+        """Get the path to a state's manifest file."""
+        return self.dir / f"{state}.json"
+
+
+def sha256(content: typing.Union[str, bytes]) -> str:
+    """Hash the provided content."""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_sha256(path: Path) -> str:
+    """Hash the file at the provided path."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_sha256(module_path: Path, package_dir: typing.Optional[Path] = None) -> str:
+    """Hash a scraper's source code along with the shared code it runs on.
+
+    This covers the scraper's module and every module in the warn package
+    outside of warn/scrapers, so a change to a shared parser or helper
+    forces a rerun too. Other scrapers' modules are left out.
+
+    Args:
+        module_path (Path): The scraper's module.
+        package_dir (Path): The warn package's folder. Defaults to this module's.
+
+    Returns: a SHA-256 hex digest
+    """
+    package_dir = Path(package_dir or Path(__file__).parent)
+    scrapers_dir = package_dir / "scrapers"
+    digest = hashlib.sha256(file_sha256(Path(module_path)).encode("ascii"))
+    shared = sorted(
+        p for p in package_dir.rglob("*.py") if scrapers_dir not in p.parents
+    )
+    for path in shared:
+        digest.update(path.relative_to(package_dir).as_posix().encode("utf-8"))
+        digest.update(file_sha256(path).encode("ascii"))
+    return digest.hexdigest()
+
+
+def record(name: str, digest: str):
+    """Log the hash of an input fetched by the current scrape, if the Runner is tracking one."""
+    if _active is not None:
+        _active.record(name, digest)
+
+
+def record_content(name: str, content: typing.Union[str, bytes]):
+    """Hash and log an input fetched by the current scrape, if the Runner is tracking one."""
+    if _active is not None:
+        _active.record(name, sha256(content))
+
+
+def record_file(name: str, path: Path):
+    """Hash and log a downloaded file, if the Runner is tracking the current scrape."""
+    if _active is not None:
+        _active.record(name, file_sha256(path))
+
+
+def inputs_unchanged(output_path: Path, ignore: typing.Iterable[str] = ()) -> bool:
+    """Check whether a scraper can reuse its existing output.
+
+    Scrapers call this once all of their inputs are fetched. It returns True
+    only if the Runner is tracking the run and every input matches the last
+    successful scrape, in which case the scraper can skip parsing and writing.
+
+    Args:
+        output_path (Path): The file the scraper is about to regenerate.
+        ignore (list): Input names that don't affect the output, like index pages.
+    """
+    if _active is None:
+        return False
+    if _active.unchanged(output_path, ignore=ignore):
+        logger.info(f"Inputs for {_active.state} are unchanged. Keeping {output_path}")
+        return True
+    return False
@@ -0,0 +1,94 @@
+import logging
+import threading
+import typing
+from collections import OrderedDict
+
+from .cache_index import CacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryTier:
+    """A size-bounded store of recently used cache files, kept in memory.
+
+    Content is held decompressed, along with its index entry when that's
+    known, so a hit costs no disk reads or database queries. When the
+    total size goes over the limit, the least recently used files are
+    dropped until it fits again.
+
+    Example:
+        Keep up to 64 MB of pages in memory::
+
+            cache = Cache(memory_limit=64 * 1024 * 1024)
+
+    Args:
+        max_bytes (int): The most content, in bytes, to hold at once.
+    """
+
+    def __init__(self, max_bytes: int):
+        """Initialize a new instance."""
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items: typing.OrderedDict[
+            str, typing.Tuple[bytes, typing.Optional[CacheEntry]]
+        ] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self, key: str
+    ) -> typing.Optional[typing.Tuple[bytes, typing.Optional[CacheEntry]]]:
+        """Get the content and index entry held for the provided key, if any."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def put(self, key: str, data: bytes, entry: typing.Optional[CacheEntry] = None):
+        """Hold the content saved under the provided key, dropping older content to make room.
+
+        Args:
+            key (str): The file's cache key.
+            data (bytes): Its decompressed content.
+            entry (CacheEntry): Its index entry, if it's known.
+        """
+        with self._lock:
+            self._drop(key)
+            if len(data) > self.max_bytes:
+                return
+            self._items[key] = (data, entry)
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                oldest = next(iter(self._items))
+                logger.debug(f"Dropping {oldest} from memory")
+                self._drop(oldest)
+
+    def discard(self, key: str):
+        """Forget the content held for the provided key, if any."""
+        with self._lock:
+            self._drop(key)
+
+    def clear(self):
+        """Forget everything."""
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def __contains__(self, key: str) -> bool:
+        """Whether content is held for the provided key."""
+        return key in self._items
+
+    def __len__(self) -> int:
+        """Get the number of files held."""
+        return len(self._items)
+
+    def _drop(self, key: str):
+        """Forget a key while holding the lock."""
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.size -= len(item[0])
@@ -1,5 +1,6 @@
 import logging
 import re
+from pathlib import Path
 
 from warn.cache import Cache as BaseCache
 
@@ -8,8 +9,24 @@ from .urls import urls
 logger = logging.getLogger(__name__)
 
 
+# Bytes of pages to keep in memory, since search result and detail pages are read again and again
+MEMORY_LIMIT = 64 * 1024 * 1024
+
+
 class Cache(BaseCache):
-    """A custom cache for Job Center sites."""
+    """A custom cache for Job Center sites.
+
+    Each site's files are counted toward its folder's name, like "ks", in cache statistics.
+
+    Args:
+        path (str): Full path to the site's cache directory.
+        memory_limit (int): Bytes of recently used pages to keep in memory. Default MEMORY_LIMIT.
+    """
+
+    def __init__(self, path=None, memory_limit=MEMORY_LIMIT, **kwargs):
+        """Initialize a new instance."""
+        super().__init__(path, memory_limit=memory_limit, **kwargs)
+        self.namespace = Path(self.path).name
 
     def save(self, url, params, html):
         """Save file to the cache."""
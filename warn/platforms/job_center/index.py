@@ -0,0 +1,160 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import typing
+import weakref
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+# The search results fields that, when they change, mean a record's detail page should be refetched
+ROW_FIELDS = (
+    "employer",
+    "city",
+    "zip",
+    "lwib_area",
+    "notice_date",
+    "warn_type",
+    "detail_page_url",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    record_number TEXT PRIMARY KEY,
+    row_hash TEXT,
+    detail_hash TEXT,
+    synced_at REAL
+);
+"""
+
+
+@dataclass
+class KnownRecord:
+    """A row in the record index.
+
+    Args:
+        record_number (str): The site's ID for the record.
+        row_hash (str): The SHA-256 hash of the record's search results fields.
+        detail_hash (str): The SHA-256 hash of the record's detail page.
+        synced_at (float): When the detail page was last fetched, as a Unix timestamp.
+    """
+
+    record_number: str
+    row_hash: str
+    detail_hash: str
+    synced_at: float
+
+
+class RecordIndex:
+    """An SQLite table of the records a Job Center site has already synced.
+
+    Incremental scrapes check a row against the index to decide whether
+    its detail page needs to be fetched again. The index is kept in the
+    site's cache folder, next to the cache's own index.
+
+    Args:
+        root (Path): The site's cache directory.
+    """
+
+    # The database's file name, inside the cache directory
+    FILENAME = ".records.sqlite3"
+
+    def __init__(self, root: Path):
+        """Initialize a new instance."""
+        self.root = Path(root)
+        self.path = self.root / self.FILENAME
+        self._lock = threading.RLock()
+        self._state: typing.Dict[str, typing.Any] = {"conn": None}
+        weakref.finalize(self, _close, self._state)
+
+    def get_many(
+        self, record_numbers: typing.Iterable[str]
+    ) -> typing.Dict[str, KnownRecord]:
+        """Get what's known about the provided records, keyed by record number."""
+        found = {}
+        with self._lock:
+            conn = self._connect()
+            for record_number in set(record_numbers):
+                row = conn.execute(
+                    "SELECT * FROM records WHERE record_number = ?", (record_number,)
+                ).fetchone()
+                if row is not None:
+                    found[record_number] = KnownRecord(**dict(row))
+        return found
+
+    def put_many(self, records: typing.Iterable[KnownRecord]):
+        """Add or replace many records at once."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?)",
+                    (
+                        (r.record_number, r.row_hash, r.detail_hash, r.synced_at)
+                        for r in records
+                    ),
+                )
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            _close(self._state)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database, creating it if it's new."""
+        conn = self._state["conn"]
+        if conn is not None:
+            return conn
+        self.root.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        self._state["conn"] = conn
+        return conn
+
+
+def row_hash(row: typing.Dict) -> str:
+    """Hash the search results fields of a parsed row."""
+    fields = [row.get(name, "") for name in ROW_FIELDS]
+    return hashlib.sha256(json.dumps(fields).encode("utf-8")).hexdigest()
+
+
+def detail_hash(html: str) -> str:
+    """Hash the HTML of a detail page."""
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def is_current(
+    known: typing.Optional[KnownRecord],
+    row: typing.Dict,
+    max_age: float,
+    now: typing.Optional[float] = None,
+) -> bool:
+    """Whether a row's detail page can be read from the cache rather than fetched again.
+
+    Args:
+        known (KnownRecord): What the index knows about the row's record, if anything.
+        row (dict): The row parsed out of a search results page.
+        max_age (float): Seconds after which a detail page is fetched again regardless.
+        now (float): The current time, as a Unix timestamp. Defaults to now.
+
+    Returns: True if the record is known, its fields haven't changed and it was synced recently
+    """
+    if known is None or known.row_hash != row_hash(row):
+        return False
+    now = time.time() if now is None else now
+    return now - known.synced_at < max_age
+
+
+def _close(state: typing.Dict):
+    """Close an index's database, if it's open."""
+    conn = state["conn"]
+    if conn is not None:
+        conn.close()
+        state["conn"] = None
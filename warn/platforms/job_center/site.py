@@ -1,23 +1,119 @@
 import html as html_mod
+import importlib.util
 import logging
+import time
 import urllib.parse
+from dataclasses import dataclass
 from datetime import date
 
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 
+from ... import aio
+from ...ratelimit import limiter
+from ...sessions import get_session
+from . import index
 from .cache import Cache
 from .urls import urls
 
 logger = logging.getLogger(__name__)
 
 
+# The parser for search results pages. lxml is much faster, when it's installed.
+SEARCH_RESULTS_PARSER = (
+    "lxml" if importlib.util.find_spec("lxml") is not None else "html.parser"
+)
+
+# Detail pages are requested for about this many rows at a time, spanning search results pages,
+# so rows stream out while later pages are still being fetched
+DETAIL_BATCH_SIZE = 100
+
+# A scrape is only given up on when more than this share of a batch's detail pages can't be fetched,
+# since that means the site is down, rather than missing a notice or two
+MAX_DETAIL_FAILURE_SHARE = 0.5
+
+# In incremental mode, a record's detail page is fetched again once it's this many seconds old,
+# in case a change didn't show on the search results page
+REFRESH_AFTER = 7 * 24 * 60 * 60
+
+
 class NoSearchResultsError(Exception):
     """Thrown when there are no results."""
 
     pass
 
 
+class DetailPageError(Exception):
+    """Thrown when most detail pages can't be fetched, even after retries."""
+
+    pass
+
+
+@dataclass
+class Record:
+    """A WARN notice from a Job Center site, without the pages it was parsed from.
+
+    Lean scrapes return these in place of nested dicts. They have no __dict__, so a
+    state's full history costs memory in proportion to its row count.
+
+    Args:
+        employer (str): The employer named on the search results page.
+        city (str): The city.
+        zip (str): The ZIP code.
+        lwib_area (str): The local workforce investment board area.
+        notice_date (str): The notice date on the search results page.
+        warn_type (str): The kind of notice.
+        detail_page_url (str): The URL of the record's detail page.
+        record_number (str): The site's ID for the record.
+        company_name (str): The company named on the detail page, if it was scraped.
+        address (str): The address on the detail page, if it was scraped.
+        number_of_employees_affected (str): The layoff count on the detail page, if it was scraped.
+    """
+
+    __slots__ = (
+        "employer",
+        "city",
+        "zip",
+        "lwib_area",
+        "notice_date",
+        "warn_type",
+        "detail_page_url",
+        "record_number",
+        "company_name",
+        "address",
+        "number_of_employees_affected",
+    )
+
+    employer: str
+    city: str
+    zip: str
+    lwib_area: str
+    notice_date: str
+    warn_type: str
+    detail_page_url: str
+    record_number: str
+    company_name: str
+    address: str
+    number_of_employees_affected: str
+
+    @classmethod
+    def from_row(cls, row):
+        """Create a record from a row parsed out of the search results and detail pages."""
+        detail = row["detail"]
+        return cls(
+            employer=row["employer"],
+            city=row["city"],
+            zip=row["zip"],
+            lwib_area=row["lwib_area"],
+            notice_date=row["notice_date"],
+            warn_type=row["warn_type"],
+            detail_page_url=row["detail_page_url"],
+            record_number=detail["record_number"],
+            company_name=detail.get("company_name", ""),
+            address=detail.get("address", ""),
+            number_of_employees_affected=detail.get("number_of_employees_affected", ""),
+        )
+
+
 class Site:
     """Scraper for America's Job Center sites.
 
@@ -31,61 +127,148 @@ class Site:
         url (str): Search URL for the site (should end in '/warn_lookups')
         cache_dir (str): Cache directory
         verify (boolean, default True): SSL certificate verification
+        per_host (int): The most detail pages requested from the site at once (default aio.DEFAULT_PER_HOST)
+        incremental (boolean, default False): Only refetch the detail pages of records that are new,
+            whose search results fields changed, or that haven't been fetched in refresh_after seconds.
+        refresh_after (float): Seconds after which incremental scrapes refetch a record's detail page
+            regardless (default REFRESH_AFTER, a week)
     """
 
-    def __init__(self, state, url, cache_dir, verify=True):
+    def __init__(
+        self,
+        state,
+        url,
+        cache_dir,
+        verify=True,
+        per_host=aio.DEFAULT_PER_HOST,
+        incremental=False,
+        refresh_after=REFRESH_AFTER,
+    ):
         """Initialize a new instance."""
         self.state = state.upper()
         self.url = url
         self.cache = Cache(cache_dir)
         self.verify = verify
+        self.per_host = per_host
+        self.incremental = incremental
+        self.refresh_after = refresh_after
+        self.records = index.RecordIndex(self.cache.path)
         print(f"Site init SSL verification status: {self.verify}")
 
-    def scrape(self, start_date=None, end_date=None, detail_pages=True, use_cache=True):
+    def scrape(
+        self,
+        start_date=None,
+        end_date=None,
+        detail_pages=True,
+        use_cache=True,
+        lean=False,
+    ):
         """
         Scrape between a start and end date.
 
-        Defaults to scraping data for current year.
+        Defaults to scraping data for current year. Use iter_rows to handle rows
+        as they come in, rather than holding every page in memory.
 
         Args:
             start_date (str): YYYY-MM-DD
             end_date (str): YYYY-MM-DD
             detail_pages (boolean, default True): Whether or not to scrape detail pages.
             use_cache (boolean, default True): Check cache before scraping.
+                Cached pages are only used if the cache's freshness policy allows.
+            lean (boolean, default False): Return Record objects and leave out the
+                pages' HTML, which the cache already holds.
 
         Returns:
             An array containing a dictionary of html search result pages
             and a list of parsed data dictionaries
             ( {1: <HTML str>}, [{data}, {more data}] )
+            In lean mode, the dictionary is empty and the list holds Records.
         """
         # Final payload here
         html_store = {}
         data = []
+        for results in self._iter_pages(
+            start_date, end_date, detail_pages, use_cache, lean
+        ):
+            self._update_payload(html_store, data, results)
+        return (html_store, data)
+
+    def iter_rows(
+        self,
+        start_date=None,
+        end_date=None,
+        detail_pages=True,
+        use_cache=True,
+        lean=False,
+    ):
+        """
+        Yield the parsed rows between a start and end date as they come in.
+
+        Defaults to scraping data for current year. The search results are walked
+        page by page, and the detail pages of up to DETAIL_BATCH_SIZE rows are
+        requested together, at most per_host at a time. Rows keep their search
+        results order.
+
+        Args:
+            start_date (str): YYYY-MM-DD
+            end_date (str): YYYY-MM-DD
+            detail_pages (boolean, default True): Whether or not to scrape detail pages.
+            use_cache (boolean, default True): Check cache before scraping.
+                Cached pages are only used if the cache's freshness policy allows.
+            lean (boolean, default False): Yield Record objects, without the pages' HTML.
+
+        Yields: a parsed data dictionary, or a Record in lean mode, for each row
+        """
+        for results in self._iter_pages(
+            start_date, end_date, detail_pages, use_cache, lean
+        ):
+            yield from results["data"]
+
+    def _iter_pages(self, start_date, end_date, detail_pages, use_cache, lean=False):
+        """Yield each search results page, with its rows' detail pages scraped.
+
+        In lean mode, each page's HTML is dropped and its rows are made into Records.
+        """
         # Begin scrape with initial page
         start = start_date or self._start
         end = end_date or self._end
-        kwargs = {
-            "params": self._search_kwargs(start_date=start, end_date=end),
-            "use_cache": use_cache,
-            "detail_pages": detail_pages,
-        }
         logger.debug(
             f"Scraping initial page for date range: {start_date} -> {end_date}"
         )
-        results = self._scrape_search_results_page(self.url, **kwargs)
-        # Exit early if there were no results
-        if not results.get("data"):
-            return (html_store, data)
-        # Update the html_store and data payloads
-        self._update_payload(html_store, data, results)
-        # Scrape downstream pages, if any
-        next_page_link = self._next_page_link(results["html"])
-        if next_page_link:
-            logger.debug("Scraping paged results")
-            self._scrape_next_page(
-                next_page_link, html_store, data, detail_pages, use_cache
+        url = self.url
+        params = self._search_kwargs(start_date=start, end_date=end)
+        batch = []
+        # Walk the search results one page at a time, since each links to the next
+        while url:
+            results = self._scrape_search_results_page(
+                url, params=params, use_cache=use_cache
             )
-        return (html_store, data)
+            # Stop if there were no results
+            if not results.get("data"):
+                break
+            batch.append(results)
+            url = results["next_page_url"]
+            params = {}
+            if url:
+                logger.debug("Scraping paged results")
+            # Hand on the pages gathered so far once there are enough rows
+            if sum(len(r["data"]) for r in batch) >= DETAIL_BATCH_SIZE:
+                yield from self._finish_pages(batch, detail_pages, use_cache, lean)
+                batch = []
+        if batch:
+            yield from self._finish_pages(batch, detail_pages, use_cache, lean)
+
+    def _finish_pages(self, pages, detail_pages, use_cache, lean):
+        """Scrape the detail pages of a batch of search results pages, and slim them down if asked."""
+        if detail_pages:
+            self._scrape_detail_pages(
+                pages, keep_html=not lean, incremental=self.incremental and use_cache
+            )
+        if lean:
+            for results in pages:
+                results["html"] = None
+                results["data"] = [Record.from_row(row) for row in results["data"]]
+        return pages
 
     @property
     def _start(self):
@@ -104,80 +287,168 @@ class Site:
         """
         Fetch page from cache or scrape anew.
 
-        Defaults to using cached page if it exists. Always caches freshly scraped page.
+        Defaults to using cached page if it's fresh. Always caches freshly scraped page.
+
+        Returns: the HTML, and whether it came from the cache
         """
         logger.debug(f"Requesting {url}")
         cache_key = self.cache.key_from_url(url, params)
-        if use_cache and self.cache.exists(cache_key):
+        html = self.cache.get(cache_key) if use_cache else None
+        if html is not None:
             logger.debug("Fetching from cache")
-            return self.cache.fetch(url, params)
-        else:
-            logger.debug("Pulling from the web")
-            response = requests.get(url, params=params, verify=self.verify)
-            logger.debug(f"Response code: {response.status_code}")
-            html = response.text
-            self.cache.save(url, params, html)
-            return html
-
-    def _scrape_search_results_page(
-        self, url, params=None, detail_pages=True, use_cache=True
-    ):
-        """Scrape data from search results page and detail pages."""
-        kwargs = {"params": params, "use_cache": use_cache}
+            return html, True
+        logger.debug("Pulling from the web")
+        limiter.wait(url)
+        session = get_session(url)
+        response = session.get(url, params=params, verify=self.verify)
+        logger.debug(f"Response code: {response.status_code}")
+        html = response.text
+        self.cache.write(cache_key, html)
+        return html, False
+
+    def _scrape_search_results_page(self, url, params=None, use_cache=True):
+        """Scrape data from a search results page.
+
+        Returns: the page's number, HTML, rows and next page link, and whether it came from the cache
+        """
         # Downstream page URLs will have the "page" query parameter
         if "page" in url:
-            final_url = self._build_page_url(url)
-            page_num = urls.page_num_from_url(final_url)
-            html = self._get_page(final_url, **kwargs)
+            url = self._build_page_url(url)
+            page_num = urls.page_num_from_url(url)
         # Whereas the initial page request doesn't have the "page" parameter
         else:
             page_num = 1
-            html = self._get_page(url, **kwargs)
+        html, from_cache = self._get_page(url, params=params, use_cache=use_cache)
         try:
-            data = self._parse_search_results(html)
+            data, next_page_url = self._parse_search_results(html)
         except NoSearchResultsError:
             return {}
-        if detail_pages:
-            logger.debug("Scraping detail pages found on search results page...")
-            for row in data:
-                detail_page_data = self._scrape_detail_page(
-                    row["detail_page_url"], use_cache
-                )
-                row["detail"].update(detail_page_data)
-        return {"page_num": page_num, "html": html, "data": data}
-
-    def _scrape_next_page(
-        self, next_page_link, html_store, data, detail_pages, use_cache
-    ):
-        """Scrape the results of next page and update the payload."""
-        kwargs = {
-            "params": {},
-            "detail_pages": detail_pages,
-            "use_cache": use_cache,
+        return {
+            "page_num": page_num,
+            "html": html,
+            "data": data,
+            "next_page_url": next_page_url,
+            "from_cache": from_cache,
         }
-        results = self._scrape_search_results_page(next_page_link, **kwargs)
-        try:
-            results["data"]
-        # Empty results dict signals no search results were returned
-        except KeyError:
-            return
-        self._update_payload(html_store, data, results)
-        # If there are any more pages, make a recursive call
-        next_page_link = self._next_page_link(results["html"])
-        if next_page_link:
-            args = [next_page_link, html_store, data, detail_pages, use_cache]
-            self._scrape_next_page(*args)
-        # Otherwise, we've reached the last page so return
-        else:
+
+    def _scrape_detail_pages(self, pages, keep_html=True, incremental=False):
+        """Scrape the detail pages of every row on many search results pages.
+
+        The pages are requested together, at most per_host at a time, and each row
+        is updated in place. Every detail page fetched without an error is noted in the
+        record index. Rows whose detail page came back with an error status are logged
+        and left with empty detail fields, and are left out of the index so they're
+        fetched again next time.
+
+        Raises: DetailPageError if more than MAX_DETAIL_FAILURE_SHARE of the rows' pages failed,
+            after the rest are indexed
+        """
+        logger.debug("Scraping detail pages found on search results pages...")
+        rows = [row for results in pages for row in results["data"]]
+        # Detail pages are refetched along with a stale search results page,
+        # in case their records have been updated
+        stale = [
+            row
+            for results in pages
+            if not results["from_cache"]
+            for row in results["data"]
+        ]
+        known = self.records.get_many(row["detail"]["record_number"] for row in rows)
+        if incremental:
+            # Unless the index shows the record is unchanged and was synced recently
+            now = time.time()
+            stale = [
+                row
+                for row in stale
+                if not index.is_current(
+                    known.get(row["detail"]["record_number"]),
+                    row,
+                    self.refresh_after,
+                    now,
+                )
+            ]
+        refresh = {row["detail_page_url"] for row in stale}
+        detail_urls = [row["detail_page_url"] for row in rows]
+        detail_html, fetched, failed = self._get_pages(detail_urls, refresh=refresh)
+        synced = []
+        now = time.time()
+        for row, html in zip(rows, detail_html):
+            if html is None:
+                row["detail"].update(self._parse_detail_page("", keep_html=keep_html))
+                continue
+            row["detail"].update(self._parse_detail_page(html, keep_html=keep_html))
+            # Only pages the site sent without an error count as synced
+            if row["detail_page_url"] in fetched:
+                record_number = row["detail"]["record_number"]
+                synced.append(
+                    index.KnownRecord(
+                        record_number,
+                        index.row_hash(row),
+                        index.detail_hash(html),
+                        now,
+                    )
+                )
+        changed = sum(
+            1
+            for record in synced
+            if record.record_number in known
+            and known[record.record_number].detail_hash != record.detail_hash
+        )
+        logger.debug(
+            f"Fetched {len(fetched)} of {len(rows)} detail pages, {changed} changed"
+        )
+        self.records.put_many(synced)
+        if not failed:
             return
+        message = (
+            f"{len(failed)} of {len(rows)} detail pages failed: {', '.join(failed)}"
+        )
+        if len(failed) > MAX_DETAIL_FAILURE_SHARE * len(rows):
+            raise DetailPageError(message)
+        logger.warning(message)
+
+    def _get_pages(self, urls, refresh=()):
+        """
+        Fetch many pages from cache or scrape them anew, all at once.
+
+        Pages missing from the cache, or listed in refresh, are requested concurrently.
+        Caches freshly scraped pages, unless the site sent back an error.
 
-    def _scrape_detail_page(self, url, use_cache):
-        """Scrape the provided detail page."""
-        html = self._get_page(url, use_cache=use_cache)
-        return self._parse_detail_page(html)
+        Returns: a list of HTML strings in the same order as the URLs, with None for pages
+            that came back with an error status, the set of URLs fetched without an error,
+            and a description of each failure
+        """
+        html_by_url = {}
+        to_fetch = []
+        failed = []
+        for url in urls:
+            cache_key = self.cache.key_from_url(url)
+            html = self.cache.get(cache_key) if url not in refresh else None
+            if html is not None:
+                html_by_url[url] = html
+            elif url not in to_fetch:
+                to_fetch.append(url)
+        if to_fetch:
+            logger.debug(f"Pulling {len(to_fetch)} pages from the web")
+            responses = aio.fetch_all(
+                to_fetch, per_host=self.per_host, verify=self.verify
+            )
+            for url, response in zip(to_fetch, responses):
+                # Error pages aren't cached, since records are kept forever
+                if not response.ok:
+                    failed.append(f"{url} ({response.status_code})")
+                    continue
+                html = response.text
+                self.cache.save(url, None, html)
+                html_by_url[url] = html
+        return (
+            [html_by_url.get(url) for url in urls],
+            {url for url in to_fetch if url in html_by_url},
+            failed,
+        )
 
-    def _parse_detail_page(self, html):
-        """Parse data out of a detail page."""
+    def _parse_detail_page(self, html, keep_html=True):
+        """Parse data out of a detail page, keeping a copy of the HTML unless asked not to."""
         payload = {
             "company_name": "",
             "address": "",
@@ -194,13 +465,21 @@ class Site:
         ]
         data = dict(zip(headers, values))
         payload.update(data)
-        payload["html"] = html
+        if keep_html:
+            payload["html"] = html
         return payload
 
     def _parse_search_results(self, html):
-        """Parse data out of the search results."""
+        """Parse the rows, and the link to the next page, out of the search results.
+
+        Only table rows and links, which include the pager's, are built into the tree, in one pass.
+
+        Returns: a list of parsed rows, and the next page's URL or None
+        """
         data = []
-        soup = BeautifulSoup(html, "html.parser")
+        soup = BeautifulSoup(
+            html, SEARCH_RESULTS_PARSER, parse_only=SoupStrainer(["tr", "a"])
+        )
         table_rows = soup.find_all("tr")
         # Remove header
         try:
@@ -209,19 +488,21 @@ class Site:
             # IndexError signals no results were found on page
             # Verify this page has no results and return data
             msg = "no matches for your search results"
-            if msg in soup.text:
+            if msg in BeautifulSoup(html, SEARCH_RESULTS_PARSER).text:
                 raise NoSearchResultsError(msg)
         # Process result listings
         for row in table_rows:
             row_data = self._extract_search_results_row(row)
             data.append(row_data)
-        return data
+        next_page = soup.find("a", class_="next_page")
+        next_page_url = self._build_page_url(next_page["href"]) if next_page else None
+        return data, next_page_url
 
     def _update_payload(self, html_store, data, results):
         """Update a payload."""
         # In-place updates
         page_num = results.get("page_num")
-        if page_num:
+        if page_num and results["html"] is not None:
             html_store[page_num] = results["html"]
         data.extend(results.get("data", []))
 
@@ -259,17 +540,6 @@ class Site:
             },
         }
 
-    def _next_page_link(self, html):
-        """Get the link for the next page, if it exists."""
-        soup = BeautifulSoup(html, "html.parser")
-        next_page = soup.find("a", class_="next_page")
-        try:
-            url_path = next_page["href"]
-            next_page_url = self._build_page_url(url_path)
-        except TypeError:
-            next_page_url = None
-        return next_page_url
-
     def _build_page_url(self, url_path):
         """Create the URL for the page."""
         bits = urllib.parse.urlsplit(self.url)
@@ -1,9 +1,10 @@
+import csv
 import logging
 import re
 from collections import OrderedDict
 from datetime import datetime as dt
 
-from ... import utils
+from ... import report, utils
 from .site import Site as JobCenterSite
 
 logger = logging.getLogger(__name__)
@@ -17,6 +18,7 @@ def scrape_state(
     cache_dir,
     use_cache=True,
     verify=True,
+    incremental=True,
 ):
     """Date-based scraper for Job Center states.
 
@@ -24,8 +26,10 @@ def scrape_state(
     It applies a date-based scraping strategy that:
 
       - Scrapes one year at a time, in reverse chronological order
-      - Always does a fresh scrape for current and prior year
-      - Uses cached files for years before current & prior
+      - Uses cached files only when the cache's freshness policy allows, which by
+        default means a fresh scrape for current and prior year
+      - Refetches only the detail pages of records that are new or changed, with
+        a periodic full refresh, when incremental
       - Deduplicates search results
 
     Args:
@@ -34,23 +38,24 @@ def scrape_state(
         output_csv (str): Full path to CSV where data should be saved (e.g. ~/.warn-scraper/exports/ks.csv)
         stop_year (int): First year that data is available for state (requires manaul research)
         cache_dir (str): The root directory for WARN's cache files (e.g. ~/.warn-scraper/cache)
-        use_cache (boolean, default True): Whether to use cached files for older years
+        use_cache (boolean, default True): Whether to use cached files the freshness policy considers current
         verify (boolean, default True): Use SSL certificate verifcation
+        incremental (boolean, default True): Skip detail pages the site's record index shows are unchanged
 
     Returns:
         Full path to exported csv (e.g. ~/.warn-scraper/exports/ks.csv)
     """
     yearly_dates = _date_ranges_to_scrape(stop_year)
 
-    # No caching should be used for current and prior year, so
-    # we have to separate those from remaining years.
-    no_cache_years = [yearly_dates.pop(0), yearly_dates.pop(0)]
-
     # Set up scraper instance
     state_cache_dir = cache_dir / state_postal.lower()
     print(f"scrape_state verify: {verify}")
     site = JobCenterSite(
-        state_postal.upper(), search_url, cache_dir=state_cache_dir, verify=verify
+        state_postal.upper(),
+        search_url,
+        cache_dir=state_cache_dir,
+        verify=verify,
+        incremental=incremental,
     )
 
     # Date-based searches produce search result pages that appear to have certain
@@ -73,15 +78,10 @@ def scrape_state(
         "detail_page_url",
     ]
     utils.write_rows_to_csv(raw_csv, [headers])
-    # Execute the scrape in two batches
-    # 1. Current and prior year. Always scrape fresh (i.e. never use cached files)
-    #    in case records have been updated.
-    _scrape_years(
-        site, raw_csv, headers, no_cache_years, use_cache=False, verify=verify
-    )
-    # 2. Years before current & prior, going back to stop_year.
-    #    We should generally use cached files for these older years,
-    #    since data is less likely to be updated.
+    # Scrape every year. The cache's freshness policy decides which years
+    # can be read from cached files. Current and prior year are always scraped
+    # fresh in case records have been updated, while older years are
+    # generally read from the cache, since their data is less likely to change.
     _scrape_years(
         site, raw_csv, headers, yearly_dates, use_cache=use_cache, verify=verify
     )
@@ -92,32 +92,43 @@ def scrape_state(
 def _scrape_years(
     site, output_csv, headers, start_end_dates, use_cache=True, verify=True
 ):
-    """Loop through years of data and write out to CSV."""
+    """Loop through years of data and write out to CSV as rows come in."""
     # NOTE: Scraping for Jan 1 - Dec 31 for current year works
     # throughout the year. Additionally, it allows us to avoid
     # generating cache files for all days of the year.
-    for start, end in start_end_dates:
-        kwargs = {
-            "start_date": start,
-            "end_date": end,
-            "use_cache": use_cache,
-        }
-        pages_dict, data = site.scrape(**kwargs)
-        rows = [_prepare_row(row) for row in data]
-        # We previously wrote the header so use append mode for data rows
-        utils.write_dict_rows_to_csv(output_csv, headers, rows, mode="a")
-
-
-def _prepare_row(row):
-    """Flatten the nested dict for downstream export to CSV."""
-    # Returned data includes fields from search result page and
+    # We previously wrote the header so use append mode for data rows
+    with open(output_csv, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=headers)
+        for start, end in start_end_dates:
+            kwargs = {
+                "start_date": start,
+                "end_date": end,
+                "use_cache": use_cache,
+                "lean": True,
+            }
+            for record in site.iter_rows(**kwargs):
+                with report.phase("write"):
+                    writer.writerow(_prepare_row(record))
+                report.add_rows(1)
+
+
+def _prepare_row(record):
+    """Flatten a Record into a dict for downstream export to CSV."""
+    # Records combine fields from search result page and
     # data from detail page record for each layoff notice
     # the latter contains two key fields (address and number affected)
-    detail = row.pop("detail")
-    row["number_of_employees_affected"] = detail["number_of_employees_affected"]
-    row["address"] = re.sub(r"\n+", "; ", detail["address"].strip())
-    row["record_number"] = detail["record_number"]
-    return row
+    return {
+        "employer": record.employer,
+        "notice_date": record.notice_date,
+        "number_of_employees_affected": record.number_of_employees_affected,
+        "warn_type": record.warn_type,
+        "city": record.city,
+        "zip": record.zip,
+        "lwib_area": record.lwib_area,
+        "address": re.sub(r"\n+", "; ", record.address.strip()),
+        "record_number": record.record_number,
+        "detail_page_url": record.detail_page_url,
+    }
 
 
 def _date_ranges_to_scrape(stop_year):
@@ -0,0 +1,137 @@
+import logging
+import threading
+import time
+import typing
+from urllib.parse import urlsplit
+
+from . import report
+
+logger = logging.getLogger(__name__)
+
+
+# The pace, in requests per second, used for any host without its own setting
+DEFAULT_RATE = 4.0
+DEFAULT_BURST = 4
+
+# Hosts that have asked us, one way or another, to slow down.
+# Each value is a (requests per second, burst size) pair.
+HOST_RATES: typing.Dict[str, typing.Tuple[typing.Optional[float], int]] = {
+    # Georgia's detail files used to be fetched with a two-second pause
+    "www.tcsg.edu": (0.5, 1),
+    # Hawaii's yearly subpages used to be fetched with a two-second pause
+    "labor.hawaii.gov": (0.5, 1),
+    # Maryland began blocking aggressive clients in November 2024
+    "www.dllr.state.md.us": (1 / 3, 1),
+}
+
+
+class TokenBucket:
+    """A token bucket that refills at a steady rate.
+
+    Args:
+        rate (float): Tokens added per second. None means no limit.
+        burst (int): The most tokens the bucket can hold.
+    """
+
+    def __init__(self, rate: typing.Optional[float], burst: int = 1):
+        """Initialize a new instance."""
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds to wait before using it."""
+        if not self.rate:
+            return 0.0
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class RateLimiter:
+    """Politeness limits for outbound requests, kept separately for each host.
+
+    Requests to different hosts never wait on each other, and nothing is
+    spent when no request is made.
+
+    Example:
+        Slow down a host and pace a request to it::
+
+            limiter = RateLimiter()
+            limiter.configure("www.example.gov", rate=0.5)
+            limiter.wait("https://www.example.gov/warn.html")
+
+    Args:
+        rate (float): Requests per second for hosts without their own setting.
+        burst (int): Burst size for hosts without their own setting.
+        host_rates (dict): Host names mapped to (rate, burst) pairs.
+    """
+
+    def __init__(
+        self,
+        rate: typing.Optional[float] = DEFAULT_RATE,
+        burst: int = DEFAULT_BURST,
+        host_rates: typing.Optional[typing.Dict] = None,
+    ):
+        """Initialize a new instance."""
+        self.rate = rate
+        self.burst = burst
+        self.host_rates = dict(host_rates or {})
+        self._buckets: typing.Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, host: str, rate: typing.Optional[float], burst: int = 1):
+        """Set the pace for a host.
+
+        Args:
+            host (str): The host name, like "www.example.gov"
+            rate (float): Requests per second. None removes the limit.
+            burst (int): How many requests can go out back-to-back (default 1)
+        """
+        host = host.lower()
+        with self._lock:
+            self.host_rates[host] = (rate, burst)
+            self._buckets.pop(host, None)
+
+    def reserve(self, url: str) -> float:
+        """Claim a slot for the provided URL and return the seconds to wait for it."""
+        host = _host(url)
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, burst = self.host_rates.get(host, (self.rate, self.burst))
+                bucket = self._buckets[host] = TokenBucket(rate, burst)
+            return bucket.reserve()
+
+    def wait(self, url: str) -> float:
+        """Block until a request to the provided URL is allowed.
+
+        Returns: the number of seconds spent waiting
+        """
+        delay = self.reserve(url)
+        if delay > 0:
+            logger.debug(f"Waiting {delay:.2f}s before requesting {url}")
+            with report.phase("fetch"):
+                time.sleep(delay)
+        return delay
+
+    def reset(self):
+        """Forget the state of every bucket."""
+        with self._lock:
+            self._buckets.clear()
+
+
+def _host(url: str) -> str:
+    """Pull the host out of a URL, or accept a bare host name."""
+    netloc = urlsplit(url).netloc if "//" in url else url
+    return netloc.rsplit("@", 1)[-1].split(":")[0].lower()
+
+
+# The process-wide limiter that all of our fetch paths share
+limiter = RateLimiter(host_rates=HOST_RATES)
@@ -0,0 +1,138 @@
+import ast
+import json
+import logging
+import typing
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from importlib import import_module
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+# The static list of scrapers, which can be read without importing any of them
+REGISTRY_PATH = Path(__file__).parent / "registry.json"
+
+# Where the scraper modules live
+SCRAPERS_DIR = Path(__file__).parent / "scrapers"
+
+# The metadata each scraper module declares about itself
+METADATA = ("__authors__", "__tags__", "__source__")
+
+
+@dataclass
+class ScraperInfo:
+    """What we know about a scraper without importing it.
+
+    The authors, tags and source are copied from the module by ``build``.
+    The fetch characteristics are maintained by hand in registry.json.
+
+    Args:
+        state (str): The lower-case postal code the scraper covers.
+        authors (list): The GitHub handles of the scraper's authors.
+        tags (list): The kinds of files the scraper parses, like "html" or "pdf".
+        source (dict): The name and URL of the agency that publishes the notices.
+        platform (str): The shared platform the scraper is built on, if any, like "job_center".
+        browser (bool): Whether the scraper drives a web browser.
+        timeout (int): Seconds the scraper may run, if it needs something other than the Runner's default.
+    """
+
+    state: str
+    authors: typing.List[str] = field(default_factory=list)
+    tags: typing.List[str] = field(default_factory=list)
+    source: typing.Dict[str, str] = field(default_factory=dict)
+    platform: typing.Optional[str] = None
+    browser: bool = False
+    timeout: typing.Optional[int] = None
+
+
+@lru_cache(maxsize=None)
+def load(path: Path = REGISTRY_PATH) -> typing.Dict[str, ScraperInfo]:
+    """Read the registry.
+
+    Args:
+        path (Path): The registry file to read (default REGISTRY_PATH)
+
+    Returns: a dictionary of ScraperInfo objects keyed by postal code
+    """
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    return {state: ScraperInfo(state=state, **info) for state, info in data.items()}
+
+
+def states() -> typing.List[str]:
+    """Get the postal codes of every scraper in the registry, in alphabetical order."""
+    return sorted(load())
+
+
+def get(state: str) -> typing.Optional[ScraperInfo]:
+    """Get the registry entry for the provided state, if it has one."""
+    return load().get(state.strip().lower())
+
+
+def build(path: Path = REGISTRY_PATH) -> typing.Dict[str, ScraperInfo]:
+    """Rebuild the registry from the scraper modules on disk.
+
+    The metadata is refreshed from each module's source, and the hand-kept
+    fetch characteristics of scrapers already in the registry are preserved.
+    Modules are only imported when their metadata isn't a plain literal.
+
+    Args:
+        path (Path): The registry file to update (default REGISTRY_PATH)
+
+    Returns: a dictionary of ScraperInfo objects keyed by postal code
+    """
+    try:
+        existing = load.__wrapped__(path)
+    except FileNotFoundError:
+        existing = {}
+    registry = {}
+    for module_path in sorted(SCRAPERS_DIR.glob("*.py")):
+        state = module_path.stem
+        if state == "__init__":
+            continue
+        metadata = read_metadata(module_path)
+        info = existing.get(state) or ScraperInfo(state=state)
+        info.authors = sorted(metadata["__authors__"])
+        info.tags = sorted(metadata["__tags__"])
+        info.source = metadata["__source__"]
+        registry[state] = info
+    logger.debug(f"Writing {len(registry)} scrapers to {path}")
+    data = {}
+    for state, info in registry.items():
+        entry = asdict(info)
+        entry.pop("state")
+        data[state] = entry
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+    load.cache_clear()
+    return registry
+
+
+def read_metadata(module_path: Path) -> typing.Dict[str, typing.Any]:
+    """Read the metadata a scraper module declares, importing it only if we must.
+
+    Args:
+        module_path (Path): The path to the scraper's source file.
+
+    Returns: a dictionary with the module's __authors__, __tags__ and __source__
+    """
+    tree = ast.parse(module_path.read_text(encoding="utf-8"))
+    metadata = {}
+    for node in tree.body:
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1:
+            continue
+        target = node.targets[0]
+        if not isinstance(target, ast.Name) or target.id not in METADATA:
+            continue
+        try:
+            metadata[target.id] = ast.literal_eval(node.value)
+        except ValueError:
+            # Something computed, like a URL with this year in it
+            pass
+    if len(metadata) < len(METADATA):
+        logger.debug(f"Importing {module_path.stem} to read its metadata")
+        module = import_module(f"warn.scrapers.{module_path.stem}")
+        metadata = {name: getattr(module, name) for name in METADATA}
+    return metadata
@@ -0,0 +1,266 @@
+import json
+import logging
+import time
+import typing
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+# The phases a scrape's wall time is split into
+PHASES = ("fetch", "parse", "write")
+
+# The report of the scrape running in this process, if the Runner is tracking one
+_active: typing.Optional["RunReport"] = None
+
+
+@dataclass
+class CacheStats:
+    """How one namespace of the cache, like "ia" or "ks", was used.
+
+    Args:
+        hits (int): Lookups answered with a usable cached copy.
+        misses (int): Files fetched because there was no cached copy.
+        refreshes (int): Files fetched again, or revalidated, because the cached copy was stale.
+        bytes_read (int): Bytes of content read from the cache.
+        bytes_written (int): Bytes of content saved to the cache.
+        io_time (float): Seconds spent reading from and writing to the cache.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    refreshes: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    io_time: float = 0.0
+
+    @property
+    def hit_rate(self) -> typing.Optional[float]:
+        """Get the share of lookups that were hits, if there were any."""
+        lookups = self.hits + self.misses + self.refreshes
+        return self.hits / lookups if lookups else None
+
+    def add(self, other: "CacheStats"):
+        """Add another set of counts to this one."""
+        for name, value in asdict(other).items():
+            setattr(self, name, getattr(self, name) + value)
+
+
+class RunReport:
+    """Where a single scrape spent its time, and how much it moved.
+
+    Time spent inside our HTTP helpers counts as fetching, and time spent
+    inside our CSV writers counts as writing. Everything else the scraper
+    does is counted as parsing.
+
+    Args:
+        state (str): The two-letter postal code being scraped.
+    """
+
+    def __init__(self, state: str):
+        """Initialize a new instance."""
+        self.state = state
+        self.status = "running"
+        self.output: typing.Optional[str] = None
+        self.started_at = datetime.now()
+        self.elapsed = 0.0
+        self.fetch_time = 0.0
+        self.write_time = 0.0
+        self.requests = 0
+        self.bytes_downloaded = 0
+        self.cache_hits = 0
+        self.rows_written = 0
+        self.cache: typing.Dict[str, CacheStats] = {}
+        self._start = time.perf_counter()
+        self._phase: typing.Optional[str] = None
+        self._in_cache = False
+
+    @contextmanager
+    def phase(self, name: str):
+        """Count the time spent in the block toward the provided phase.
+
+        Phases don't nest. A fetch that runs inside another fetch, or inside
+        a write, is counted once, toward the outermost phase.
+
+        Args:
+            name (str): Either "fetch" or "write".
+        """
+        if self._phase is not None:
+            yield
+            return
+        self._phase = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            spent = time.perf_counter() - start
+            if name == "fetch":
+                self.fetch_time += spent
+            else:
+                self.write_time += spent
+            self._phase = None
+
+    @contextmanager
+    def cache_io(self, namespace: str):
+        """Count the time spent in the block toward the provided cache namespace.
+
+        Like phases, cache calls don't nest. One that runs inside another is counted once.
+        """
+        if self._in_cache:
+            yield
+            return
+        self._in_cache = True
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.cache_stats(namespace).io_time += time.perf_counter() - start
+            self._in_cache = False
+
+    def cache_stats(self, namespace: str) -> CacheStats:
+        """Get the counts for the provided cache namespace, starting them if need be."""
+        if namespace not in self.cache:
+            self.cache[namespace] = CacheStats()
+        return self.cache[namespace]
+
+    def finish(self, status: str, output: typing.Optional[Path] = None):
+        """Stop the clock and record how the scrape ended."""
+        self.elapsed = time.perf_counter() - self._start
+        self.status = status
+        self.output = str(output) if output else None
+
+    def to_dict(self) -> typing.Dict:
+        """Get the report as a JSON-ready dictionary."""
+        parse_time = max(self.elapsed - self.fetch_time - self.write_time, 0.0)
+        return {
+            "state": self.state,
+            "status": self.status,
+            "output": self.output,
+            "started_at": self.started_at.isoformat(),
+            "elapsed": round(self.elapsed, 3),
+            "phases": {
+                "fetch": round(self.fetch_time, 3),
+                "parse": round(parse_time, 3),
+                "write": round(self.write_time, 3),
+            },
+            "requests": self.requests,
+            "bytes_downloaded": self.bytes_downloaded,
+            "cache_hits": self.cache_hits,
+            "rows_written": self.rows_written,
+            "cache": {
+                namespace: dict(asdict(stats), io_time=round(stats.io_time, 3))
+                for namespace, stats in sorted(self.cache.items())
+            },
+        }
+
+    def save(self, log_dir: Path) -> Path:
+        """Write the report to the log directory.
+
+        The latest report for each state is saved as {state}.json. Every report
+        is also appended to runs.jsonl, so regressions can be tracked over time.
+
+        Args:
+            log_dir (Path): The directory where reports are kept.
+
+        Returns: the Path to the state's report
+        """
+        log_dir = Path(log_dir)
+        log_dir.mkdir(parents=True, exist_ok=True)
+        data = self.to_dict()
+        path = log_dir / f"{self.state}.json"
+        logger.debug(f"Writing run report to {path}")
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, indent=2)
+        with open(log_dir / "runs.jsonl", "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(data) + "\n")
+        return path
+
+
+@contextmanager
+def track(run: RunReport):
+    """Collect timings and counts into the provided report while the block runs."""
+    global _active
+    _active = run
+    try:
+        yield run
+    finally:
+        _active = None
+
+
+def phase(name: str):
+    """Count the time spent in the block toward a phase of the current scrape, if any.
+
+    Example:
+        Time a download::
+
+            with report.phase("fetch"):
+                response = session.get(url)
+
+    Args:
+        name (str): Either "fetch" or "write".
+    """
+    if _active is None:
+        return nullcontext()
+    return _active.phase(name)
+
+
+def add_request(nbytes: int = 0):
+    """Count an HTTP request, and the bytes it brought back, toward the current scrape."""
+    if _active is not None:
+        _active.requests += 1
+        _active.bytes_downloaded += nbytes
+
+
+def add_bytes(nbytes: int):
+    """Count bytes read from a streamed response toward the current scrape."""
+    if _active is not None:
+        _active.bytes_downloaded += nbytes
+
+
+def add_cache_hit():
+    """Count a request that was answered from the cache toward the current scrape."""
+    if _active is not None:
+        _active.cache_hits += 1
+
+
+def add_cache_lookup(namespace: str, outcome: str):
+    """Count a cache lookup toward the current scrape.
+
+    Args:
+        namespace (str): The part of the cache the file is in, like "ia".
+        outcome (str): One of "hit", "miss" or "refresh".
+    """
+    if _active is None:
+        return
+    stats = _active.cache_stats(namespace)
+    if outcome == "hit":
+        stats.hits += 1
+        _active.cache_hits += 1
+    elif outcome == "miss":
+        stats.misses += 1
+    else:
+        stats.refreshes += 1
+
+
+def add_cache_bytes(namespace: str, read: int = 0, written: int = 0):
+    """Count bytes of content read from and saved to the cache toward the current scrape."""
+    if _active is not None:
+        stats = _active.cache_stats(namespace)
+        stats.bytes_read += read
+        stats.bytes_written += written
+
+
+def cache_io(namespace: str):
+    """Count the time spent in the block toward a cache namespace of the current scrape, if any."""
+    if _active is None:
+        return nullcontext()
+    return _active.cache_io(namespace)
+
+
+def add_rows(count: int):
+    """Count rows written to the output file toward the current scrape."""
+    if _active is not None:
+        _active.rows_written += count
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+import typing
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+# How many times to try a request before giving up
+DEFAULT_ATTEMPTS = 3
+
+# The backoff before the first retry, in seconds, and the most any one backoff may grow to
+DEFAULT_BASE_DELAY = 2.0
+DEFAULT_MAX_DELAY = 60.0
+
+# The most seconds a single host may cost us in retry waits over a whole run
+DEFAULT_HOST_BUDGET = 5 * 60.0
+
+# Client errors that are worth another try. Every other 4xx fails right away.
+RETRY_STATUSES = frozenset({408, 429})
+
+
+class RetryPolicy:
+    """Decide which failed requests to try again, and how long to wait first.
+
+    Server errors, timeouts, rate-limit responses and dropped connections
+    are retried with jittered exponential backoff, or after the pause the
+    server asks for in its Retry-After header. Any other 4xx fails on the
+    first try, since asking again won't change the answer.
+
+    Every host also has a budget for the total time we'll spend waiting
+    to retry its requests. Once it's spent, failures from that host are
+    returned or raised immediately.
+
+    Example:
+        Request a page under the shared policy::
+
+            response = policy.request(lambda: session.get(url), url)
+
+    Args:
+        attempts (int): The most times to try a request (default 3)
+        base_delay (float): Seconds to back off before the first retry (default 2)
+        max_delay (float): The ceiling on any one backoff, in seconds (default 60)
+        host_budget (float): Seconds of retry waits allowed per host (default 300)
+    """
+
+    def __init__(
+        self,
+        attempts: int = DEFAULT_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        host_budget: float = DEFAULT_HOST_BUDGET,
+    ):
+        """Initialize a new instance."""
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.host_budget = host_budget
+        self._spent: typing.Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def retryable(self, status_code: int) -> bool:
+        """Whether a response with the provided status code is worth another try."""
+        return status_code >= 500 or status_code in RETRY_STATUSES
+
+    def backoff(self, attempt: int) -> float:
+        """Get a jittered wait before the provided retry, counting from one."""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+    def delay(
+        self, attempt: int, response: typing.Optional[typing.Any] = None
+    ) -> float:
+        """Get the seconds to wait before the provided retry.
+
+        Args:
+            attempt (int): Which retry this is, counting from one.
+            response (Response): The failed response, if the server sent one. Anything with headers will do.
+
+        Returns: the server's Retry-After, if it sent one, or else a jittered backoff
+        """
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return retry_after
+        return self.backoff(attempt)
+
+    def request(
+        self, send: typing.Callable[[], requests.Response], url: str
+    ) -> requests.Response:
+        """Make a request, retrying it under this policy.
+
+        Args:
+            send (callable): A function that makes the request and returns its response.
+            url (str): The URL being requested, which decides whose budget is charged.
+
+        Returns: the first response that shouldn't be retried, or the last one if we ran out of tries
+        """
+        host = _host(url)
+        attempt = 1
+        while True:
+            try:
+                response = send()
+            except (requests.ConnectionError, requests.Timeout):
+                wait = self._next_wait(host, attempt)
+                if wait is None:
+                    raise
+            else:
+                if not self.retryable(response.status_code):
+                    return response
+                wait = self._next_wait(host, attempt, response)
+                if wait is None:
+                    return response
+                response.close()
+            logger.debug(f"Retrying {url} in {wait:.1f}s (attempt {attempt + 1})")
+            time.sleep(wait)
+            attempt += 1
+
+    async def request_async(
+        self,
+        send: typing.Callable[[], typing.Awaitable[typing.Any]],
+        url: str,
+        errors: typing.Tuple[typing.Type[BaseException], ...] = (),
+    ) -> typing.Any:
+        """Make a request from async code, retrying it under this policy.
+
+        Works like request, but waits without blocking the event loop.
+
+        Args:
+            send (callable): A coroutine function that makes the request and returns its response.
+            url (str): The URL being requested, which decides whose budget is charged.
+            errors (tuple): The exceptions that mean the connection failed and may be retried.
+
+        Returns: the first response that shouldn't be retried, or the last one if we ran out of tries
+        """
+        host = _host(url)
+        attempt = 1
+        while True:
+            try:
+                response = await send()
+            except errors:
+                wait = self._next_wait(host, attempt)
+                if wait is None:
+                    raise
+            else:
+                if not self.retryable(response.status_code):
+                    return response
+                wait = self._next_wait(host, attempt, response)
+                if wait is None:
+                    return response
+            logger.debug(f"Retrying {url} in {wait:.1f}s (attempt {attempt + 1})")
+            await asyncio.sleep(wait)
+            attempt += 1
+
+    def reset(self):
+        """Refill every host's budget."""
+        with self._lock:
+            self._spent.clear()
+
+    def _next_wait(
+        self, host: str, attempt: int, response: typing.Optional[typing.Any] = None
+    ) -> typing.Optional[float]:
+        """Get the wait before retrying a failed try, or None if it shouldn't be retried."""
+        if attempt >= self.attempts:
+            return None
+        wait = self.delay(attempt, response)
+        if not self._charge(host, wait):
+            return None
+        return wait
+
+    def _charge(self, host: str, wait: float) -> bool:
+        """Take a wait out of the host's budget, if there's enough left."""
+        with self._lock:
+            spent = self._spent.get(host, 0.0)
+            if spent + wait > self.host_budget:
+                logger.debug(f"Retry budget for {host} is spent")
+                return False
+            self._spent[host] = spent + wait
+            return True
+
+
+def parse_retry_after(value: typing.Optional[str]) -> typing.Optional[float]:
+    """Convert a Retry-After header, in seconds or as an HTTP date, to seconds from now."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _host(url: str) -> str:
+    """Get the lowercase host name from a URL."""
+    return (urlsplit(url).hostname or "").lower()
+
+
+# The process-wide policy shared by all of our fetch paths
+policy = RetryPolicy()
@@ -1,18 +1,59 @@
+import inspect
 import logging
+import multiprocessing
 import shutil
+import time
+import traceback
+import typing
+from dataclasses import dataclass
 from importlib import import_module
+from multiprocessing.connection import wait
 from pathlib import Path
 
-from . import utils
+from . import cache_archive, cache_storage, registry, report, utils
+from .manifest import Manifest, code_sha256
+from .report import RunReport
 
 logger = logging.getLogger(__name__)
 
 
+# The seconds a scraper may run before the Runner kills it,
+# unless its entry in the registry says otherwise
+DEFAULT_TIMEOUT = 30 * 60
+
+
+@dataclass
+class ScrapeResult:
+    """The outcome of a single state's scrape.
+
+    Args:
+        state (str): The two-letter postal code that was scraped.
+        status (str): One of "ok", "failed" or "timeout".
+        path (Path): The CSV generated by the scraper, if it succeeded.
+        error (str): The traceback or exit message, if it failed.
+        elapsed (float): Wall-clock seconds spent on the state.
+        report (dict): The scrape's run report, if its process lived to send one.
+    """
+
+    state: str
+    status: str
+    path: typing.Optional[Path] = None
+    error: typing.Optional[str] = None
+    elapsed: float = 0.0
+    report: typing.Optional[typing.Dict] = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the scrape succeeded."""
+        return self.status == "ok"
+
+
 class Runner:
     """High-level interface for scraping state data.
 
     Provides methods for:
      - scraping a state
+     - scraping many states in parallel
      - deleting files from prior runs
 
     The data_dir and cache_dir arguments can specify any
@@ -24,20 +65,60 @@ class Runner:
     Args:
         data_dir (str): Path where final output files are saved.
         cache_dir (str): Path to store intermediate files used in ETL.
+        timeout (float): Seconds any one scraper may run in scrape_parallel.
+            Defaults to the scraper's timeout in the registry, or DEFAULT_TIMEOUT.
+            Calling scrape directly runs the scraper in this process, with no deadline.
+        log_dir (str): Path where each scrape's run report is saved.
+        archive (str): A cache archive to read files missing from cache_dir out of. Optional.
+        storage (str): The URL of a store to share cache_dir's files through, like
+            s3://bucket/warn-cache. Optional. See cache_storage.from_url.
     """
 
     def __init__(
         self,
         data_dir: Path = utils.WARN_DATA_DIR,
         cache_dir: Path = utils.WARN_CACHE_DIR,
+        timeout: typing.Optional[float] = None,
+        log_dir: Path = utils.WARN_LOG_DIR,
+        archive: typing.Optional[Path] = None,
+        storage: typing.Optional[str] = None,
     ):
         """Initialize a new instance."""
         self.data_dir = data_dir
         self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.log_dir = log_dir
+        self.archive = archive
+        self.storage = storage
+        self.last_report: typing.Optional[typing.Dict] = None
+
+    def timeout_for(self, state: str) -> float:
+        """Get the seconds the provided state's scraper is allowed to run."""
+        if self.timeout is not None:
+            return self.timeout
+        info = registry.get(state)
+        if info is not None and info.timeout is not None:
+            return info.timeout
+        return DEFAULT_TIMEOUT
 
     def scrape(self, state: str) -> Path:
         """Run the scraper for the provided state.
 
+        The content hash of every file the scraper fetches is saved to a manifest
+        in the cache. Scrapers can use it to skip parsing and writing when all of
+        their inputs match the last successful run.
+
+        A report of where the time went, split into fetch, parse and write
+        phases, is saved to the log directory whether or not the scrape succeeds.
+
+        The scraper runs in this process with no watchdog, so it isn't held to
+        the runner's timeout. Individual HTTP requests still time out. Use
+        scrape_parallel, even for a single state, to have it stopped at its deadline.
+
+        If the runner has a store, every file the scraper caches is shared through
+        it, and files missing from the cache are looked for there. Likewise, files
+        missing from the cache are read from the runner's cache archive, if it has one.
+
         Args:
             state (str): the two-letter postal code of the state to scrape.
 
@@ -47,17 +128,164 @@ class Runner:
         state = state.strip().lower()
         state_mod = import_module(f"warn.scrapers.{state}")
 
-        # Run the scrape method
+        # Run the scrape method, tracking the inputs it fetches
         logger.info(f"Scraping {state}")
-        data_path = state_mod.scrape(self.data_dir, self.cache_dir)
+        manifest = Manifest(self.cache_dir)
+        code = code_sha256(Path(inspect.getfile(state_mod)))
+        run = RunReport(state)
+        if self.archive is not None:
+            cache_archive.attach(Path(self.archive), Path(self.cache_dir))
+        if self.storage is not None:
+            cache_storage.attach(
+                cache_storage.from_url(self.storage), Path(self.cache_dir)
+            )
+        try:
+            with report.track(run), manifest.track(state, code=code) as inputs:
+                data_path = state_mod.scrape(self.data_dir, self.cache_dir)
+            manifest.save(state, inputs, data_path)
+            run.finish("ok", output=data_path)
+        finally:
+            if run.status != "ok":
+                run.finish("failed")
+            self.last_report = run.to_dict()
+            run.save(self.log_dir)
+            if self.archive is not None:
+                cache_archive.detach()
+            if self.storage is not None:
+                cache_storage.detach()
 
         # Run the path to the data file
         logger.info(f"Generated {data_path}")
         return data_path
 
+    def scrape_parallel(
+        self, states: typing.Iterable[str], jobs: int = 4
+    ) -> typing.List[ScrapeResult]:
+        """Run the scrapers for many states at once.
+
+        Each state runs in its own process, with no more than ``jobs``
+        running at the same time. A state that raises an error or crashes
+        its process is recorded as a failure without disturbing the others.
+        A state that runs past its deadline is killed and recorded as a timeout.
+
+        Args:
+            states (list): the two-letter postal codes of the states to scrape.
+            jobs (int): the maximum number of scrapers to run at once (default 4)
+
+        Returns: a list of ScrapeResult objects in the order the states were provided.
+        """
+        pending = [s.strip().lower() for s in states]
+        order = {state: i for i, state in enumerate(pending)}
+        pending.reverse()
+        results = []
+        running: typing.Dict[typing.Any, typing.Tuple] = {}
+        context = multiprocessing.get_context()
+        log_level = logging.getLogger().getEffectiveLevel()
+
+        while pending or running:
+            # Fill up the pool
+            while pending and len(running) < max(jobs, 1):
+                state = pending.pop()
+                recv_conn, send_conn = context.Pipe(duplex=False)
+                process = context.Process(
+                    target=_scrape_worker,
+                    args=(self, state, send_conn, log_level),
+                    name=f"warn-{state}",
+                    daemon=True,
+                )
+                process.start()
+                # Drop our copy of the sending end so a dead child reads as EOF
+                send_conn.close()
+                logger.debug(f"Started {state} in process {process.pid}")
+                started = time.monotonic()
+                deadline = started + self.timeout_for(state)
+                running[recv_conn] = (state, process, started, deadline)
+
+            # Wait for any of the running scrapers to report back,
+            # but no longer than the nearest deadline
+            nearest = min(d for _, _, _, d in running.values())
+            ready = wait(
+                list(running.keys()), timeout=max(nearest - time.monotonic(), 0)
+            )
+            for conn in ready:
+                state, process, started, _ = running.pop(conn)
+                result = _receive_result(conn, state, process)
+                result.elapsed = time.monotonic() - started
+                if result.ok:
+                    logger.info(f"Finished {state} in {result.elapsed:.1f}s")
+                else:
+                    logger.error(f"Scraper for {state} failed")
+                results.append(result)
+
+            # Kill anything that has run out of time
+            now = time.monotonic()
+            for late_conn, (state, process, started, deadline) in list(running.items()):
+                if now < deadline:
+                    continue
+                running.pop(late_conn)
+                logger.error(f"Scraper for {state} timed out. Killing it.")
+                _kill(process)
+                late_conn.close()
+                results.append(
+                    ScrapeResult(
+                        state=state,
+                        status="timeout",
+                        error=f"Timed out after {now - started:.0f} seconds",
+                        elapsed=now - started,
+                    )
+                )
+
+        return sorted(results, key=lambda r: order[r.state])
+
     def delete(self):
         """Delete the files in the output directories."""
         logger.debug(f"Deleting files in {self.data_dir}")
         shutil.rmtree(self.data_dir, ignore_errors=True)
         logger.debug(f"Deleting files in {self.cache_dir}")
         shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+def _scrape_worker(runner: Runner, state: str, conn, log_level: int):
+    """Run a single scraper inside a child process and send back the outcome."""
+    # Processes started with "spawn" don't inherit the parent's logging setup
+    if not logging.getLogger().handlers:
+        logging.basicConfig(
+            level=log_level, format="%(asctime)s - %(name)s - %(message)s"
+        )
+    try:
+        data_path = runner.scrape(state)
+        conn.send(("ok", str(data_path), None, runner.last_report))
+    # Catch SystemExit too, since some scrapers call quit() when they can't run
+    except (Exception, SystemExit):
+        conn.send(("failed", None, traceback.format_exc(), runner.last_report))
+    finally:
+        conn.close()
+
+
+def _kill(process, grace: float = 5):
+    """Stop a process, escalating to SIGKILL if it ignores SIGTERM."""
+    process.terminate()
+    process.join(grace)
+    if process.is_alive():
+        process.kill()
+        process.join()
+
+
+def _receive_result(conn, state: str, process) -> ScrapeResult:
+    """Read a child's report, falling back to its exit code if it died silently."""
+    try:
+        status, path, error, run_report = conn.recv()
+    except EOFError:
+        status, path, error, run_report = "failed", None, None, None
+    finally:
+        conn.close()
+    process.join()
+    if error is None and status != "ok":
+        error = f"Process exited with code {process.exitcode}"
+    return ScrapeResult(
+        state=state,
+        status=status,
+        path=Path(path) if path else None,
+        error=error,
+        report=run_report,
+    )
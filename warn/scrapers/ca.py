@@ -8,7 +8,7 @@ import pdfplumber
 from bs4 import BeautifulSoup
 from openpyxl import load_workbook
 
-from .. import utils
+from .. import manifest, utils
 from ..cache import Cache
 
 __authors__ = ["zstumgoren", "Dilcia19", "ydoc5212"]
@@ -73,6 +73,11 @@ def scrape(
         file_path = cache.download(f"ca/{file_name}", link)
         file_list.append(file_path)
 
+    # If none of the data files have changed, the last CSV is still good
+    output_path = data_dir / "ca.csv"
+    if manifest.inputs_unchanged(output_path, ignore=["ca/list.html"]):
+        return output_path
+
     # Parse all the data files
     output_rows = []
     for file_ in file_list:
@@ -95,7 +100,6 @@ def scrape(
         "address",
         "source_file",
     ]
-    output_path = data_dir / "ca.csv"
     utils.write_dict_rows_to_csv(
         output_path, output_headers, output_rows, extrasaction="ignore"
     )
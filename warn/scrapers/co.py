@@ -3,7 +3,7 @@ from pathlib import Path
 
 from bs4 import BeautifulSoup, Tag
 
-from .. import utils
+from .. import aio, utils
 from ..cache import Cache
 
 __authors__ = ["anikasikka"]
@@ -77,8 +77,10 @@ def scrape(
 
     link_list = [a for a in accordion.find_all("a") if "feedback" not in a.text]
     logger.debug(f"Requesting {len(link_list)} discovered links")
-    for link in link_list:
-        page = utils.get_url(link["href"])
+    page_list = aio.fetch_all([str(link["href"]) for link in link_list])
+    for link, page in zip(link_list, page_list):
+        if not page.ok:
+            raise ValueError(f"Request for {page.url} failed with {page.status_code}")
         soup = BeautifulSoup(page.text, "html5lib")
         table = soup.find(class_="waffle")
         if "2017" in link.text:
@@ -61,7 +61,7 @@ def scrape(
         url = f"https://www.ctdol.state.ct.us/progsupt/bussrvce/warnreports/warn{year}.htm"
         cache_key = f"ct/{year}.html"
 
-        if cache.exists(cache_key) and year < current_year:
+        if cache.is_fresh(cache_key):
             html = cache.read(cache_key)
         else:
             r = utils.get_url(url)
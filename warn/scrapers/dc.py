@@ -4,6 +4,7 @@ import uuid
 from datetime import datetime
 from pathlib import Path
 
+import requests
 from bs4 import BeautifulSoup
 
 from .. import utils
@@ -39,16 +40,15 @@ def scrape(
     today = datetime.today()
     current_year = today.year
 
-    targetfile = cache_dir / f"dc/{current_year}.html"
     url = f"https://does.dc.gov/page/industry-closings-and-layoffs-warn-notifications-{current_year}"
-    success, content = utils.save_if_good_url(targetfile, url)
-
-    if not success:  # If we don't have a file for a new year
-        targetfile = cache_dir / f"dc/{current_year - 1}.html"
+    try:
+        targetfile = cache.download(f"dc/{current_year}.html", url)
+    except requests.HTTPError:  # If we don't have a file for a new year
+        logger.error(f"URL {url} fetch failed. Is a new year's URL not started?")
         url = f"https://does.dc.gov/page/industry-closings-and-layoffs-warn-notifications-{current_year - 1}"
-        success, content = utils.save_if_good_url(targetfile, url)
+        targetfile = cache.download(f"dc/{current_year - 1}.html", url)
 
-    root_html = content
+    root_html = targetfile.read_bytes()
     #    r = utils.get_url(url)
     #    r.encoding = "utf-8"
     #    root_html = r.text
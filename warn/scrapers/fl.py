@@ -1,12 +1,8 @@
-import datetime
 import logging
 import re
-from os.path import exists
 from pathlib import Path
 
 import pdfplumber
-import requests
-import tenacity
 import urllib3
 from bs4 import BeautifulSoup
 
@@ -54,7 +50,7 @@ def scrape(
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/50.0.2661.102 Safari/537.36"
     }
     url = "https://floridajobs.org/office-directory/division-of-workforce-services/workforce-programs/reemployment-and-emergency-assistance-coordination-team-react/warn-notices"
-    response = requests.get(url, headers=headers, verify=False)
+    response = utils.get_url(url, user_agent=headers["User-Agent"], verify=False)
     logger.debug(f"Request status is {response.status_code} for {url}")
     soup = BeautifulSoup(response.text, "html.parser")
     pageholder = soup.select("div.content")[0]
@@ -80,7 +76,7 @@ def scrape(
     # Loop through years and scrape data
     for year_url in href_lookup.values():
         if "PDF" in year_url:
-            rows_to_add = _scrape_pdf(cache, cache_dir, year_url, headers)
+            rows_to_add = _scrape_pdf(cache, year_url, headers)
         else:
             html_pages = _scrape_html(cache, year_url, headers)
             rows_to_add = _html_to_rows(html_pages)
@@ -95,35 +91,20 @@ def scrape(
 
 # scrapes each html page for the current year
 # returns a list of the year's html pages
-# note: no max amount of retries (recursive scraping)
-@tenacity.retry(
-    wait=tenacity.wait_exponential(),
-    retry=tenacity.retry_if_exception_type(requests.HTTPError),
-)
+# note: failed requests are retried under the shared policy in warn.retries
 def _scrape_html(cache, url, headers, page=1):
     urllib3.disable_warnings()  # sidestep SSL error
     # extract year from URL
     year = _extract_year(url)
     html_cache_key = f"fl/{year}_page_{page}.html"
-    current_year = datetime.date.today().year
-    last_year = str(current_year - 1)
-    current_year = str(current_year)
-    page_text = ""
-    # search in cache first before scraping
-    try:
-        # re-scrape current year by default
-        if not (year == current_year or year == last_year):
-            logger.debug(f"Trying to read from cache: {html_cache_key}")
-            cachefile = cache.read(html_cache_key)
-            page_text = cachefile
-            logger.debug(f"Page fetched from cache: {html_cache_key}")
-        else:
-            raise FileNotFoundError
-    except FileNotFoundError:
+    # search in cache first before scraping, unless the year is recent enough to re-scrape
+    if cache.is_fresh(html_cache_key):
+        logger.debug(f"Reading from cache: {html_cache_key}")
+        page_text = cache.read(html_cache_key)
+    else:
         # scrape & cache html
-        response = requests.get(url, headers=headers, verify=False)
+        response = utils.get_url(url, user_agent=headers["User-Agent"], verify=False)
         logger.debug(f"Request status is {response.status_code} for {url}")
-        response.raise_for_status()
         page_text = response.text
         cache.write(html_cache_key, page_text)
         logger.debug(f"Successfully scraped page {url} to cache: {html_cache_key}")
@@ -168,29 +149,18 @@ def _html_to_rows(page_text):
 
 
 # download and scrape pdf
-@tenacity.retry(
-    wait=tenacity.wait_exponential(),
-    retry=tenacity.retry_if_exception_type(requests.HTTPError),
-)
-def _scrape_pdf(cache, cache_dir, url, headers):
+def _scrape_pdf(cache, url, headers):
     # sidestep SSL error
     urllib3.disable_warnings()
     # extract year from URL
     year = _extract_year(url)
     pdf_cache_key = f"fl/{year}.pdf"
-    download = ""
     # download pdf if not in the cache
-    if not exists(pdf_cache_key):
-        response = requests.get(url, headers=headers, verify=False)
-        logger.debug(f"Request status is {response.status_code} for {url}")
-        response.raise_for_status()
-        # download & cache pdf
-        download = response.content
-        with open(f"{cache_dir}/{pdf_cache_key}", "wb") as f:
-            f.write(download)
-        logger.debug(f"Successfully scraped PDF from {url} to cache: {pdf_cache_key}")
+    pdf_path = cache.get_or_fetch(
+        pdf_cache_key, url, user_agent=headers["User-Agent"], verify=False
+    )
     # scrape tables from PDF
-    with pdfplumber.open(f"{cache_dir}/{pdf_cache_key}") as pdf:
+    with pdfplumber.open(pdf_path) as pdf:
         pages = pdf.pages
         output_rows = []
         for page_num, page in enumerate(pages):
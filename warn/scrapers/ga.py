@@ -1,13 +1,13 @@
 import csv
 import logging
 import re
-from glob import glob
 from pathlib import Path
 
-import requests
 from bs4 import BeautifulSoup, Tag
 
-from .. import utils
+from .. import aio, utils
+from ..cache import Cache
+from ..sessions import get_session
 
 __authors__ = ["chriszs", "esagara", "Ash1R", "stucka"]
 __tags__ = ["html"]
@@ -118,24 +118,35 @@ def scrape(
         "setUrlOnSearch": True,
         "shortcode_atts": {"id": 77460, "class": None, "detail": None},
     }
-    response = requests.post(api_url, data=payload, headers=headers)
+    response = get_session(api_url).post(api_url, data=payload, headers=headers)
 
     # Use JSON as an index to get other data files
     data = response.json()["data"]
     logger.debug(f"{len(data):,} records from newer dataset in index.")
 
     # Download detailed data if not already cached
+    cache = Cache(cache_dir)
+    to_fetch = []
     for listing in data:
         filehref = BeautifulSoup(listing[0], features="html5lib")("a")[0]["href"]
         fileid = BeautifulSoup(listing[0], features="html5lib")("a")[0].contents[0]
-        targetfilename = cache_dir / ("ga/" + fileid + ".format3")
-        utils.fetch_if_not_cached(targetfilename, filehref, headers=headers)
+        cache_key = "ga/" + fileid + ".format3"
+        if not cache.exists(cache_key):
+            to_fetch.append((cache_key, str(filehref)))
+
+    # Request all of the missing files at once
+    logger.debug(f"Fetching {len(to_fetch):,} detail files not yet cached.")
+    responses = aio.fetch_all([href for _, href in to_fetch], headers=headers)
+    for (cache_key, filehref), detail_response in zip(to_fetch, responses):
+        if not detail_response.ok:
+            logger.error(f"Failed to fetch {filehref} to {cache_key}")
+            continue
+        cache.write(cache_key, detail_response.content)
 
     # Parse detailed data
     masterlist = []
-    for filename in glob(f"{cache_dir}/ga/*.format3"):
-        with open(filename, encoding="utf-8") as infile:
-            html = infile.read()
+    for filename in cache.files("ga", "*.format3"):
+        html = cache.read("ga/" + Path(filename).name, encoding="utf-8")
         tableholder = BeautifulSoup(html, features="html5lib").find(
             "table", {"class": "gv-table-view-content"}
         )
@@ -186,11 +197,10 @@ def scrape(
     }
 
     # Get and process historical data
-    historicalfilename = cache_dir / ("ga/ga_historical.csv")
     filehref = (
         "https://storage.googleapis.com/bln-data-public/warn-layoffs/ga_historical.csv"
     )
-    utils.fetch_if_not_cached(historicalfilename, filehref)
+    historicalfilename = cache.get_or_fetch("ga/ga_historical.csv", filehref)
     with open(historicalfilename, encoding="utf-8") as infile:
         reader = list(csv.DictReader(infile))
         logger.debug(f"Found {len(reader):,} historical records.")
@@ -1,7 +1,6 @@
 import datetime
 import logging
 from pathlib import Path
-from time import sleep
 from urllib.parse import quote
 
 from bs4 import BeautifulSoup
@@ -57,7 +56,6 @@ def scrape(
     # lastdateseen = "2099-12-31"
 
     for subpageurl in reversed(subpageurls):
-        sleep(2)
         # Conditionally here, we want to check and see if we have the old cached files, or if the year is current or previous.
         # Only need to download if it's current or previous year.
         # But do we care enough to implement right now?
@@ -3,7 +3,7 @@ from pathlib import Path
 
 from bs4 import BeautifulSoup
 
-from .. import utils
+from .. import manifest, utils
 from ..cache import Cache
 
 __authors__ = ["zstumgoren", "Dilcia19", "shallotly", "palewire", "stucka"]
@@ -49,19 +49,23 @@ def scrape(
     # Download the Excel file
     excel_path = cache.download("ia/source.xlsx", excel_url)
 
-    # Parse it
-    row_list = utils.parse_excel(excel_path)
-
     # Get historic file
     historic_url = "https://storage.googleapis.com/bln-data-public/warn-layoffs/ia_historical_2018.xlsx"
     historic_excel_path = cache.download("ia/historic.xlsx", historic_url)
 
-    # Parse it, minus the header
-    row_list += utils.parse_excel(historic_excel_path, keep_header=False)
-
     # Set the export path
     data_path = data_dir / "ia.csv"
 
+    # If neither file has changed, the last CSV is still good
+    if manifest.inputs_unchanged(data_path, ignore=["ia/source.html"]):
+        return data_path
+
+    # Parse it
+    row_list = utils.parse_excel(excel_path)
+
+    # Parse the historic file, minus the header
+    row_list += utils.parse_excel(historic_excel_path, keep_header=False)
+
     # Write out the file
     utils.write_rows_to_csv(data_path, row_list)
 
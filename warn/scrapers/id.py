@@ -4,11 +4,11 @@ import re
 from pathlib import Path
 
 import pdfplumber
-import requests
 from bs4 import BeautifulSoup
 
 from .. import utils
 from ..cache import Cache
+from ..sessions import get_session
 
 __authors__ = ["chriszs", "stucka"]
 __tags__ = ["pdf"]
@@ -48,7 +48,7 @@ def scrape(
     cache = Cache(cache_dir)
     state_code = "id"
     logger.debug(f"Trying to fetch page at {page_url}")
-    r = requests.get(page_url)
+    r = get_session(page_url).get(page_url)
 
     # Start finding the link before "Who to contact"
     html = r.text
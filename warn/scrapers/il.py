@@ -1,7 +1,7 @@
 import logging
 from pathlib import Path
 
-from .. import utils
+from .. import manifest, utils
 from ..cache import Cache
 
 __authors__ = ["chriszs"]
@@ -35,11 +35,15 @@ def scrape(
     url = "https://apps.illinoisworknet.com/iebs/api/public/export?search=&layoffTypes=&trade=0&dateReportedStart=Invalid%20Date&dateReportedEnd=Invalid%20Date&statuses=4&reasons=&eventCauses=&naicsCodes=1&naicIndustries=&naics=&unionsInvolved=0&geolocation=1&cities=&counties=&lwias=&includeAdditionalLwias=false&edrs=&lat=0&lng=0&distance=.5&memberType=1&users=&accessList=&bookmarked=false"
     file_path = cache.download(f"{state_code}/export.xlsx", url)
 
+    # If the export hasn't changed, the last CSV is still good
+    data_path = data_dir / f"{state_code}.csv"
+    if manifest.inputs_unchanged(data_path):
+        return data_path
+
     # Parse it
     row_list = utils.parse_excel(file_path)
 
     # Write out the results
-    data_path = data_dir / f"{state_code}.csv"
     utils.write_rows_to_csv(data_path, row_list)
 
     # Return the path to the CSV
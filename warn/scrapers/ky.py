@@ -3,11 +3,11 @@ import logging
 import typing
 from pathlib import Path
 
-import requests
 from openpyxl import load_workbook
 
 from .. import utils
 from ..cache import Cache
+from ..sessions import get_session
 
 __authors__ = [
     "palewire",
@@ -47,7 +47,7 @@ def scrape(
     headers = {
         "User-Agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/116.0"
     }
-    r = requests.get(hostpage, headers=headers)
+    r = get_session(hostpage).get(hostpage, headers=headers)
     html = r.text
     subpage = html.split("WARN Notices by Year</h4")[-1]
     # mypy and BeautifulSoup are not cooperating. So ... extract the URL in a dumb way.
@@ -92,7 +92,7 @@ def scrape(
     archive_url = "https://storage.googleapis.com/bln-data-public/warn-layoffs/ky-historical-normalized.csv"
 
     logger.debug("Getting KY historical data")
-    r = requests.get(archive_url)
+    r = get_session(archive_url).get(archive_url)
 
     reader = list(csv.reader(r.text.splitlines()))
 
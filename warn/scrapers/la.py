@@ -1,7 +1,6 @@
 import logging
 import os
 import re
-from datetime import datetime
 from pathlib import Path
 
 import pdfplumber
@@ -59,7 +58,8 @@ def scrape(
         if "WARN Notices" in link.text:
             # Download the PDF
             pdf_url = f"{base_url}{link['href']}"
-            pdf_path = _read_or_download(cache, state_code, pdf_url)
+            cache_key = f"{state_code}/{os.path.basename(pdf_url)}"
+            pdf_path = cache.get_or_fetch(cache_key, pdf_url)
 
             # Process the PDF
             rows = _process_pdf(pdf_path)
@@ -284,49 +284,6 @@ def _vertically_expand_bounding_box(bbox, increase):
     )
 
 
-def _read_or_download(cache: Cache, prefix: str, url: str) -> Path:
-    """
-    Read a file from the cache or downloads it.
-
-    Keyword arguments:
-    cache -- the cache to use
-    prefix -- the prefix to use for the cache key
-    url -- the URL to download
-
-    Returns: the path to the file
-    """
-    file_name = os.path.basename(url)
-    cache_key = f"{prefix}/{file_name}"
-
-    exists = cache.exists(cache_key)
-    year = _extract_year(file_name)
-    current_year = datetime.now().year
-
-    # Form a file path so we can read from the cache
-    if exists and year < current_year - 1:
-        return cache.path / cache_key
-
-    return cache.download(cache_key, url)
-
-
-def _extract_year(text: str) -> int:
-    """
-    Extract the year from a PDF file name.
-
-    Keyword arguments:
-    text -- the text to extract the year from
-
-    Returns: the year
-    """
-    year_pattern = re.compile(r"\d{4}", re.IGNORECASE)
-    year = re.search(year_pattern, text)
-
-    if year is not None:
-        return int(year.group(0))
-    else:
-        raise Exception(f"Could not extract year from {text}")
-
-
 def _is_header(row: list) -> bool:
     """
     Determine if a row is a header row.
@@ -1,7 +1,6 @@
 import logging
 import re
 from pathlib import Path
-from time import sleep
 
 from bs4 import BeautifulSoup
 
@@ -17,8 +16,6 @@ __source__ = {
 
 logger = logging.getLogger(__name__)
 
-naptime = 3
-
 
 def scrape(
     data_dir: Path = utils.WARN_DATA_DIR,
@@ -36,7 +33,8 @@ def scrape(
     # Set the cache
     cache = Cache(cache_dir)
 
-    # In November 2024 Maryland began throwing out many failed connection messages. These two things helped.
+    # In November 2024 Maryland began throwing out many failed connection messages. These two things helped,
+    # along with the slower pace for its host set in warn.ratelimit.
     request_headers = {"User-Agent": "BigLocalNews.org"}
     request_verify = False
 
@@ -49,8 +47,6 @@ def scrape(
     # Save it to the cache
     cache.write("md/source.html", html)
 
-    sleep(naptime)  # Try to stop blocked connections by being less aggressive
-
     # Parse the list of links
     soup = BeautifulSoup(html, "html.parser")
     a_list = soup.find_all("a", {"class": "sub"})
@@ -83,7 +79,6 @@ def scrape(
         filename = f"md/{href}.html"
 
         if href not in old_pages:
-            sleep(naptime)  # Try to stop blocked connections by being less aggressive
             r = utils.get_url(url, headers=request_headers, verify=request_verify)
             r.encoding = "utf-8"
             html = r.text
@@ -91,11 +86,8 @@ def scrape(
             # Save it to the cache
             cache.write(filename, html)
         else:
-            r = utils.fetch_if_not_cached(
-                cache_dir / filename,
-                url,
-                headers=request_headers,
-                verify=request_verify,
+            cache.get_or_fetch(
+                filename, url, headers=request_headers, verify=request_verify
             )
             html = cache.read(filename)
 
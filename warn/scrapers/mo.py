@@ -51,9 +51,9 @@ def scrape(
         # Set the URL, with a hack for 2020 and 2022
         url = f"https://jobs.mo.gov/warn/{year}"
 
-        # Read from cache if available and not this year or the year before
+        # Read from cache if available and old enough to be settled
         cache_key = f"mo/{year}.html"
-        if cache.exists(cache_key) and year < current_year - 1:
+        if cache.is_fresh(cache_key):
             html = cache.read(cache_key)
         else:
             # Otherwise, go request it
@@ -3,7 +3,7 @@ from pathlib import Path
 
 from openpyxl import load_workbook
 
-from .. import utils
+from .. import manifest, utils
 from ..cache import Cache
 
 __authors__ = ["zstumgoren", "Dilcia19", "palewire"]
@@ -36,6 +36,13 @@ def scrape(
     url = "https://www.nj.gov/labor/assets/PDFs/WARN/WARN_Notice_Archive.xlsx"
     wb_path = cache.download("nj/source.xlsx", url)
 
+    # Set the export path
+    data_path = data_dir / "nj.csv"
+
+    # If the workbook hasn't changed, the last CSV is still good
+    if manifest.inputs_unchanged(data_path):
+        return data_path
+
     # Read in the workbook
     output_rows = []
     wb = load_workbook(filename=wb_path)
@@ -64,9 +71,6 @@ def scrape(
             # Tack it on
             output_rows.append(d)
 
-    # Set the export path
-    data_path = data_dir / "nj.csv"
-
     # Write out the file
     headers = output_rows[0].keys()
     utils.write_dict_rows_to_csv(data_path, headers, output_rows)
@@ -1,9 +1,7 @@
 import logging
 import os
 import re
-from datetime import datetime
 from pathlib import Path
-from typing import Optional
 
 import pdfplumber
 from bs4 import BeautifulSoup
@@ -62,12 +60,7 @@ def scrape(
     for pdf_index, pdf_url in enumerate(pdf_urls):
         file_name = os.path.basename(pdf_url)
         cache_key = f"{state_code}/{file_name}"
-        year = _extract_year(file_name)
-        current_year = datetime.now().year
-        if cache.exists(cache_key) and year is not None and year < current_year - 1:
-            pdf_path = Path(cache_dir, cache_key)
-        else:
-            pdf_path = cache.download(cache_key, pdf_url)
+        pdf_path = cache.get_or_fetch(cache_key, pdf_url)
 
         with pdfplumber.open(pdf_path) as pdf:
             for page_index, page in enumerate(pdf.pages):
@@ -114,22 +107,5 @@ def _clean_text(text: str) -> str:
     return re.sub(r"\s+", " ", text)
 
 
-def _extract_year(text: str) -> Optional[int]:
-    """
-    Extract the year from a string.
-
-    Keyword arguments:
-    text -- the string to extract the year from
-
-    Returns: the year
-    """
-    match = re.search(r"\d{4}", text)
-
-    if match is not None:
-        return int(match.group(0))
-
-    return None
-
-
 if __name__ == "__main__":
     scrape()
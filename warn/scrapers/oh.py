@@ -3,10 +3,10 @@ import json
 import logging
 from pathlib import Path
 
-import requests
 from bs4 import BeautifulSoup, Tag
 
 from .. import utils
+from ..sessions import get_session
 
 __authors__ = ["zstumgoren", "Dilcia19", "chriszs", "stucka"]
 __tags__ = ["html", "pdf"]
@@ -41,7 +41,7 @@ def scrape(
     latesturl = "https://jfs.ohio.gov/wps/portal/gov/jfs/job-services-and-unemployment/job-services/job-programs-and-services/submit-a-warn-notice/current-public-notices-of-layoffs-and-closures-sa/current-public-notices-of-layoffs-and-closures"
 
     logger.debug("Attempting to fetch current data")
-    r = requests.get(latesturl, headers=headers)
+    r = get_session(latesturl).get(latesturl, headers=headers)
     soup = BeautifulSoup(r.content)
     logger.debug("Attempting to get JSON data from Ohio file")
     data_div = soup.find("div", {"id": "js-placeholder-json-data"})
@@ -73,9 +73,10 @@ def scrape(
         "Notice ID": "Notice ID",
     }
 
-    r = requests.get(
+    historical_url = (
         "https://storage.googleapis.com/bln-data-public/warn-layoffs/oh_historical.csv"
     )
+    r = get_session(historical_url).get(historical_url)
     reader = list(csv.DictReader(r.text.splitlines()))
     for row in reader:
         line = {}
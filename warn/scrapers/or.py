@@ -1,12 +1,12 @@
 import logging
 from pathlib import Path
 
-import requests
 from bs4 import BeautifulSoup, Tag
 from openpyxl import load_workbook
 
 from .. import utils
 from ..cache import Cache
+from ..sessions import get_session
 
 __authors__ = ["zstumgoren", "Dilcia19", "ydoc5212", "stucka"]
 __tags__ = ["historical", "excel"]
@@ -37,7 +37,7 @@ def scrape(
     starturl = "https://ccwd.hecc.oregon.gov/Layoff/WARN/Download"
     baseurl = "https://ccwd.hecc.oregon.gov"
 
-    r = requests.get(starturl)
+    r = get_session(starturl).get(starturl)
 
     cookies = r.cookies
 
@@ -74,7 +74,9 @@ def scrape(
         "Connection": "keep-alive",
     }
 
-    r = requests.post(starturl, cookies=cookies, data=payload, headers=requestheaders)
+    r = get_session(starturl).post(
+        starturl, cookies=cookies, data=payload, headers=requestheaders
+    )
 
     dlsoup = BeautifulSoup(r.content, features="html5lib")
     excellink = dlsoup.find("a", {"class": "btn-primary"})
@@ -109,9 +111,7 @@ def scrape(
     historicalurl = (
         "https://storage.googleapis.com/bln-data-public/warn-layoffs/or_historical.xlsx"
     )
-    historical_excel_path = str(cache_dir) + "/or/historical.xlsx"
-
-    utils.fetch_if_not_cached(historical_excel_path, historicalurl)
+    historical_excel_path = cache.get_or_fetch("or/historical.xlsx", historicalurl)
     workbook = load_workbook(filename=historical_excel_path)
 
     # Get the first sheet
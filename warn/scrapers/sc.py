@@ -1,6 +1,5 @@
 import logging
 import re
-from datetime import datetime
 from pathlib import Path
 
 import pdfplumber
@@ -76,16 +75,12 @@ def scrape(
     date_re = re.compile("^[0-9]{1,2}/[0-9]{1,2}[/]{1,2}[0-9]{2}")
     jobs_re = re.compile("^[0-9]{1,4}$")
 
-    current_year = datetime.now().year
     output_rows = []
     for pdf_year, pdf_href in pdf_dict.items():
         cache_key = f"sc/{pdf_year}.pdf"
-        if cache.exists(cache_key) and pdf_year < (current_year - 1):
-            pdf_path = cache.path / cache_key
-        else:
-            pdf_path = cache.download(
-                cache_key, f"https://scworks.org/{pdf_href}", verify=False
-            )
+        pdf_path = cache.get_or_fetch(
+            cache_key, f"https://scworks.org/{pdf_href}", verify=False
+        )
 
         # Open the PDF
         with pdfplumber.open(pdf_path) as pdf:
@@ -71,11 +71,10 @@ def scrape(
             staginglist.append(line)
 
     # Bring in historical data
-    historical_file = cache_dir / "tn/tn_historical.csv"
     historical_url = (
         "https://storage.googleapis.com/bln-data-public/warn-layoffs/tn_historical.csv"
     )
-    utils.fetch_if_not_cached(historical_file, historical_url)
+    cache.get_or_fetch("tn/tn_historical.csv", historical_url)
     historical_str = cache.read("tn/tn_historical.csv")
 
     historicallist = list(csv.DictReader(historical_str.splitlines()))
@@ -5,7 +5,7 @@ from pathlib import Path
 from bs4 import BeautifulSoup
 from openpyxl import load_workbook
 
-from .. import utils
+from .. import manifest, utils
 from ..cache import Cache
 
 __authors__ = ["Dilcia19", "ydoc5212"]
@@ -62,8 +62,8 @@ def scrape(
             href_list.append(href)
 
     # Loop through the links we want to download
-    row_list = []
-    for ihref, href in enumerate(href_list):
+    excel_list = []
+    for href in href_list:
         # get each url from the HTML links we found
         data_url = f"https://www.twc.texas.gov{href}"
 
@@ -71,7 +71,24 @@ def scrape(
         year = _get_year(href)
         ext = _get_ext(href)
         excel_path = cache.download(f"tx/{year}{ext}", data_url, verify=ssl_verify)
+        excel_list.append(excel_path)
+
+    # Get historical URL
+    historical_url = (
+        "https://storage.googleapis.com/bln-data-public/warn-layoffs/tx_historical.xlsx"
+    )
+    historical_path = cache.download("tx/historical.xlsx", historical_url)
+
+    # Set the export path
+    data_path = data_dir / "tx.csv"
+
+    # If none of the spreadsheets have changed, the last CSV is still good
+    if manifest.inputs_unchanged(data_path, ignore=["tx/source.html"]):
+        return data_path
 
+    # Loop through the spreadsheets
+    row_list = []
+    for ihref, excel_path in enumerate(excel_list):
         # Open it up
         workbook = load_workbook(filename=excel_path)
 
@@ -92,14 +109,8 @@ def scrape(
             # Add what's left to the pile
             row_list.append(cell_list)
 
-    # Get historical URL
-    historical_url = (
-        "https://storage.googleapis.com/bln-data-public/warn-layoffs/tx_historical.xlsx"
-    )
-    excel_path = cache.download("tx/historical.xlsx", historical_url)
-
-    # Open it up
-    workbook = load_workbook(filename=excel_path)
+    # Open up the historical file
+    workbook = load_workbook(filename=historical_path)
 
     # Get the first sheet
     worksheet = workbook.worksheets[0]
@@ -126,9 +137,6 @@ def scrape(
         cell_list = [c.value for c in select_columns]
         row_list.append(cell_list)
 
-    # Set the export path
-    data_path = data_dir / "tx.csv"
-
     # Write out the file
     utils.write_rows_to_csv(data_path, row_list)
 
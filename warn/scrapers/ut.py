@@ -1,4 +1,3 @@
-import csv
 import logging
 from pathlib import Path
 
@@ -52,12 +51,7 @@ def scrape(
 
     # Write out
     data_path = data_dir / "ut.csv"
-    utils.create_directory(data_path, is_file=True)
-    logger.debug(f"Writing {len(row_list)} rows to {data_path}")
-    # The utils.write_rows_to_csv function doesn't explicitly use utf-8, so it crashes Windows.
-    with open(data_path, mode="w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerows(row_list)
+    utils.write_rows_to_csv(data_path, row_list)
 
     # Return the path to the CSV
     return data_path
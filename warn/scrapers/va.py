@@ -7,8 +7,7 @@ import platform
 from glob import glob
 from pathlib import Path
 from random import random
-from shutil import copyfile
-from time import sleep
+from time import monotonic, sleep, time
 
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options as ChromeOptions
@@ -121,9 +120,9 @@ def scrape(
         Chrome, and its maintainer is apparently trying to protect his
         homeland with FPV drones. So ... back to Chrome.
 
-    So, yes, this is a weird implementation. It's a terrible model. It's
-    even got a hard-coded wait. At least as of late December 2024, however,
-    it does work. ... in late December 2024.
+    So, yes, this is a weird implementation. It's a terrible model. It
+    even waits up to 45 seconds for the download to show up. At least as of
+    late December 2024, however, it does work. ... in late December 2024.
 
     And then it broke in early January 2025! But it's not an IP block.
     They may have started blocking direct calls to the CSV. Code patched
@@ -190,19 +189,25 @@ def scrape(
         logger.debug(f"Attempting to fetch {start_page}")
         driver.get(start_page)
         sleep((4 * random()) + 3)
+        clicked_at = time()
         driver.find_element(By.ID, "warn-notice-well").find_element(
             By.PARTIAL_LINK_TEXT, "Download"
         ).click()
 
         logger.debug(f"Attempting to fetch {csv_url}")
-        # driver.get(csv_url)
-        sleep(45)  # Give it plenty of time to evaluate Javascript
-        # driver.get(csv_url)
-        # sleep(10)
+        # Give it plenty of time to evaluate Javascript, but stop waiting once the file lands
+        download_dir = os.path.expanduser("~") + "/Downloads"
+        deadline = monotonic() + 45
+        while monotonic() < deadline:
+            if any(
+                os.path.getmtime(f) >= clicked_at
+                for f in glob(download_dir + "/warn_notices*.csv")
+            ):
+                logger.debug("Download found")
+                break
+            sleep(1)
         driver.quit()
 
-    download_dir = os.path.expanduser("~") + "/Downloads"
-
     if not os.path.isdir(download_dir):
         logger.error(f"The download directory is not {download_dir}.")
 
@@ -218,13 +223,10 @@ def scrape(
     # print the latest file name
     logger.debug(f"CSV saved to {latest_file}, saved at {latest_file_time}")
 
-    target_filename = cache_dir / "va" / "source.csv"
-
-    utils.create_directory(path=cache_dir / "va", is_file=False)
-
-    logger.debug(f"Saving file to {target_filename}")
+    logger.debug(f"Saving file to {cache_dir / 'va' / 'source.csv'}")
 
-    copyfile(latest_file, target_filename)
+    with open(latest_file, "rb") as fh:
+        cache.write("va/source.csv", fh.read())
 
     # Download it to the cache
     # cache.download("va/source.csv", csv_url, verify=True)
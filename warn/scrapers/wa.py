@@ -2,11 +2,12 @@ import logging
 import re
 from pathlib import Path
 
-import requests
 from bs4 import BeautifulSoup, Tag
 
 from .. import utils
 from ..cache import Cache
+from ..ratelimit import limiter
+from ..sessions import new_session
 
 __authors__ = ["zstumgoren", "Dilcia19"]
 __tags__ = ["html"]
@@ -17,6 +18,9 @@ __source__ = {
 
 logger = logging.getLogger(__name__)
 
+# A backstop in case the site keeps answering postbacks past the last page
+MAX_PAGES = 500
+
 
 def scrape(
     data_dir: Path = utils.WARN_DATA_DIR,
@@ -36,7 +40,7 @@ def scrape(
 
     output_rows = []
 
-    with requests.Session() as session:
+    with new_session() as session:
         # Request the initial page
         url = "https://fortress.wa.gov/esd/file/warn/Public/SearchWARN.aspx"
         user_agent = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:68.0) Gecko/20100101 Firefox/68.0"
@@ -58,12 +62,13 @@ def scrape(
         # Parse the data
         row_list = _parse_table(first_table)
         output_rows.extend(row_list)
+        last_row_list = row_list
 
         # Start jumping through the pages
         soup_content = BeautifulSoup(r.content, "html5lib")
 
         page = 2
-        while True:
+        while page <= MAX_PAGES:
             try:
                 # Post for the next page
                 view_state = soup_content.find("input", attrs={"name": "__VIEWSTATE"})
@@ -79,6 +84,7 @@ def scrape(
                     }
                 else:
                     raise ValueError("Could not find view state or event validation")
+                limiter.wait(url)
                 next = session.post(url, data=formdata)
                 logger.debug(f"Page status is {next.status_code} for {url}")
 
@@ -94,7 +100,12 @@ def scrape(
                 table_list = soup.find_all("table")
                 first_table = table_list[0]
                 row_list = _parse_table(first_table)
+
+                # If the site hands back no rows, or the page we just had, we're done
+                if not row_list or row_list == last_row_list:
+                    break
                 output_rows.extend(row_list)
+                last_row_list = row_list
 
                 # Up the page number
                 page += 1
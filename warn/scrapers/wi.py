@@ -64,7 +64,7 @@ def scrape(
 
         # Request fresh pages, use cache for old ones
         cache_key = f"wi/{year}.html"
-        if cache.exists(cache_key) and year < current_year - 1:
+        if cache.is_fresh(cache_key):
             html = cache.read(cache_key)
         else:
             url = f"https://dwd.wisconsin.gov/dislocatedworker/warn/default.htm?year={year}"
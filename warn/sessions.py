@@ -0,0 +1,193 @@
+import logging
+import os
+import threading
+import typing
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter, Retry
+
+from . import report
+
+logger = logging.getLogger(__name__)
+
+
+# How many keep-alive connections to hold open for each host
+DEFAULT_POOL_SIZE = 10
+
+DEFAULT_HEADERS = {"User-Agent": "Big Local News (biglocalnews.org)"}
+
+# Seconds to wait to connect, and then between bytes, when a request doesn't set its own timeout
+DEFAULT_TIMEOUT = (15, 120)
+
+
+def default_retries() -> Retry:
+    """Get the connection-level retry settings mounted on every session.
+
+    Only failures to connect are retried here. Retrying on status codes is
+    left to utils.get_url, which knows which responses are worth another try.
+    """
+    return Retry(
+        total=2,
+        connect=2,
+        read=0,
+        status=0,
+        backoff_factor=0.5,
+        raise_on_status=False,
+    )
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """An adapter that gives every request a deadline, so none can hang forever.
+
+    Args:
+        timeout: The default passed to requests as its timeout argument.
+    """
+
+    def __init__(self, *args, timeout=DEFAULT_TIMEOUT, **kwargs):
+        """Initialize a new instance."""
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        """Send the request, applying the default timeout if none was set."""
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+class TrackedSession(requests.Session):
+    """A session that counts its requests toward the current scrape's run report."""
+
+    def send(self, request, **kwargs):
+        """Send the request, timing it as part of the fetch phase."""
+        with report.phase("fetch"):
+            response = super().send(request, **kwargs)
+            # Streamed bodies are counted by whoever reads them
+            nbytes = 0 if kwargs.get("stream") else len(response.content)
+        report.add_request(nbytes)
+        return response
+
+
+class SessionPool:
+    """A process-wide set of requests sessions, one per host.
+
+    Reusing a session keeps its TCP and TLS connections warm, so scrapers that
+    make hundreds of requests to the same site only pay to connect once.
+
+    Example:
+        Fetch a page over a pooled connection::
+
+            session = pool.get("https://www.example.gov/warn.html")
+            response = session.get("https://www.example.gov/warn.html")
+
+    Args:
+        pool_size (int): Keep-alive connections to hold open per host (default 10)
+        headers (dict): Headers sent with every request. Defaults to our user-agent.
+        max_retries (Retry): Connection retry settings for each session's adapter.
+        timeout: The timeout for requests that don't set one (default DEFAULT_TIMEOUT)
+    """
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        headers: typing.Optional[typing.Dict] = None,
+        max_retries: typing.Optional[Retry] = None,
+        timeout=DEFAULT_TIMEOUT,
+    ):
+        """Initialize a new instance."""
+        self.pool_size = pool_size
+        self.headers = dict(DEFAULT_HEADERS if headers is None else headers)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._sessions: typing.Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> requests.Session:
+        """Get the shared session for the provided URL's host."""
+        key = _pool_key(url)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                logger.debug(f"Opening a pooled session for {key}")
+                session = self._sessions[key] = self.new_session()
+            return session
+
+    def configure(
+        self,
+        pool_size: typing.Optional[int] = None,
+        headers: typing.Optional[typing.Dict] = None,
+        max_retries: typing.Optional[Retry] = None,
+        timeout=None,
+    ):
+        """Change the pool's settings and close any sessions opened with the old ones.
+
+        Args:
+            pool_size (int): Keep-alive connections to hold open per host
+            headers (dict): Headers sent with every request
+            max_retries (Retry): Connection retry settings for each session's adapter
+            timeout: The timeout for requests that don't set one
+        """
+        if pool_size is not None:
+            self.pool_size = pool_size
+        if headers is not None:
+            self.headers = dict(headers)
+        if max_retries is not None:
+            self.max_retries = max_retries
+        if timeout is not None:
+            self.timeout = timeout
+        self.close()
+
+    def close(self):
+        """Close every open session."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def _forget(self):
+        """Drop the sessions without closing sockets another process still owns."""
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def new_session(self) -> requests.Session:
+        """Create a session with our adapter and headers, outside of the pool."""
+        session = TrackedSession()
+        session.headers.update(self.headers)
+        adapter = TimeoutHTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            max_retries=self.max_retries or default_retries(),
+            timeout=self.timeout,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+
+def _pool_key(url: str) -> str:
+    """Get the scheme and host that identify a URL's session."""
+    bits = urlsplit(url)
+    return f"{bits.scheme}://{bits.netloc}".lower()
+
+
+# The process-wide pool shared by all of our fetch paths
+pool = SessionPool()
+
+# A forked child must not reuse the parent's open sockets
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=pool._forget)
+
+
+def get_session(url: str) -> requests.Session:
+    """Get the pooled session for the provided URL's host."""
+    return pool.get(url)
+
+
+def new_session() -> requests.Session:
+    """Get a session of one's own, with the same timeouts and retries as the pooled ones.
+
+    For scrapers whose cookies or form state shouldn't be shared with anyone else.
+    """
+    return pool.new_session()
@@ -1,13 +1,16 @@
 import csv
 import logging
 import os
+import threading
 import typing
 from pathlib import Path
-from time import sleep
 
-import requests
-from openpyxl import load_workbook
-from retry import retry
+from . import registry, report
+from .ratelimit import limiter
+
+# The fetch helpers below import requests, by way of warn.sessions, only when
+# they're first called. The cache and its stores do the same, so starting the
+# CLI, and `warn-scraper --help`, doesn't pay for importing it.
 
 logger = logging.getLogger(__name__)
 
@@ -55,18 +58,23 @@ def fetch_if_not_cached(filename, url, **kwargs):
     Args:
         filename: The full filename for the file
         url: The URL from which the file may be downloaded.
-    Notes: Should this even be in utils vs. cache? Should it exist?
+    Notes: Scrapers should use Cache.get_or_fetch, which also locks and indexes the file.
     """
+    from .sessions import get_session
+
     create_directory(Path(filename), is_file=True)
-    if not os.path.exists(filename):
+    if os.path.exists(filename):
+        report.add_cache_hit()
+    else:
         logger.debug(f"Fetching {filename} from {url}")
-        response = requests.get(url, **kwargs)
+        limiter.wait(url)
+        response = get_session(url).get(url, **kwargs)
         if not response.ok:
             logger.error(f"Failed to fetch {url} to {filename}")
+        elif not _is_complete(response):
+            logger.error(f"Got only part of {url}. Not saving to {filename}")
         else:
-            with open(filename, "wb") as outfile:
-                outfile.write(response.content)
-        sleep(2)  # Pause between requests
+            _replace_file(Path(filename), response.content)
     return
 
 
@@ -76,24 +84,57 @@ def save_if_good_url(filename, url, **kwargs):
     Args:
         filename: The full filename for the file
         url: The URL from which the file may be downloaded.
-    Notes: Should this even be in utils vs. cache? Should it exist?
+    Notes: Scrapers should use Cache.download, which also locks and indexes the file.
     """
+    from .sessions import get_session
+
     create_directory(Path(filename), is_file=True)
-    response = requests.get(url, **kwargs)
+    limiter.wait(url)
+    response = get_session(url).get(url, **kwargs)
     if not response.ok:
         logger.error(f"URL {url} fetch failed with {response.status_code}")
         logger.error(f"Not saving to {filename}. Is a new year's URL not started?")
         success_flag = False
         content = False
+    elif not _is_complete(response):
+        logger.error(f"Got only part of {url}. Not saving to {filename}")
+        success_flag = False
+        content = False
     else:
-        with open(filename, "wb") as outfile:
-            outfile.write(response.content)
-            success_flag = True
-            content = response.content
-    sleep(2)  # Pause between requests
+        _replace_file(Path(filename), response.content)
+        success_flag = True
+        content = response.content
     return success_flag, content
 
 
+def _is_complete(response) -> bool:
+    """Whether a response's body is as long as the server said it would be."""
+    expected = response.headers.get("Content-Length")
+    if not expected or response.headers.get("Content-Encoding"):
+        return True
+    return len(response.content) == int(expected)
+
+
+def _replace_file(path: Path, content: bytes):
+    """Save content by writing it to a temp file beside the path and renaming it into place.
+
+    Other processes see either the old file or the new one, never part of it,
+    and an interrupted save leaves the old file as it was. A cached name may be
+    a hardlink to a blob that other names share, so it's swapped out rather
+    than overwritten, which would change every one of them. Temp files left
+    by a crash are cleared out by ``warn-scraper cache gc``.
+    """
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "wb") as fh:
+            fh.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+
 def write_rows_to_csv(output_path: Path, rows: list, mode="w"):
     """Write the provided list to the provided path as comma-separated values.
 
@@ -104,9 +145,13 @@ def write_rows_to_csv(output_path: Path, rows: list, mode="w"):
     """
     create_directory(output_path, is_file=True)
     logger.debug(f"Writing {len(rows)} rows to {output_path}")
-    with open(output_path, mode, newline="", encoding="utf-8") as f:
+    with report.phase("write"), open(
+        output_path, mode, newline="", encoding="utf-8"
+    ) as f:
         writer = csv.writer(f)
         writer.writerows(rows)
+    # A new file's first row is its header
+    report.add_rows(max(len(rows) - 1, 0) if mode == "w" else len(rows))
 
 
 def write_dict_rows_to_csv(
@@ -123,7 +168,9 @@ def write_dict_rows_to_csv(
     """
     create_directory(output_path, is_file=True)
     logger.debug(f"Writing {len(rows)} rows to {output_path}")
-    with open(output_path, mode, newline="", encoding=encoding) as f:
+    with report.phase("write"), open(
+        output_path, mode, newline="", encoding=encoding
+    ) as f:
         # Create the writer object
         writer = csv.DictWriter(f, fieldnames=headers, extrasaction=extrasaction)
         # If we are writing a new row ...
@@ -133,31 +180,40 @@ def write_dict_rows_to_csv(
         # Loop through the dicts and write them in one by one.
         for row in rows:
             writer.writerow(row)
+    report.add_rows(len(rows))
 
 
 def get_all_scrapers():
     """Get all the states and territories that have scrapers.
 
+    Reads the static registry in warn.registry, so no scraper is imported.
+
     Returns: List of lower-case post abbreviations.
     """
-    this_dir = Path(__file__).parent
-    scrapers_dir = this_dir / "scrapers"
-    return sorted(
-        p.stem for p in scrapers_dir.glob("*.py") if "__init__.py" not in str(p)
-    )
+    return registry.states()
 
 
-@retry(tries=3, delay=15, backoff=2)
 def get_url(
     url, user_agent="Big Local News (biglocalnews.org)", session=None, **kwargs
 ):
     """Request the provided URL and return a response object.
 
+    Requests are paced by the shared, per-host rate limiter in warn.ratelimit.
+    Unless a session is provided, they go out over a pooled keep-alive session
+    for the URL's host from warn.sessions. Failures are retried under the
+    shared policy in warn.retries.
+
     Args:
         url (str): the url to be requested
         user_agent (str): the user-agent header passed with the request (default: biglocalnews.org)
         session: a session object to use when making the request. optional
+
+    Raises:
+        requests.HTTPError: if the final response has an error status
     """
+    from .retries import policy
+    from .sessions import get_session
+
     logger.debug(f"Requesting {url}")
 
     # Set the headers
@@ -168,13 +224,18 @@ def get_url(
     # Go get it
     if session is not None:
         logger.debug(f"Requesting with session {session}")
-        response = session.get(url, **kwargs)
     else:
-        response = requests.get(url, **kwargs)
+        session = get_session(url)
+
+    def _send():
+        limiter.wait(url)
+        return session.get(url, **kwargs)
+
+    response = policy.request(_send, url)
     logger.debug(f"Response code: {response.status_code}")
 
-    # Verify that the response is 200
-    assert response.ok
+    # Verify that the response is good
+    response.raise_for_status()
 
     # Return the response
     return response
@@ -189,6 +250,9 @@ def parse_excel(excel_path: Path, keep_header: bool = True) -> typing.List[typin
 
     Returns: List of values ready to write.
     """
+    # Imported here so that starting up doesn't pay for it
+    from openpyxl import load_workbook
+
     # Open it up
     workbook = load_workbook(filename=excel_path)
 